@@ -5,6 +5,8 @@ import sqlalchemy as sa
 import sqlalchemy.orm as orm
 from passlib.hash import bcrypt
 
+from BlogAPI.db.search import create_search_tables, drop_search_tables
+
 Base = orm.declarative_base()
 
 
@@ -25,6 +27,15 @@ class Reply(Base):
     )
     post_id = sa.Column(sa.ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
 
+    # match list queries - filter on owner, order by (date_created, id)
+    # created on existing databases by migrations.py
+    __table_args__ = (
+        sa.Index("ix_replies_post_id_date_created", "post_id", "date_created", "id"),
+        sa.Index("ix_replies_user_id_date_created", "user_id", "date_created", "id"),
+        # child key of the username foreign key - lets deleting a user find its replies
+        sa.Index("ix_replies_username", "username"),
+    )
+
     def __eq__(self, other):
         return self.id == other.id
 
@@ -45,10 +56,30 @@ class Post(Base):
     username = sa.Column(
         sa.ForeignKey("users.username", ondelete="CASCADE"), nullable=False
     )
+    # maintained by the reply routes - see counters.py to recompute
+    reply_count: int = sa.Column(
+        sa.Integer, nullable=False, default=0, server_default="0"
+    )
+    # time decayed activity score - set on create, maintained by the reply routes, see util/trending.py
+    trending_score: float = sa.Column(
+        sa.Float, nullable=False, default=0, server_default="0"
+    )
+    # passive_deletes - the database cascades deletes, replies are never loaded just to delete them
     replies: Optional[List[Reply]] = orm.relationship(
         "Reply",
         order_by="desc(Reply.date_created)",
         cascade="all,delete-orphan",
+        passive_deletes=True,
+    )
+
+    # match list queries - filter on owner, order by (date_created, id)
+    # created on existing databases by migrations.py
+    __table_args__ = (
+        sa.Index("ix_posts_user_id_date_created", "user_id", "date_created", "id"),
+        sa.Index("ix_posts_date_created", "date_created", "id"),
+        sa.Index("ix_posts_trending_score", "trending_score", "id"),
+        # child key of the username foreign key - lets deleting a user find its posts
+        sa.Index("ix_posts_username", "username"),
     )
 
     def __eq__(self, other):
@@ -62,24 +93,41 @@ class User(Base):
     username: str = sa.Column(sa.String(24), unique=True, nullable=False)
     email: str = sa.Column(sa.String(120), unique=True, nullable=False)
     hs_password: str = sa.Column(sa.String(60), nullable=False)
+    # maintained by the post/reply/follow routes - see counters.py to recompute
+    post_count: int = sa.Column(
+        sa.Integer, nullable=False, default=0, server_default="0"
+    )
+    reply_count: int = sa.Column(
+        sa.Integer, nullable=False, default=0, server_default="0"
+    )
+    follower_count: int = sa.Column(
+        sa.Integer, nullable=False, default=0, server_default="0"
+    )
+    following_count: int = sa.Column(
+        sa.Integer, nullable=False, default=0, server_default="0"
+    )
+    # passive_deletes - the database cascades deletes, see Post.replies
     posts: Optional[List[Post]] = orm.relationship(
         "Post",
         order_by="desc(Post.date_created)",
         cascade="all,delete-orphan",
         foreign_keys="[Post.user_id]",
+        passive_deletes=True,
     )
     replies: Optional[List[Reply]] = orm.relationship(
         "Reply",
         order_by="desc(Reply.date_created)",
         cascade="all,delete-orphan",
         foreign_keys="[Reply.user_id]",
+        passive_deletes=True,
     )
     following = orm.relationship(
         "User",
         lambda: user_follow,
         primaryjoin=lambda: User.id == user_follow.c.user_id,
         secondaryjoin=lambda: User.id == user_follow.c.following_id,
-        backref="followers",
+        backref=orm.backref("followers", passive_deletes=True),
+        passive_deletes=True,
     )
 
     def verify_password(self, password):
@@ -95,6 +143,88 @@ class User(Base):
 user_follow = sa.Table(
     "user_follow",
     Base.metadata,
-    sa.Column("user_id", sa.Integer, sa.ForeignKey(User.id), primary_key=True),
-    sa.Column("following_id", sa.Integer, sa.ForeignKey(User.id), primary_key=True),
+    sa.Column(
+        "user_id",
+        sa.Integer,
+        sa.ForeignKey(User.id, ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    sa.Column(
+        "following_id",
+        sa.Integer,
+        sa.ForeignKey(User.id, ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    # primary key covers (user_id, following_id) - this covers lookups from the other side
+    sa.Index("ix_user_follow_following_id", "following_id", "user_id"),
 )
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id: int = sa.Column(sa.Integer, primary_key=True, autoincrement=True)
+    # only a keyed hash of the token is stored - lookups are an indexed equality match
+    token_hash: str = sa.Column(sa.String(64), unique=True, nullable=False)
+    # every token rotated from the same login shares a family
+    family_id: str = sa.Column(sa.String(32), nullable=False, index=True)
+    user_id = sa.Column(
+        sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    date_created: datetime = sa.Column(
+        sa.DATETIME,
+        nullable=False,
+        default=datetime.datetime.utcnow,
+    )
+    expires_at: datetime = sa.Column(sa.DATETIME, nullable=False)
+    revoked: bool = sa.Column(sa.Boolean, nullable=False, default=False)
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    # jti claim of access token (or digest of the token for tokens issued without one)
+    token_id: str = sa.Column(sa.String(64), primary_key=True)
+    # no foreign key - revocation has to outlive a deleted user until the token itself expires
+    user_id: int = sa.Column(sa.Integer, nullable=False, index=True)
+    date_created: datetime = sa.Column(
+        sa.DATETIME,
+        nullable=False,
+        default=datetime.datetime.utcnow,
+        index=True,
+    )
+    # once the token itself expires the row is no longer needed
+    expires_at: datetime = sa.Column(sa.DATETIME, nullable=False)
+
+
+class TimelineEntry(Base):
+    __tablename__ = "timeline_entries"
+
+    # owner of the timeline (the follower)
+    user_id = sa.Column(sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    post_id = sa.Column(sa.ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    author_id = sa.Column(sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # copied from post so a feed page is a range scan on one index
+    date_created: datetime = sa.Column(sa.DATETIME, nullable=False)
+
+    __table_args__ = (
+        sa.Index(
+            "ix_timeline_entries_user_id_date_created",
+            "user_id",
+            "date_created",
+            "post_id",
+        ),
+        sa.Index("ix_timeline_entries_post_id", "post_id"),
+        sa.Index("ix_timeline_entries_author_id", "author_id"),
+    )
+
+
+# full-text search tables aren't models - built and dropped along with them, see search.py
+@sa.event.listens_for(Base.metadata, "after_create")
+def _create_search_tables(target, connection, **kw):
+    create_search_tables(connection)
+
+
+@sa.event.listens_for(Base.metadata, "before_drop")
+def _drop_search_tables(target, connection, **kw):
+    drop_search_tables(connection)
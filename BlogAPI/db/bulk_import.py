@@ -0,0 +1,286 @@
+"""
+Bulk import of users, posts, replies and follows from NDJSON or CSV dumps
+
+Rows are inserted with one executemany per chunk (a transaction each) on the raw sqlite3 connection -
+no ORM objects and no per row type processing. While loading, the journal and fsyncs are turned off
+and the secondary indexes and full-text search triggers are dropped, then rebuilt once at the end, which is
+much cheaper than keeping them up to date row by row. Counters, trending scores and timelines are recomputed afterwards in bulk.
+
+With the journal off an interrupted import can not be rolled back - import into a fresh database or back up first.
+Passwords are not hashed here - users need an hs_password column holding a bcrypt hash already.
+
+Files are read by extension (.csv, otherwise NDJSON - one object per line, e.g. a /user/{id}/export dump,
+lines of another "type" are skipped). Tables are loaded in foreign key order.
+
+Run with:
+    python -m BlogAPI.db.bulk_import --users users.csv --posts posts.ndjson --replies replies.ndjson --follows follows.csv
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Engine
+
+from BlogAPI.db.SQLAlchemy_models import User, Post, Reply, user_follow
+
+IMPORT_CHUNK_SIZE = 10_000
+
+# import order - parents before children
+TABLES = {
+    "users": User.__table__,
+    "posts": Post.__table__,
+    "replies": Reply.__table__,
+    "follows": user_follow,
+}
+
+# NDJSON "type" of each table's rows (matches /user/{id}/export)
+ROW_TYPES = {"users": "user", "posts": "post", "replies": "reply", "follows": "follow"}
+
+# recomputed after the import - see counters.py and util/trending.py
+DERIVED_COLUMNS = {
+    "post_count",
+    "reply_count",
+    "follower_count",
+    "following_count",
+    "trending_score",
+}
+
+IMPORT_PRAGMAS = ["PRAGMA journal_mode = OFF", "PRAGMA synchronous = OFF"]
+RESTORE_PRAGMAS = ["PRAGMA journal_mode = DELETE", "PRAGMA synchronous = FULL"]
+
+
+class ImportStats(NamedTuple):
+    table: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else float(self.rows)
+
+    def __str__(self):
+        if self.table not in TABLES:
+            # index rebuild/counter repair steps - only their time matters
+            return f"{self.table}: {self.seconds:.2f}s"
+        return (
+            f"{self.table}: {self.rows:,} rows in {self.seconds:.2f}s "
+            f"({self.rows_per_second:,.0f} rows/sec)"
+        )
+
+
+def import_columns(table: sa.Table) -> List[sa.Column]:
+    return [column for column in table.columns if column.name not in DERIVED_COLUMNS]
+
+
+def read_rows(path: Path, row_type: Optional[str] = None) -> Iterator[dict]:
+    """
+    Yields rows of a .csv file (header row required) or an NDJSON file
+    NDJSON lines with a "type" other than row_type are skipped
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.suffix.lower() == ".csv":
+            for row in csv.DictReader(file):
+                # empty csv cells are NULL
+                yield {
+                    key: (value if value != "" else None) for key, value in row.items()
+                }
+            return
+
+        for line in file:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row_type is not None and row.get("type", row_type) != row_type:
+                continue
+            yield row
+
+
+def _datetime(value) -> Optional[str]:
+    """
+    Stores datetimes in SQLAlchemy's sqlite format - keeps them comparable with rows written by the api
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value.rstrip("Z"))
+    return value.isoformat(" ", "microseconds")
+
+
+def to_params(rows: Iterator[dict], columns: List[sa.Column]) -> Iterator[tuple]:
+    """
+    Converts rows to parameter tuples in columns order
+    Missing date_created is now, other missing columns are NULL (id NULL autoincrements)
+    """
+    now = _datetime(datetime.datetime.utcnow())
+    converters = [
+        _datetime if isinstance(column.type, sa.DateTime) else None
+        for column in columns
+    ]
+    names = [column.name for column in columns]
+
+    for row in rows:
+        params = []
+        for name, convert in zip(names, converters):
+            value = row.get(name)
+            if convert is not None:
+                value = convert(value)
+                if value is None and name == "date_created":
+                    value = now
+            params.append(value)
+        yield tuple(params)
+
+
+def chunked(iterable: Iterator, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def secondary_indexes(table: sa.Table) -> List[sa.Index]:
+    # unique constraints/primary keys stay - dropping them would skip their checks
+    return [index for index in table.indexes if not index.unique]
+
+
+def import_table(
+    engine: Engine,
+    table_name: str,
+    path: Path,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> ImportStats:
+    """
+    Inserts every row of path into table_name - one executemany and commit per chunk
+    """
+    table = TABLES[table_name]
+    columns = import_columns(table)
+    # written out by hand - a compiled insert() would also bind every column with a python side default
+    statement = (
+        f"INSERT INTO {table.name} ({', '.join(column.name for column in columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    params = to_params(read_rows(path, ROW_TYPES[table_name]), columns)
+
+    connection = engine.raw_connection()
+    try:
+        for pragma in IMPORT_PRAGMAS:
+            connection.execute(pragma)
+
+        rows = 0
+        start = time.perf_counter()
+        for chunk in chunked(params, chunk_size):
+            cursor = connection.cursor()
+            cursor.executemany(statement, chunk)
+            cursor.close()
+            connection.commit()
+            rows += len(chunk)
+
+        return ImportStats(table_name, rows, time.perf_counter() - start)
+    finally:
+        # a failed chunk leaves its transaction open - journal mode can't change inside one
+        connection.rollback()
+        for pragma in RESTORE_PRAGMAS:
+            connection.execute(pragma)
+        connection.close()
+
+
+def bulk_import(
+    files: Dict[str, Path],
+    engine: Engine = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> List[ImportStats]:
+    """
+    Imports files (table name -> path) in foreign key order - returns stats per table
+    Secondary indexes of imported tables and the full-text search triggers are dropped for the load,
+    then indexes, search indexes, counters, trending scores and timelines are rebuilt in bulk
+    """
+    # imported here - same as migrations.py, timeline module pulls in the async engine/config
+    from BlogAPI.db.counters import repair_counters
+    from BlogAPI.db.search import (
+        create_search_triggers,
+        drop_search_triggers,
+        rebuild_search,
+    )
+    from BlogAPI.util.timeline import rebuild_timelines
+    from BlogAPI.util.trending import repair_trending
+
+    if engine is None:
+        from BlogAPI.db.db_session import engine
+
+    unknown = set(files) - set(TABLES)
+    if unknown:
+        raise ValueError(f"Unknown tables: {', '.join(sorted(unknown))}")
+
+    tables = [name for name in TABLES if name in files]
+    indexes = [index for name in tables for index in secondary_indexes(TABLES[name])]
+
+    with engine.begin() as connection:
+        for index in indexes:
+            connection.execute(sa.text(f"DROP INDEX IF EXISTS {index.name}"))
+        drop_search_triggers(connection)
+
+    stats = []
+    try:
+        for name in tables:
+            stats.append(import_table(engine, name, files[name], chunk_size))
+    finally:
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            for index in indexes:
+                index.create(connection, checkfirst=True)
+            create_search_triggers(connection)
+            connection.execute(sa.text("ANALYZE"))
+        stats.append(ImportStats("indexes", len(indexes), time.perf_counter() - start))
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        repair_counters(connection)
+        repair_trending(connection)
+        rebuild_timelines(connection)
+        rebuild_search(connection)
+    stats.append(
+        ImportStats(
+            "counters/trending/timelines/search", 0, time.perf_counter() - start
+        )
+    )
+
+    return stats
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        description="Bulk import users, posts, replies and follows from NDJSON or CSV"
+    )
+    for name in TABLES:
+        parser.add_argument(
+            f"--{name}", type=Path, help=f"{name} file (.csv or NDJSON)"
+        )
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    files = {
+        name: getattr(args, name) for name in TABLES if getattr(args, name) is not None
+    }
+    if not files:
+        parser.error("nothing to import - pass at least one file")
+
+    start = time.perf_counter()
+    stats = bulk_import(files, chunk_size=args.chunk_size)
+    for table_stats in stats:
+        print(table_stats)
+
+    rows = sum(table_stats.rows for table_stats in stats if table_stats.table in TABLES)
+    seconds = time.perf_counter() - start
+    print(f"Imported {rows:,} rows in {seconds:.2f}s ({rows / seconds:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
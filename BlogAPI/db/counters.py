@@ -0,0 +1,58 @@
+"""
+Denormalized counters on posts/users
+
+The routes keep these up to date incrementally, this recomputes them all in bulk
+(after imports, manual database edits or if they ever drift).
+
+Run with:
+    python -m BlogAPI.db.counters
+"""
+
+from sqlalchemy import select, update, func
+from sqlalchemy.engine import Connection
+
+from BlogAPI.db.SQLAlchemy_models import Post, Reply, User, user_follow
+
+
+def repair_statements() -> list:
+    """
+    One set based UPDATE per table - each count is a correlated subquery served by an index
+    """
+    # row (user_id=A, following_id=F) means F follows A
+    return [
+        update(Post).values(
+            reply_count=select(func.count(Reply.id))
+            .where(Reply.post_id == Post.id)
+            .scalar_subquery()
+        ),
+        update(User).values(
+            post_count=select(func.count(Post.id))
+            .where(Post.user_id == User.id)
+            .scalar_subquery(),
+            reply_count=select(func.count(Reply.id))
+            .where(Reply.user_id == User.id)
+            .scalar_subquery(),
+            follower_count=select(func.count())
+            .select_from(user_follow)
+            .where(user_follow.c.user_id == User.id)
+            .scalar_subquery(),
+            following_count=select(func.count())
+            .select_from(user_follow)
+            .where(user_follow.c.following_id == User.id)
+            .scalar_subquery(),
+        ),
+    ]
+
+
+def repair_counters(connection: Connection):
+    for statement in repair_statements():
+        connection.execute(statement)
+
+
+if __name__ == "__main__":
+    from BlogAPI.db.db_session import engine
+
+    with engine.begin() as conn:
+        repair_counters(conn)
+
+    print("Counters repaired successfully")
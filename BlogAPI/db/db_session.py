@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from BlogAPI.config import config_settings
 
@@ -6,7 +6,19 @@ from BlogAPI.config import config_settings
 # see db_session_async for async engine/session code that is used by the api
 SQLALCHEMY_DATABASE_URL = fr"sqlite:///{config_settings.database_file_path}"
 
+
+def enable_foreign_keys(dbapi_connection, connection_record):
+    """
+    SQLite only enforces foreign keys (and runs their ON DELETE CASCADE) on connections that turn them on
+    Listen for "connect" on every engine with this
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys = ON")
+    cursor.close()
+
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
+event.listen(engine, "connect", enable_foreign_keys)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -1,18 +1,87 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from BlogAPI.config import config_settings
+from BlogAPI.db.db_session import enable_foreign_keys
+
+# This points the api/test client to test.db instead of blog.db
+SQLALCHEMY_DATABASE_URL = fr"sqlite+aiosqlite:///{config_settings.database_file_path}"
+
+# pool settings - can be overridden in config, defaults suit a single uvicorn worker
+POOL_SIZE = getattr(config_settings, "db_pool_size", 5)
+POOL_MAX_OVERFLOW = getattr(config_settings, "db_pool_max_overflow", 10)
+POOL_RECYCLE = getattr(config_settings, "db_pool_recycle", 1800)
+POOL_PRE_PING = getattr(config_settings, "db_pool_pre_ping", True)
+POOL_TIMEOUT = getattr(config_settings, "db_pool_timeout", 30)
+
+# one engine/session factory per process - built on first use, disposed on shutdown
+async_engine: Optional[AsyncEngine] = None
+async_session_factory: Optional[sessionmaker] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Returns the process wide async engine, creating it (and its session factory) on first use
+    """
+    global async_engine, async_session_factory
+
+    if async_engine is None:
+        async_engine = create_async_engine(
+            SQLALCHEMY_DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=POOL_SIZE,
+            max_overflow=POOL_MAX_OVERFLOW,
+            pool_recycle=POOL_RECYCLE,
+            pool_pre_ping=POOL_PRE_PING,
+            pool_timeout=POOL_TIMEOUT,
+        )
+        event.listen(async_engine.sync_engine, "connect", enable_foreign_keys)
+        async_session_factory = sessionmaker(
+            async_engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+    return async_engine
 
 
 def create_async_session() -> AsyncSession:
-    # This points the api/test client to test.db instead of blog.db
-    SQLALCHEMY_DATABASE_URL = (
-        fr"sqlite+aiosqlite:///{config_settings.database_file_path}"
-    )
+    """
+    Returns a new session bound to the shared pooled engine
+    """
+    get_async_engine()
+    return async_session_factory()
+
+
+async def dispose_async_engine():
+    """
+    Closes all pooled connections - called on app shutdown
+    """
+    global async_engine, async_session_factory
+
+    if async_engine is not None:
+        await async_engine.dispose()
+
+    async_engine = None
+    async_session_factory = None
 
-    async_engine = create_async_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-    )
 
-    session: AsyncSession = AsyncSession(async_engine)
-    session.sync_session.expire_on_commit = False
+def get_pool_stats() -> dict:
+    """
+    Returns current connection pool usage - useful for sizing pool settings
+    """
+    if async_engine is None:
+        return {"initialized": False}
 
-    return session
+    pool = async_engine.pool
+    return {
+        "initialized": True,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "status": pool.status(),
+    }
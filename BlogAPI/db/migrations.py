@@ -0,0 +1,245 @@
+"""
+Versioned schema migrations for existing databases
+
+New databases are built straight from the models with create_all and stamped at the latest version.
+Existing databases get every migration newer than their stored version applied in order.
+
+Run with:
+    python -m BlogAPI.db.migrations
+"""
+
+import time
+from typing import Callable, List, NamedTuple
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection, Engine
+
+from BlogAPI.db.SQLAlchemy_models import (
+    Base,
+    RefreshToken,
+    RevokedToken,
+    TimelineEntry,
+    user_follow,
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def _create_token_tables(connection: Connection):
+    RefreshToken.__table__.create(connection, checkfirst=True)
+    RevokedToken.__table__.create(connection, checkfirst=True)
+
+
+def _add_list_indexes(connection: Connection):
+    # SQLite can walk these backwards, so one index serves both sort directions
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_posts_user_id_date_created "
+        "ON posts (user_id, date_created, id)",
+        "CREATE INDEX IF NOT EXISTS ix_posts_date_created ON posts (date_created, id)",
+        "CREATE INDEX IF NOT EXISTS ix_replies_post_id_date_created "
+        "ON replies (post_id, date_created, id)",
+        "CREATE INDEX IF NOT EXISTS ix_replies_user_id_date_created "
+        "ON replies (user_id, date_created, id)",
+        "CREATE INDEX IF NOT EXISTS ix_user_follow_following_id "
+        "ON user_follow (following_id, user_id)",
+        # refresh planner statistics so the new indexes get picked
+        "ANALYZE",
+    ]
+    for statement in statements:
+        connection.execute(sa.text(statement))
+
+
+def _create_timelines(connection: Connection):
+    # imported here - timeline module pulls in the async engine/config
+    from BlogAPI.util.timeline import rebuild_timelines
+
+    TimelineEntry.__table__.create(connection, checkfirst=True)
+    rebuild_timelines(connection)
+
+
+def _add_counters(connection: Connection):
+    from BlogAPI.db.counters import repair_counters
+
+    columns = [
+        ("posts", "reply_count"),
+        ("users", "post_count"),
+        ("users", "reply_count"),
+        ("users", "follower_count"),
+        ("users", "following_count"),
+    ]
+    for table, column in columns:
+        connection.execute(
+            sa.text(
+                f"ALTER TABLE {table} ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"
+            )
+        )
+
+    repair_counters(connection)
+
+
+def _create_search_tables(connection: Connection):
+    from BlogAPI.db.search import create_search_tables, rebuild_search
+
+    create_search_tables(connection)
+    rebuild_search(connection)
+
+
+def _add_trending_score(connection: Connection):
+    from BlogAPI.util.trending import repair_trending
+
+    connection.execute(
+        sa.text("ALTER TABLE posts ADD COLUMN trending_score FLOAT NOT NULL DEFAULT 0")
+    )
+    connection.execute(
+        sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_posts_trending_score "
+            "ON posts (trending_score, id)"
+        )
+    )
+    repair_trending(connection)
+
+
+def _add_delete_cascades(connection: Connection):
+    from BlogAPI.db.counters import repair_counters
+    from BlogAPI.util.timeline import rebuild_timelines
+
+    # SQLite can't alter a foreign key - rebuild user_follow with ON DELETE CASCADE from the model
+    connection.execute(sa.text("DROP INDEX IF EXISTS ix_user_follow_following_id"))
+    connection.execute(sa.text("ALTER TABLE user_follow RENAME TO user_follow_old"))
+    user_follow.create(connection)
+    # foreign keys are enforced now - follows of users deleted before that are dropped
+    connection.execute(
+        sa.text(
+            "INSERT INTO user_follow (user_id, following_id) "
+            "SELECT user_id, following_id FROM user_follow_old "
+            "WHERE user_id IN (SELECT id FROM users) "
+            "AND following_id IN (SELECT id FROM users)"
+        )
+    )
+    connection.execute(sa.text("DROP TABLE user_follow_old"))
+    # follower/following counts and timelines still include the dropped follows
+    repair_counters(connection)
+    rebuild_timelines(connection)
+
+    # cascades look up child rows by their foreign key - without these deleting a user scans whole tables
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_posts_username ON posts (username)",
+        "CREATE INDEX IF NOT EXISTS ix_replies_username ON replies (username)",
+        "CREATE INDEX IF NOT EXISTS ix_timeline_entries_author_id "
+        "ON timeline_entries (author_id)",
+        "CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user_id "
+        "ON refresh_tokens (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_revoked_tokens_user_id "
+        "ON revoked_tokens (user_id)",
+        "ANALYZE",
+    ]
+    for statement in statements:
+        connection.execute(sa.text(statement))
+
+
+def _revocations_outlive_users(connection: Connection):
+    # SQLite can't drop a foreign key - rebuild revoked_tokens from the model, its indexes go with the old table
+    for index in RevokedToken.__table__.indexes:
+        connection.execute(sa.text(f"DROP INDEX IF EXISTS {index.name}"))
+    connection.execute(
+        sa.text("ALTER TABLE revoked_tokens RENAME TO revoked_tokens_old")
+    )
+    RevokedToken.__table__.create(connection)
+    connection.execute(
+        sa.text(
+            "INSERT INTO revoked_tokens (token_id, user_id, date_created, expires_at) "
+            "SELECT token_id, user_id, date_created, expires_at FROM revoked_tokens_old"
+        )
+    )
+    connection.execute(sa.text("DROP TABLE revoked_tokens_old"))
+
+
+# append only - never edit or reorder a migration once it has shipped
+MIGRATIONS: List[Migration] = [
+    Migration(1, "refresh and revoked token tables", _create_token_tables),
+    Migration(2, "composite indexes for list queries", _add_list_indexes),
+    Migration(3, "fan-out timelines for following feed", _create_timelines),
+    Migration(4, "post/user counter columns", _add_counters),
+    Migration(5, "full-text search tables for posts/replies", _create_search_tables),
+    Migration(6, "trending score column for posts", _add_trending_score),
+    Migration(
+        7, "delete cascades for follows, child key indexes", _add_delete_cascades
+    ),
+    Migration(
+        8, "revoked tokens without foreign key to users", _revocations_outlive_users
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+schema_version = sa.Table(
+    "schema_version",
+    sa.MetaData(),
+    sa.Column("version", sa.Integer, primary_key=True),
+    sa.Column("description", sa.String, nullable=False),
+    sa.Column("applied_at", sa.Float, nullable=False),
+)
+
+
+def get_schema_version(connection: Connection) -> int:
+    schema_version.create(connection, checkfirst=True)
+    result = connection.execute(sa.select(sa.func.max(schema_version.c.version)))
+    return result.scalar() or 0
+
+
+def _stamp(connection: Connection, migration: Migration):
+    connection.execute(
+        schema_version.insert().values(
+            version=migration.version,
+            description=migration.description,
+            applied_at=time.time(),
+        )
+    )
+
+
+def run_migrations(engine: Engine = None) -> List[int]:
+    """
+    Brings database up to LATEST_VERSION - returns list of versions applied
+    Each migration runs in its own transaction together with its version stamp
+    """
+    if engine is None:
+        from BlogAPI.db.db_session import engine
+
+    with engine.begin() as connection:
+        fresh_database = not sa.inspect(connection).has_table("users")
+
+        if fresh_database:
+            # models already describe the latest schema
+            Base.metadata.create_all(connection)
+            get_schema_version(connection)
+            for migration in MIGRATIONS:
+                _stamp(connection, migration)
+            return [migration.version for migration in MIGRATIONS]
+
+        current_version = get_schema_version(connection)
+
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= current_version:
+            continue
+
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            _stamp(connection, migration)
+
+        print(f"Applied migration {migration.version}: {migration.description}")
+        applied.append(migration.version)
+
+    return applied
+
+
+if __name__ == "__main__":
+    versions = run_migrations()
+    if versions:
+        print(f"Database migrated to version {LATEST_VERSION}")
+    else:
+        print(f"Database already at version {LATEST_VERSION}")
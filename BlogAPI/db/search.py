@@ -0,0 +1,108 @@
+"""
+Full-text search tables - FTS5 indexes shadowing posts (title, body) and replies (body)
+
+Both are external content tables: they store only the index and read text back from posts/replies,
+so nothing is duplicated. Triggers keep them in sync on insert/delete and on updates of the indexed
+columns only (counter updates don't touch the index).
+
+Created/dropped with the model tables (see SQLAlchemy_models.py) and on existing databases by migrations.py.
+Rebuild both indexes from their tables (after manual edits, or if they ever drift) with:
+    python -m BlogAPI.db.search
+"""
+
+from typing import List
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+# fts table -> (content table, indexed columns)
+SEARCH_TABLES = {
+    "posts_fts": ("posts", ["title", "body"]),
+    "replies_fts": ("replies", ["body"]),
+}
+
+# porter stemming - "replies" matches "reply"
+TOKENIZE = "porter unicode61 remove_diacritics 2"
+
+
+def _trigger_statements(fts_table: str, table: str, columns: List[str]) -> List[str]:
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+
+    insert_new = (
+        f"INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.id, {new_values});"
+    )
+    delete_old = (
+        f"INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) "
+        f"VALUES ('delete', old.id, {old_values});"
+    )
+
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} "
+        f"BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} "
+        f"BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_update "
+        f"AFTER UPDATE OF {column_list} ON {table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def trigger_names() -> List[str]:
+    return [
+        f"{table}_fts_{event}"
+        for table, _ in SEARCH_TABLES.values()
+        for event in ("insert", "delete", "update")
+    ]
+
+
+def create_search_triggers(connection: Connection):
+    for fts_table, (table, columns) in SEARCH_TABLES.items():
+        for statement in _trigger_statements(fts_table, table, columns):
+            connection.execute(sa.text(statement))
+
+
+def drop_search_triggers(connection: Connection):
+    # bulk_import.py drops these while loading and rebuilds the indexes once at the end
+    for name in trigger_names():
+        connection.execute(sa.text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def create_search_tables(connection: Connection):
+    for fts_table, (table, columns) in SEARCH_TABLES.items():
+        connection.execute(
+            sa.text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} "
+                f"USING fts5({', '.join(columns)}, content='{table}', content_rowid='id', "
+                f"tokenize='{TOKENIZE}')"
+            )
+        )
+    create_search_triggers(connection)
+
+
+def drop_search_tables(connection: Connection):
+    # triggers go with their content tables - dropped here too in case those are kept
+    drop_search_triggers(connection)
+    for fts_table in SEARCH_TABLES:
+        connection.execute(sa.text(f"DROP TABLE IF EXISTS {fts_table}"))
+
+
+def rebuild_search(connection: Connection):
+    """
+    Rebuilds every full-text index from its content table
+    """
+    for fts_table in SEARCH_TABLES:
+        connection.execute(
+            sa.text(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+        )
+
+
+if __name__ == "__main__":
+    from BlogAPI.db.db_session import engine
+
+    with engine.begin() as conn:
+        create_search_tables(conn)
+        rebuild_search(conn)
+
+    print("Search indexes rebuilt successfully")
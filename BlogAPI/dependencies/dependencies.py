@@ -1,42 +1,128 @@
-import jwt
+import datetime
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional
+
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt import DecodeError, ExpiredSignatureError
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from BlogAPI.config import config_settings
 from BlogAPI.db.SQLAlchemy_models import User
-from BlogAPI.db.db_session import SessionLocal
+from BlogAPI.db.db_session_async import create_async_session
+from BlogAPI.util.cache import TTLCache
+from BlogAPI.util.revocation import revocation_list, get_token_id
+from BlogAPI.util.tokens import decode_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# cache of full User rows keyed by id - call invalidate_user whenever a user row changes
+USER_CACHE_ENABLED = getattr(config_settings, "user_cache_enabled", True)
+user_cache = TTLCache(
+    max_size=getattr(config_settings, "user_cache_size", 1024),
+    ttl=getattr(config_settings, "user_cache_ttl", 60),
+)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
+@dataclass(frozen=True)
+class Principal:
+    """
+    Authenticated caller built from verified token claims - only the user's existence is checked
+    """
+
+    id: int
+    username: str
+    # identify the token itself - used to revoke it on logout
+    token_id: Optional[str] = None
+    expires_at: Optional[datetime.datetime] = None
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
+
+async def revoke_access_token(session: AsyncSession, principal: Principal):
     """
-    Returns User object based on user_id stored in token(JWT)
+    Revokes the access token principal was built from - caller commits
     """
-    try:
-        user_info = jwt.decode(token, config_settings.secret_key, algorithms=["HS256"])
-        return db.query(User).get(user_info.get("id"))
+    if principal.token_id:
+        expires_at = principal.expires_at or (
+            datetime.datetime.utcnow()
+            + datetime.timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
+        await revocation_list.revoke(
+            session, principal.token_id, principal.id, expires_at
+        )
+
 
-    except HTTPException:
+def invalidate_user(user_id: int):
+    user_cache.invalidate(user_id)
+
+
+async def load_user(session: AsyncSession, user_id: int) -> Optional[User]:
+    """
+    Returns User row by id or None - from user_cache (a detached copy) when enabled
+    """
+    if USER_CACHE_ENABLED:
+        user = user_cache.get(user_id)
+        if user is not None:
+            return user
+
+    user = await session.get(User, user_id)
+
+    if user is not None and USER_CACHE_ENABLED:
+        # cache a detached copy so the row is never shared between request sessions
+        user_cache.set(
+            user.id,
+            User(
+                id=user.id,
+                username=user.username,
+                email=user.email,
+                hs_password=user.hs_password,
+            ),
+        )
+
+    return user
+
+
+@asynccontextmanager
+async def caller_must_exist(session: AsyncSession):
+    """
+    Wrap writes of rows owned by the caller - a foreign key failure there means the user was deleted
+    after the token was checked, so it is a 401 rather than a 500
+    """
+    try:
+        yield
+    except IntegrityError:
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid Username or Password",
         )
 
+
+async def get_async_db() -> AsyncSession:
+    """
+    Yields one AsyncSession per request - shared by every dependency/route that asks for it
+    FastAPI closes it once the response is sent
+    """
+    async with create_async_session() as session:
+        yield session
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """
+    Returns Principal (user id and username) stored in token(JWT)
+    Use when a route only needs who the caller is, not their full user row
+    Tokens outlive deleted users - the user is checked to still exist (user_cache covers the hot path)
+    and to still be the one the token was issued to, as SQLite hands a deleted user's id to the next new user
+    """
+    try:
+        user_info = decode_access_token(token)
+
     except DecodeError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -48,3 +134,55 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token is expired",
         )
+
+    if user_info.get("id") is None or user_info.get("username") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token",
+        )
+
+    # revoked (logged out) tokens - only touches database on a bloom filter hit
+    token_id = get_token_id(token, user_info)
+    if await revocation_list.is_revoked(session, token_id):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+        )
+
+    # token is valid but user no longer exists - or its id now belongs to someone else
+    user = await load_user(session, user_info["id"])
+    if user is None or user.username != user_info["username"]:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid Username or Password",
+        )
+
+    return Principal(
+        id=user_info["id"],
+        username=user_info["username"],
+        token_id=token_id,
+        expires_at=(
+            datetime.datetime.utcfromtimestamp(user_info.get("exp"))
+            if user_info.get("exp")
+            else None
+        ),
+    )
+
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_db),
+) -> User:
+    """
+    Returns User object based on user_id stored in token(JWT)
+    """
+    user = await load_user(session, principal.id)
+
+    # token is valid but user no longer exists
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid Username or Password",
+        )
+
+    return user
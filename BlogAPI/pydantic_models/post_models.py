@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 
 from pydantic import BaseModel
 
+from BlogAPI.pydantic_models.reply_models import ReplyOut, BatchItemError
+
 
 class NewPostIn(BaseModel):
     title: str
@@ -26,6 +28,7 @@ class PostOut(BaseModel):
     date_modified: Optional[datetime]
     user_id: int
     username: str
+    reply_count: int = 0
 
     class Config:
         orm_mode = True
@@ -38,10 +41,46 @@ class PostOut(BaseModel):
                 "date_modified": "null",
                 "user_id": 4376,
                 "username": "Matt",
+                "reply_count": 3,
             }
         }
 
 
+class PostWithRepliesOut(PostOut):
+    replies: List[ReplyOut] = []
+
+    class Config:
+        orm_mode = True
+        schema_extra = {
+            "example": {
+                "id": 74167,
+                "title": "My First Post",
+                "body": "Welcome to my blog",
+                "date_created": "2021-04-07 19:41:00.769100",
+                "date_modified": "null",
+                "user_id": 4376,
+                "username": "Matt",
+                "reply_count": 1,
+                "replies": [
+                    {
+                        "id": 94762,
+                        "body": "Great post!",
+                        "date_created": "2021-04-07 20:37:00.769100",
+                        "date_modified": "null",
+                        "user_id": 3819,
+                        "username": "Kim",
+                        "post_id": 74167,
+                    }
+                ],
+            }
+        }
+
+
+class PostsBatchOut(BaseModel):
+    created: List[PostOut]
+    errors: List[BatchItemError]
+
+
 class UpdatePostIn(BaseModel):
     title: Optional[str]
     body: Optional[str]
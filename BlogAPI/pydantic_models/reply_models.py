@@ -82,3 +82,28 @@ class Replies(BaseModel):
     class Config:
         orm_mode = True
         schema_extra = {"example": {"ids": [94762, 94801]}}
+
+
+class BatchItemError(BaseModel):
+    # position of the item in the request body
+    index: int
+    detail: List[dict]
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "index": 1,
+                "detail": [
+                    {
+                        "loc": ["body"],
+                        "msg": "field required",
+                        "type": "value_error.missing",
+                    }
+                ],
+            }
+        }
+
+
+class RepliesBatchOut(BaseModel):
+    created: List[ReplyOut]
+    errors: List[BatchItemError]
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class SearchResultOut(BaseModel):
+    # "post" or "reply"
+    type: str
+    id: int
+    # the post itself for posts, the post replied to for replies
+    post_id: int
+    title: str
+    snippet: str
+    user_id: int
+    username: str
+    date_created: datetime
+    # bm25 - lower is a better match
+    score: float
+
+    class Config:
+        orm_mode = True
+        schema_extra = {
+            "example": {
+                "type": "post",
+                "id": 498717,
+                "post_id": 498717,
+                "title": "My First Post",
+                "snippet": "…this is my first <mark>post</mark> on the blog…",
+                "user_id": 4376,
+                "username": "Matt",
+                "date_created": "2021-04-07 20:37:00.769100",
+                "score": -3.1415,
+            }
+        }
@@ -22,6 +22,10 @@ class UserOut(BaseModel):
     username: str
     email: EmailStr
     id: Optional[int] = None
+    post_count: int = 0
+    reply_count: int = 0
+    follower_count: int = 0
+    following_count: int = 0
 
     class Config:
         orm_mode = True
@@ -30,5 +34,20 @@ class UserOut(BaseModel):
                 "id": 4376,
                 "username": "Matt",
                 "email": "matt@example.com",
+                "post_count": 12,
+                "reply_count": 48,
+                "follower_count": 7,
+                "following_count": 3,
+            }
+        }
+
+
+class RefreshTokenIn(BaseModel):
+    refresh_token: str
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "refresh_token": "{refresh_token}",
             }
         }
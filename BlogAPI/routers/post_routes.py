@@ -1,21 +1,61 @@
 import datetime
-from typing import List
+from typing import Any, Dict, List, Optional
 
-from fastapi import Depends, APIRouter
-from fastapi import HTTPException, Query
-from sqlalchemy import desc, asc, select
+from fastapi import Depends, APIRouter, BackgroundTasks, Body
+from fastapi import HTTPException, Query, Request, Response
+from sqlalchemy import desc, asc, select, delete, update, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from BlogAPI.db.SQLAlchemy_models import Post, Reply, user_follow
+from BlogAPI.db.SQLAlchemy_models import Post, Reply, User, TimelineEntry, user_follow
 from BlogAPI.db.db_session_async import create_async_session
-from BlogAPI.dependencies.dependencies import get_current_user
+from BlogAPI.dependencies.dependencies import (
+    caller_must_exist,
+    get_current_user,
+    get_async_db,
+    get_current_principal,
+)
 from BlogAPI.pydantic_models.post_models import (
     NewPostIn,
     PostOut,
     UpdatePostOut,
     UpdatePostIn,
+    PostsBatchOut,
+)
+from BlogAPI.pydantic_models.reply_models import (
+    NewReplyIn,
+    ReplyOut,
+    RepliesBatchOut,
+)
+from BlogAPI.util.batch import (
+    check_batch_ids,
+    fetch_chunked,
+    validate_batch_items,
+    insert_many,
+)
+from BlogAPI.util.conditional import (
+    POST_VERSION_COLUMNS,
+    REPLY_VERSION_COLUMNS,
+    is_conditional,
+    check_not_modified,
+    set_validators,
+    post_validators,
+    posts_etag,
+    replies_etag,
+)
+from BlogAPI.util.fast_json import fast_json_enabled, fast_json_response
+from BlogAPI.util.feed_cache import feed_cache, memory_feed_enabled
+from BlogAPI.util.fields import parse_fields, project, sparse_response
+from BlogAPI.util.includes import parse_include, replies_response, first_replies
+from BlogAPI.util.pagination import NEXT_CURSOR_HEADER, after_cursor, set_next_cursor
+from BlogAPI.util.response_cache import response_cache
+from BlogAPI.util.timeline import timelines_enabled, fan_out_post
+from BlogAPI.util.trending import (
+    post_score,
+    add_reply_events,
+    encode_trending_cursor,
+    decode_trending_cursor,
 )
-from BlogAPI.pydantic_models.reply_models import NewReplyIn, ReplyOut
 
 router = APIRouter()
 
@@ -23,7 +63,9 @@ router = APIRouter()
 @router.post("/post", response_model=PostOut, status_code=201)
 async def create_post(
     new_post: NewPostIn,
-    user=Depends(get_current_user),
+    background_tasks: BackgroundTasks,
+    user=Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_db),
 ):
     """
     # Create a new post
@@ -40,21 +82,120 @@ async def create_post(
     ```
     """
 
+    now = datetime.datetime.utcnow()
     post = Post(
         title=new_post.title,
         body=new_post.body,
+        date_created=now,
         user_id=user.id,
         username=user.username,
+        trending_score=post_score(now),
     )
 
-    async with create_async_session() as session:
+    async with caller_must_exist(session):
         session.add(post)
+        await session.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(post_count=User.post_count + 1)
+        )
         await session.commit()
-        await session.refresh(post)
+    await session.refresh(post)
+
+    response_cache.invalidate(
+        ("user", user.id), ("user-posts", user.id), ("recent-posts",)
+    )
+
+    # copy into followers' timelines after the response is sent
+    if timelines_enabled():
+        background_tasks.add_task(fan_out_post, post.id, user.id, post.date_created)
+
+    if memory_feed_enabled():
+        feed_cache.add_post(user.id, post.id, post.date_created)
 
     return post
 
 
+@router.post(
+    "/posts/batch",
+    response_model=PostsBatchOut,
+    status_code=201,
+    responses={
+        400: {
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Too many items - at most 100 per request"}
+                }
+            }
+        }
+    },
+)
+async def create_posts_batch(
+    background_tasks: BackgroundTasks,
+    new_posts: List[Dict[str, Any]] = Body(
+        ...,
+        example=[
+            {"title": "My First Post", "body": "Welcome to my blog"},
+            {"title": "My Second Post", "body": "Still here"},
+        ],
+    ),
+    user=Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_db),
+):
+    """
+    # Create several new posts
+    Takes a list of posts (at most 100) and stores them in the database in one transaction.\\
+    Each post is validated on its own - invalid posts are reported in errors (by their index in the list)
+    and the rest are still created. When no post is valid nothing is created and the errors come back with a 422.
+
+    ---
+
+    ### Authorization Header
+    Must include:
+    ```
+    {
+        "Authorization": "Bearer {token}"
+    }
+    ```
+    """
+    valid, errors = validate_batch_items(new_posts, NewPostIn)
+
+    now = datetime.datetime.utcnow()
+    rows = [
+        {
+            "title": new_post.title,
+            "body": new_post.body,
+            "date_created": now,
+            "user_id": user.id,
+            "username": user.username,
+            "trending_score": post_score(now),
+        }
+        for new_post in valid
+    ]
+    async with caller_must_exist(session):
+        posts = await insert_many(session, Post, rows, Post.user_id == user.id)
+
+        await session.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(post_count=User.post_count + len(posts))
+        )
+        await session.commit()
+
+    response_cache.invalidate(
+        ("user", user.id), ("user-posts", user.id), ("recent-posts",)
+    )
+
+    for post in posts:
+        if timelines_enabled():
+            background_tasks.add_task(fan_out_post, post.id, user.id, post.date_created)
+
+        if memory_feed_enabled():
+            feed_cache.add_post(user.id, post.id, post.date_created)
+
+    return {"created": posts, "errors": errors}
+
+
 @router.put(
     "/post/{post_id}",
     response_model=UpdatePostOut,
@@ -72,6 +213,7 @@ async def update_post(
     post_id,
     updated_post: UpdatePostIn,
     user=Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_db),
 ):
     """
     # Update specified post
@@ -88,28 +230,29 @@ async def update_post(
     ```
     """
     # get post user editing
-    async with create_async_session() as session:
-        query = select(Post).filter(Post.id == post_id)
-        result = await session.execute(query)
+    query = select(Post).filter(Post.id == post_id)
+    result = await session.execute(query)
 
-        post = result.scalar_one_or_none()
+    post = result.scalar_one_or_none()
 
-        # verify post belongs to authorized user
-        if post.user_id != user.id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="This post belongs to another user",
-            )
+    # verify post belongs to authorized user
+    if post.user_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="This post belongs to another user",
+        )
 
-        # update and store in database
-        if updated_post.title:
-            post.title = updated_post.title
-        if updated_post.body:
-            post.body = updated_post.body
+    # update and store in database
+    if updated_post.title:
+        post.title = updated_post.title
+    if updated_post.body:
+        post.body = updated_post.body
 
-        post.date_modified = datetime.datetime.utcnow()
+    post.date_modified = datetime.datetime.utcnow()
 
-        await session.commit()
+    await session.commit()
+
+    response_cache.invalidate(("post", post.id))
 
     return post
 
@@ -140,6 +283,7 @@ async def update_post(
 async def delete_post(
     post_id,
     user=Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_db),
 ):
     """
     # Delete specified post
@@ -156,27 +300,59 @@ async def delete_post(
     ```
     """
 
-    try:
-        async with create_async_session() as session:
-            query = select(Post).filter(Post.id == post_id)
-            result = await session.execute(query)
-
-        post = result.scalar_one_or_none()
+    # only the owner is needed - the post itself is never loaded
+    query = select(Post.id, Post.user_id).filter(Post.id == post_id)
+    result = await session.execute(query)
+    post = result.one_or_none()
 
-        if post.user_id != user.id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="This post belongs to another user",
-            )
-
-    except AttributeError:
+    if post is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="This post does not exist"
         )
 
-    async with create_async_session() as session:
-        await session.delete(post)
-        await session.commit()
+    if post.user_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="This post belongs to another user",
+        )
+
+    # take the post's replies off their authors' reply counts before they are deleted
+    result = await session.execute(
+        select(Reply.user_id).where(Reply.post_id == post.id).distinct()
+    )
+    reply_user_ids = list(result.scalars())
+
+    replies_per_user = (
+        select(func.count(Reply.id))
+        .where(Reply.post_id == post.id, Reply.user_id == User.id)
+        .scalar_subquery()
+    )
+    await session.execute(
+        update(User)
+        .where(User.id.in_(reply_user_ids))
+        .values(reply_count=User.reply_count - replies_per_user)
+        .execution_options(synchronize_session=False)
+    )
+    await session.execute(
+        update(User)
+        .where(User.id == post.user_id)
+        .values(post_count=User.post_count - 1)
+    )
+
+    # one statement - the database cascades to the post's replies and timeline entries
+    await session.execute(delete(Post).where(Post.id == post.id))
+    await session.commit()
+
+    if memory_feed_enabled():
+        feed_cache.remove_post(post.user_id, post.id)
+
+    response_cache.invalidate(
+        ("post", post.id),
+        ("user", post.user_id),
+        ("user-posts", post.user_id),
+        ("recent-posts",),
+        *(("user", user_id) for user_id in reply_user_ids),
+    )
 
     return {"detail": "success"}
 
@@ -192,29 +368,68 @@ async def delete_post(
         }
     },
 )
-async def get_post(post_id):
+async def get_post(post_id, request: Request, response: Response):
     """
     # Return specified post
+    Sends ETag and Last-Modified headers - pass them back as If-None-Match/If-Modified-Since
+    to get an empty 304 response while the post is unchanged.
     """
-    async with create_async_session() as session:
-        query = select(Post).filter(Post.id == post_id)
-        result = await session.execute(query)
-
-    post = result.scalar_one_or_none()
+    key = ("get_post", post_id)
+    post = response_cache.get(key)
 
     if post is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="This post does not exist"
-        )
+        version = response_cache.version
+        async with create_async_session() as session:
+            if is_conditional(request):
+                # revalidate from the version columns before loading the full row
+                query = select(*POST_VERSION_COLUMNS).filter(Post.id == post_id)
+                result = await session.execute(query)
+                row = result.first()
+
+                if row is not None:
+                    not_modified = check_not_modified(request, *post_validators(row))
+                    if not_modified is not None:
+                        return not_modified
+
+            query = select(Post).filter(Post.id == post_id)
+            result = await session.execute(query)
+
+        post = result.scalar_one_or_none()
+
+        if post is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="This post does not exist",
+            )
+
+        post = PostOut.from_orm(post)
+        response_cache.set(key, post, [("post", post.id)], version)
 
+    not_modified = check_not_modified(request, *post_validators(post))
+    if not_modified is not None:
+        return not_modified
+
+    set_validators(response, *post_validators(post))
     return post
 
 
-@router.post("/post/{post_id}/reply", response_model=ReplyOut, status_code=201)
+@router.post(
+    "/post/{post_id}/reply",
+    response_model=ReplyOut,
+    status_code=201,
+    responses={
+        404: {
+            "content": {
+                "application/json": {"example": {"detail": "This post does not exist"}}
+            }
+        }
+    },
+)
 async def create_reply(
     post_id: int,
     new_reply: NewReplyIn,
-    user=Depends(get_current_user),
+    user=Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_db),
 ):
     """
     # Create new reply
@@ -231,6 +446,18 @@ async def create_reply(
     ```
     """
 
+    # bump post's counter - also tells us whether the post exists
+    result = await session.execute(
+        update(Post).where(Post.id == post_id).values(reply_count=Post.reply_count + 1)
+    )
+
+    if result.rowcount == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="This post does not exist"
+        )
+
+    await add_reply_events(session, post_id)
+
     reply = Reply(
         body=new_reply.body,
         user_id=user.id,
@@ -238,26 +465,125 @@ async def create_reply(
         post_id=post_id,
     )
 
-    async with create_async_session() as session:
+    async with caller_must_exist(session):
         session.add(reply)
+        await session.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(reply_count=User.reply_count + 1)
+        )
         await session.commit()
+
+    response_cache.invalidate(("post", post_id), ("user", user.id))
     return reply
 
 
+@router.post(
+    "/post/{post_id}/replies/batch",
+    response_model=RepliesBatchOut,
+    status_code=201,
+    responses={
+        400: {
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Too many items - at most 100 per request"}
+                }
+            }
+        },
+        404: {
+            "content": {
+                "application/json": {"example": {"detail": "This post does not exist"}}
+            }
+        },
+    },
+)
+async def create_replies_batch(
+    post_id: int,
+    new_replies: List[Dict[str, Any]] = Body(
+        ..., example=[{"body": "Great post!"}, {"body": "Can't wait for the next one"}]
+    ),
+    user=Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_db),
+):
+    """
+    # Create several new replies
+    Takes a list of replies (at most 100) to specified post and stores them in the database in one transaction.\\
+    Each reply is validated on its own - invalid replies are reported in errors (by their index in the list)
+    and the rest are still created. When no reply is valid nothing is created and the errors come back with a 422.
+
+    ---
+
+    ### Authorization Header
+    Must include:
+    ```
+    {
+        "Authorization": "Bearer {token}"
+    }
+    ```
+    """
+    valid, errors = validate_batch_items(new_replies, NewReplyIn)
+
+    # bump post's counter - also tells us whether the post exists
+    result = await session.execute(
+        update(Post)
+        .where(Post.id == post_id)
+        .values(reply_count=Post.reply_count + len(valid))
+    )
+
+    if result.rowcount == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="This post does not exist"
+        )
+
+    await add_reply_events(session, post_id, len(valid))
+
+    rows = [
+        {
+            "body": new_reply.body,
+            "user_id": user.id,
+            "username": user.username,
+            "post_id": post_id,
+        }
+        for new_reply in valid
+    ]
+    async with caller_must_exist(session):
+        replies = await insert_many(
+            session, Reply, rows, Reply.user_id == user.id, Reply.post_id == post_id
+        )
+
+        await session.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(reply_count=User.reply_count + len(replies))
+        )
+        await session.commit()
+
+    response_cache.invalidate(("post", post_id), ("user", user.id))
+    return {"created": replies, "errors": errors}
+
+
 # noinspection DuplicatedCode
 # keeping docstrings/queries as is instead of refactoring into 1 function - more readable
 @router.get("/post/{post_id}/replies", response_model=List[ReplyOut])
 async def get_posts_replies(
+    request: Request,
+    response: Response,
     post_id: int,
     skip: int = 0,
     limit: int = Query(10, ge=0, le=25),
     sort_newest_first: bool = Query(True, alias="sort-newest-first"),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
 ):
     """
     # Returns all replies to specified post
-    Use skip and limit for pagination.\\
-    Sortable by date created (by default returns newest).
+    Use cursor and limit for pagination - pass the X-Next-Cursor response header as cursor for the next page.\\
+    skip is still supported but gets slower the deeper the page.\\
+    Sortable by date created (by default returns newest).\\
+    Pass fields to return only those fields - e.g. fields=id,body,username
     """
+    fields = parse_fields(fields, ReplyOut)
+
     if sort_newest_first:
         sort_by = desc
     else:
@@ -267,14 +593,42 @@ async def get_posts_replies(
         query = (
             select(Reply)
             .filter(Reply.post_id == post_id)
-            .order_by(sort_by(Reply.date_created))
-            .offset(skip)
+            .order_by(sort_by(Reply.date_created), sort_by(Reply.id))
             .limit(limit)
         )
 
-        replies = await session.execute(query)
+        if cursor:
+            query = query.filter(
+                after_cursor(cursor, Reply.date_created, Reply.id, sort_newest_first)
+            )
+        else:
+            query = query.offset(skip)
+
+        if is_conditional(request):
+            # revalidate from the version columns before loading reply bodies
+            versions = await session.execute(
+                query.with_only_columns(*REPLY_VERSION_COLUMNS)
+            )
+            not_modified = check_not_modified(request, replies_etag(list(versions)))
+            if not_modified is not None:
+                return not_modified
 
-    return list(replies.scalars())
+        if fields:
+            replies = await session.execute(
+                query.with_only_columns(*project(Reply, fields, REPLY_VERSION_COLUMNS))
+            )
+            replies = list(replies)
+        else:
+            replies = await session.execute(query)
+            replies = list(replies.scalars())
+
+    set_validators(response, replies_etag(replies))
+    set_next_cursor(response, replies, limit)
+    if fields:
+        return sparse_response(response, replies, ReplyOut, fields)
+    if fast_json_enabled():
+        return fast_json_response(response, replies, ReplyOut)
+    return replies
 
 
 @router.get(
@@ -287,18 +641,69 @@ async def get_posts_replies(
     },
 )
 async def get_recent_posts_from_all_users(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = Query(10, ge=0, le=25),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    replies_per_post: int = Query(3, ge=1, le=25, alias="replies-per-post"),
 ):
     """
     # Returns list of recent posts from all users
-    Useful for a home/front page blog site before login
+    Useful for a home/front page blog site before login.\\
+    Use cursor and limit for pagination - pass the X-Next-Cursor response header as cursor for the next page.\\
+    Pass fields to return only those fields - e.g. fields=id,title,username,date_created\\
+    Pass include=replies to nest each post's first replies (replies-per-post, default 3) - e.g. include=replies&replies-per-post=5
     """
+    fields = parse_fields(fields, PostOut)
+    include = parse_include(include, fields)
+
+    key = ("recent-posts", skip, limit, cursor)
+    # sparse pages are not cached - they are already cheap to build
+    cached = None if fields else response_cache.get(key)
+    if cached is not None:
+        not_modified = check_not_modified(request, posts_etag(cached))
+        if not_modified is not None:
+            return not_modified
+
+        set_validators(response, posts_etag(cached))
+        set_next_cursor(response, cached, limit)
+        if "replies" in include:
+            return await replies_response(request, response, cached, replies_per_post)
+        if fast_json_enabled():
+            return fast_json_response(response, cached, PostOut)
+        return cached
+
+    version = response_cache.version
     async with create_async_session() as session:
-        query = select(Post).order_by(desc(Post.date_created)).offset(skip).limit(limit)
+        query = (
+            select(Post).order_by(desc(Post.date_created), desc(Post.id)).limit(limit)
+        )
 
-        posts = await session.execute(query)
-        posts = list(posts.scalars())
+        if cursor:
+            query = query.filter(after_cursor(cursor, Post.date_created, Post.id))
+        else:
+            query = query.offset(skip)
+
+        if is_conditional(request):
+            # revalidate from the version columns before loading post bodies
+            versions = await session.execute(
+                query.with_only_columns(*POST_VERSION_COLUMNS)
+            )
+            not_modified = check_not_modified(request, posts_etag(list(versions)))
+            if not_modified is not None:
+                return not_modified
+
+        if fields:
+            posts = await session.execute(
+                query.with_only_columns(*project(Post, fields, POST_VERSION_COLUMNS))
+            )
+            posts = list(posts)
+        else:
+            posts = await session.execute(query)
+            posts = list(posts.scalars())
 
         if not posts:
             raise HTTPException(
@@ -306,44 +711,197 @@ async def get_recent_posts_from_all_users(
                 detail="No posts founds",
             )
 
+    if fields:
+        set_validators(response, posts_etag(posts))
+        set_next_cursor(response, posts, limit)
+        return sparse_response(response, posts, PostOut, fields)
+
+    posts = [PostOut.from_orm(post) for post in posts]
+    response_cache.set(
+        key,
+        posts,
+        [("recent-posts",), *(("post", post.id) for post in posts)],
+        version,
+    )
+
+    set_validators(response, posts_etag(posts))
+    set_next_cursor(response, posts, limit)
+    if "replies" in include:
+        return await replies_response(request, response, posts, replies_per_post)
+    if fast_json_enabled():
+        return fast_json_response(response, posts, PostOut)
+    return posts
+
+
+@router.get(
+    "/posts/trending",
+    response_model=List[PostOut],
+    responses={
+        404: {
+            "content": {"application/json": {"example": {"detail": "No posts founds"}}}
+        }
+    },
+)
+async def get_trending_posts(
+    request: Request,
+    response: Response,
+    limit: int = Query(10, ge=0, le=25),
+    cursor: Optional[str] = None,
+    include: Optional[str] = None,
+    replies_per_post: int = Query(3, ge=1, le=25, alias="replies-per-post"),
+):
+    """
+    # Returns list of trending posts from all users
+    Ranked by recent activity - every reply counts towards a post's score, newer replies and posts count more.\\
+    Use cursor and limit for pagination - pass the X-Next-Cursor response header as cursor for the next page.\\
+    Pass include=replies to nest each post's first replies (replies-per-post, default 3) - e.g. include=replies&replies-per-post=5
+    """
+    include = parse_include(include)
+
+    async with create_async_session() as session:
+        query = (
+            select(Post).order_by(desc(Post.trending_score), desc(Post.id)).limit(limit)
+        )
+
+        if cursor:
+            query = query.filter(
+                tuple_(Post.trending_score, Post.id)
+                < tuple_(*decode_trending_cursor(cursor))
+            )
+
+        result = await session.execute(query)
+        posts = list(result.scalars())
+
+    if not posts:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No posts founds",
+        )
+
+    if len(posts) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_trending_cursor(
+            posts[-1].trending_score, posts[-1].id
+        )
+
+    # order is part of the ETag - a page that was re-ranked is modified
+    not_modified = check_not_modified(request, posts_etag(posts))
+    if not_modified is not None:
+        return not_modified
+
+    set_validators(response, posts_etag(posts))
+    if "replies" in include:
+        # same as the other list routes - swaps in an ETag that covers the nested replies and checks it
+        return await replies_response(request, response, posts, replies_per_post)
+    if fast_json_enabled():
+        return fast_json_response(response, posts, PostOut)
     return posts
 
 
 @router.get("/posts/following", response_model=List[PostOut])
 async def get_following_posts(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = Query(10, ge=0, le=25),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    replies_per_post: int = Query(3, ge=1, le=25, alias="replies-per-post"),
     user=Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_db),
 ):
-    """# Returns a list of posts from all users that the current user is following"""
-    # get list of user_ids following from database
-    async with create_async_session() as session:
+    """
+    # Returns a list of posts from all users that the current user is following
+    Use cursor and limit for pagination - pass the X-Next-Cursor response header as cursor for the next page.\\
+    Pass fields to return only those fields - e.g. fields=id,title,username,date_created\\
+    Pass include=replies to nest each post's first replies (replies-per-post, default 3) - e.g. include=replies&replies-per-post=5
+    """
+    fields = parse_fields(fields, PostOut)
+    include = parse_include(include, fields)
+
+    if memory_feed_enabled():
+        # merge cached per author post lists, posts read by primary key only
+        posts = await feed_cache.build_feed(session, user.id, limit, skip, cursor)
+
+        if not posts:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No posts found",
+            )
+
+        set_next_cursor(response, posts, limit)
+        if fields:
+            # posts come from feed cache's primary key lookup - only the response is trimmed
+            return sparse_response(response, posts, PostOut, fields)
+        if "replies" in include:
+            return await replies_response(request, response, posts, replies_per_post)
+        if fast_json_enabled():
+            return fast_json_response(response, posts, PostOut)
+        return posts
+
+    if timelines_enabled():
+        # read page straight from user's materialized timeline
+        query = (
+            select(Post)
+            .join(TimelineEntry, TimelineEntry.post_id == Post.id)
+            .filter(TimelineEntry.user_id == user.id)
+            .order_by(desc(TimelineEntry.date_created), desc(TimelineEntry.post_id))
+            .limit(limit)
+        )
+
+        if cursor:
+            query = query.filter(
+                after_cursor(cursor, TimelineEntry.date_created, TimelineEntry.post_id)
+            )
+        else:
+            query = query.offset(skip)
+
+    else:
+        # get list of user_ids following from database
         query = select(user_follow.c.user_id).filter(
             user_follow.c.following_id == user.id
         )
         result = await session.execute(query)
 
-    following_ids = list(result.scalars())
+        following_ids = list(result.scalars())
 
-    # get posts of users
-    async with create_async_session() as session:
+        # get posts of users
         query = (
             select(Post)
             .filter(Post.user_id.in_(following_ids))
-            .order_by(desc(Post.date_created))
-            .offset(skip)
+            .order_by(desc(Post.date_created), desc(Post.id))
             .limit(limit)
         )
 
+        if cursor:
+            query = query.filter(after_cursor(cursor, Post.date_created, Post.id))
+        else:
+            query = query.offset(skip)
+
+    if fields:
+        posts = await session.execute(
+            query.with_only_columns(
+                *project(Post, fields, [Post.id, Post.date_created])
+            )
+        )
+        posts = list(posts)
+    else:
         posts = await session.execute(query)
         posts = list(posts.scalars())
 
-        if not posts:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No posts found",
-            )
+    if not posts:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No posts found",
+        )
 
+    set_next_cursor(response, posts, limit)
+    if fields:
+        return sparse_response(response, posts, PostOut, fields)
+    if "replies" in include:
+        return await replies_response(request, response, posts, replies_per_post)
+    if fast_json_enabled():
+        return fast_json_response(response, posts, PostOut)
     return posts
 
 
@@ -360,25 +918,40 @@ async def get_following_posts(
         }
     },
 )
-async def get_replies_from_posts(ids: List[int] = Query(None)):
+async def get_replies_from_posts(
+    response: Response,
+    ids: List[int] = Query(None),
+    limit: int = Query(100, ge=1, le=500),
+    replies_per_post: int = Query(25, ge=1, le=100, alias="replies-per-post"),
+    cursor: Optional[str] = None,
+):
     """# Returns a list of all replies for each post specified by post_id.
-    Takes in a list of post ids. Good for getting multiple replies in 1 query."""
-    async with create_async_session() as session:
-        # Pycharm warning .in_ below - functions as expected
-        # noinspection PyUnresolvedReferences
-        query = (
-            select(Reply)
-            .filter(Reply.post_id.in_(ids))
-            .order_by(asc(Reply.date_created))
-        )
+    Takes in a list of post ids (at most 100). Good for getting multiple replies in 1 query.\\
+    Returns the first replies-per-post replies of each post, oldest first, limit replies at a time -
+    pass the X-Next-Cursor response header as cursor for the next page."""
+    ids = check_batch_ids(ids)
+
+    def build_query(chunk: List[int]):
+        query, reply = first_replies(chunk, replies_per_post)
+        query = query.order_by(reply.date_created, reply.id).limit(limit)
+
+        if cursor:
+            query = query.filter(
+                after_cursor(cursor, reply.date_created, reply.id, newest_first=False)
+            )
 
-        replies = await session.execute(query)
-        replies = list(replies.scalars())
+        return query
 
-        if not replies:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="These replies do not exist",
-            )
+    async with create_async_session() as session:
+        replies = await fetch_chunked(session, build_query, ids, limit)
+
+    if not replies and not cursor:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="These replies do not exist",
+        )
 
+    set_next_cursor(response, replies, limit)
+    if fast_json_enabled():
+        return fast_json_response(response, replies, ReplyOut)
     return replies
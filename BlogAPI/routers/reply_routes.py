@@ -1,19 +1,32 @@
 import datetime
-from typing import List
+from typing import List, Optional
 
-from fastapi import Depends, APIRouter, HTTPException
-from sqlalchemy import select, asc
+from fastapi import Depends, APIRouter, HTTPException, Query, Request, Response
+from sqlalchemy import select, asc, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from BlogAPI.db.SQLAlchemy_models import Reply
+from BlogAPI.db.SQLAlchemy_models import Reply, Post, User
 from BlogAPI.db.db_session_async import create_async_session
-from BlogAPI.dependencies.dependencies import get_current_user
+from BlogAPI.dependencies.dependencies import get_current_user, get_async_db
 from BlogAPI.pydantic_models.reply_models import (
     UpdateReplyOut,
     UpdateReplyIn,
     ReplyOut,
     Replies,
 )
+from BlogAPI.util.batch import check_batch_ids, fetch_chunked
+from BlogAPI.util.conditional import (
+    REPLY_VERSION_COLUMNS,
+    is_conditional,
+    check_not_modified,
+    set_validators,
+    reply_validators,
+)
+from BlogAPI.util.fast_json import fast_json_enabled, fast_json_response
+from BlogAPI.util.pagination import after_cursor, set_next_cursor
+from BlogAPI.util.response_cache import response_cache
+from BlogAPI.util.trending import remove_reply_event
 
 router = APIRouter()
 
@@ -35,6 +48,7 @@ async def update_reply(
     reply_id,
     updated_reply: UpdateReplyIn,
     user=Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_db),
 ):
     # docstring in markdown for OpenAPI docs
     """
@@ -51,23 +65,24 @@ async def update_reply(
     }
     ```
     """
-    async with create_async_session() as session:
-        query = select(Reply).filter(Reply.id == reply_id)
-        result = await session.execute(query)
+    query = select(Reply).filter(Reply.id == reply_id)
+    result = await session.execute(query)
 
-        reply = result.scalar_one_or_none()
+    reply = result.scalar_one_or_none()
 
-        # make sure reply belongs to current user
-        if reply.user_id != user.id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="This reply belongs to another user",
-            )
+    # make sure reply belongs to current user
+    if reply.user_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="This reply belongs to another user",
+        )
+
+    reply.body = updated_reply.body
+    reply.date_modified = datetime.datetime.utcnow()
 
-        reply.body = updated_reply.body
-        reply.date_modified = datetime.datetime.utcnow()
+    await session.commit()
 
-        await session.commit()
+    response_cache.invalidate(("reply", reply.id))
 
     return reply
 
@@ -98,6 +113,7 @@ async def update_reply(
 async def delete_reply(
     reply_id,
     user=Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_db),
 ):
     """
     # Delete specified reply
@@ -116,9 +132,8 @@ async def delete_reply(
 
     # make sure reply exists - goes to except if it does not
     try:
-        async with create_async_session() as session:
-            query = select(Reply).filter(Reply.id == reply_id)
-            result = await session.execute(query)
+        query = select(Reply).filter(Reply.id == reply_id)
+        result = await session.execute(query)
 
         reply = result.scalar_one_or_none()
 
@@ -134,29 +149,73 @@ async def delete_reply(
             status_code=status.HTTP_404_NOT_FOUND, detail="This reply does not exist"
         )
 
-    async with create_async_session() as session:
-        await session.delete(reply)
-        await session.commit()
+    await session.execute(
+        update(Post)
+        .where(Post.id == reply.post_id)
+        .values(reply_count=Post.reply_count - 1)
+    )
+    await remove_reply_event(session, reply.post_id, reply.date_created)
+    await session.execute(
+        update(User)
+        .where(User.id == reply.user_id)
+        .values(reply_count=User.reply_count - 1)
+    )
+    await session.execute(delete(Reply).where(Reply.id == reply.id))
+    await session.commit()
+
+    response_cache.invalidate(
+        ("reply", reply.id), ("post", reply.post_id), ("user", reply.user_id)
+    )
 
     return {"detail": "success"}
 
 
 @router.get("/reply/{reply_id}", response_model=ReplyOut)
-async def get_reply(reply_id):
+async def get_reply(reply_id, request: Request, response: Response):
     """
     # Return specified reply
+    Sends ETag and Last-Modified headers - pass them back as If-None-Match/If-Modified-Since
+    to get an empty 304 response while the reply is unchanged.
     """
-    async with create_async_session() as session:
-        query = select(Reply).filter(Reply.id == reply_id)
-        result = await session.execute(query)
+    key = ("get_reply", reply_id)
+    reply = response_cache.get(key)
 
-    reply = result.scalar_one_or_none()
+    if reply is None:
+        version = response_cache.version
+        async with create_async_session() as session:
+            if is_conditional(request):
+                # revalidate from the version columns before loading the full row
+                query = select(*REPLY_VERSION_COLUMNS).filter(Reply.id == reply_id)
+                result = await session.execute(query)
+                row = result.first()
 
-    if not reply:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="This reply does not exist"
+                if row is not None:
+                    not_modified = check_not_modified(request, *reply_validators(row))
+                    if not_modified is not None:
+                        return not_modified
+
+            query = select(Reply).filter(Reply.id == reply_id)
+            result = await session.execute(query)
+
+        reply = result.scalar_one_or_none()
+
+        if not reply:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="This reply does not exist",
+            )
+
+        reply = ReplyOut.from_orm(reply)
+        # post tag too - deleting a post takes its replies with it
+        response_cache.set(
+            key, reply, [("reply", reply.id), ("post", reply.post_id)], version
         )
 
+    not_modified = check_not_modified(request, *reply_validators(reply))
+    if not_modified is not None:
+        return not_modified
+
+    set_validators(response, *reply_validators(reply))
     return reply
 
 
@@ -199,24 +258,44 @@ async def get_reply(reply_id):
     },
     response_model=List[ReplyOut],
 )
-async def get_replies_by_ids(replies: Replies):
-    """# Returns all replies specified. Takes in a list of reply ids. Good for getting multiple replies in 1 query."""
-    async with create_async_session() as session:
+async def get_replies_by_ids(
+    replies: Replies,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """# Returns all replies specified. Takes in a list of reply ids (at most 100). Good for getting multiple replies in 1 query.
+    Returns limit replies at a time, oldest first - pass the X-Next-Cursor response header as cursor for the next page.
+    """
+    ids = check_batch_ids(replies.ids)
+
+    def build_query(chunk: List[int]):
         # Pycharm warning .in_ below - functions as expected
         # noinspection PyUnresolvedReferences
         query = (
             select(Reply)
-            .filter(Reply.id.in_(replies.ids))
-            .order_by(asc(Reply.date_created))
+            .filter(Reply.id.in_(chunk))
+            .order_by(asc(Reply.date_created), asc(Reply.id))
+            .limit(limit)
         )
 
-        replies = await session.execute(query)
-        replies = list(replies.scalars())
-
-        if not replies:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="These replies do not exist",
+        if cursor:
+            query = query.filter(
+                after_cursor(cursor, Reply.date_created, Reply.id, newest_first=False)
             )
 
+        return query
+
+    async with create_async_session() as session:
+        replies = await fetch_chunked(session, build_query, ids, limit)
+
+    if not replies and not cursor:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="These replies do not exist",
+        )
+
+    set_next_cursor(response, replies, limit)
+    if fast_json_enabled():
+        return fast_json_response(response, replies, ReplyOut)
     return replies
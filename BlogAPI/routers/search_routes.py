@@ -0,0 +1,51 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Query, Response
+
+from BlogAPI.db.db_session_async import create_async_session
+from BlogAPI.pydantic_models.search_models import SearchResultOut
+from BlogAPI.util.pagination import NEXT_CURSOR_HEADER
+from BlogAPI.util.search import search_query, search_result, encode_search_cursor
+
+router = APIRouter()
+
+
+@router.get(
+    "/search",
+    response_model=List[SearchResultOut],
+    responses={
+        400: {
+            "content": {
+                "application/json": {"example": {"detail": "No search terms given"}}
+            }
+        }
+    },
+)
+async def search(
+    response: Response,
+    q: str,
+    limit: int = Query(10, ge=0, le=25),
+    cursor: Optional[str] = None,
+    search_in: Optional[str] = Query(None, alias="in", regex="^(post|reply)$"),
+):
+    """
+    # Full-text search over posts and replies
+    Returns best matches first - post titles weigh more than post/reply bodies.\\
+    Every word in q must match - end a word with * to match it as a prefix (e.g. q=fast*).\\
+    snippet is HTML - post/reply text in it is escaped and matched words are wrapped in &lt;mark&gt; tags.\\
+    Pass in=post or in=reply to search only one of them.\\
+    Use cursor and limit for pagination - pass the X-Next-Cursor response header as cursor for the next page.
+    """
+    query = search_query(q, limit, cursor, search_in)
+
+    async with create_async_session() as session:
+        result = await session.execute(query)
+        results = [search_result(row) for row in result]
+
+    if results and len(results) == limit:
+        last = results[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_search_cursor(
+            last["score"], last["type"], last["id"]
+        )
+
+    return results
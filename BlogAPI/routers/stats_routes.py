@@ -0,0 +1,222 @@
+from fastapi import APIRouter, Depends, HTTPException
+from starlette import status
+
+from BlogAPI.config import config_settings
+from BlogAPI.db.db_session_async import get_pool_stats
+from BlogAPI.dependencies.dependencies import user_cache
+from BlogAPI.util.feed_cache import feed_cache
+from BlogAPI.util.password_hashing import password_hasher
+from BlogAPI.util.response_cache import response_cache
+from BlogAPI.util.revocation import revocation_list
+from BlogAPI.util.tokens import token_cache
+
+# internal numbers (pool, caches, revocations) - off unless turned on in config, never in the docs
+STATS_ENABLED = getattr(config_settings, "stats_enabled", False)
+
+
+def stats_enabled() -> bool:
+    return STATS_ENABLED
+
+
+def require_stats_enabled():
+    # 404 rather than 403 - the endpoints don't exist as far as the public is concerned
+    if not stats_enabled():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+router = APIRouter(dependencies=[Depends(require_stats_enabled)])
+
+
+@router.get(
+    "/stats/db",
+    responses={
+        200: {
+            "content": {
+                "application/json": {
+                    "example": {
+                        "initialized": True,
+                        "size": 5,
+                        "checked_in": 2,
+                        "checked_out": 1,
+                        "overflow": -2,
+                        "max_overflow": 10,
+                        "status": "Pool size: 5  Connections in pool: 2 "
+                        "Current Overflow: -2 Current Checked out connections: 1",
+                    }
+                }
+            }
+        }
+    },
+)
+async def get_db_stats():
+    """
+    # Returns database connection pool statistics
+    Useful for sizing the pool settings in config.
+    """
+    return get_pool_stats()
+
+
+@router.get(
+    "/stats/user-cache",
+    responses={
+        200: {
+            "content": {
+                "application/json": {
+                    "example": {
+                        "size": 12,
+                        "max_size": 1024,
+                        "ttl": 60,
+                        "hits": 340,
+                        "misses": 15,
+                        "hit_ratio": 0.9577,
+                    }
+                }
+            }
+        }
+    },
+)
+async def get_user_cache_stats():
+    """
+    # Returns authenticated user cache statistics
+    """
+    return user_cache.stats()
+
+
+@router.get(
+    "/stats/password-hashing",
+    responses={
+        200: {
+            "content": {
+                "application/json": {
+                    "example": {
+                        "max_workers": 4,
+                        "max_queue": 32,
+                        "in_flight": 1,
+                        "completed": 1200,
+                        "rejected": 3,
+                        "queue_wait_avg": 0.004,
+                        "queue_wait_max": 0.61,
+                        "hash_time_avg": 0.21,
+                        "hash_time_max": 0.32,
+                    }
+                }
+            }
+        }
+    },
+)
+async def get_password_hashing_stats():
+    """
+    # Returns password hashing pool statistics
+    Times are in seconds.
+    """
+    return password_hasher.stats()
+
+
+@router.get(
+    "/stats/revocations",
+    responses={
+        200: {
+            "content": {
+                "application/json": {
+                    "example": {
+                        "filter_items": 52,
+                        "filter_capacity": 100000,
+                        "filter_bits": 958505,
+                        "filter_hashes": 7,
+                        "filter_hits": 60,
+                        "false_positives": 1,
+                    }
+                }
+            }
+        }
+    },
+)
+async def get_revocation_stats():
+    """
+    # Returns revoked token filter statistics
+    """
+    return revocation_list.stats()
+
+
+@router.get(
+    "/stats/token-cache",
+    responses={
+        200: {
+            "content": {
+                "application/json": {
+                    "example": {
+                        "size": 230,
+                        "max_size": 4096,
+                        "ttl": 300,
+                        "hits": 18250,
+                        "misses": 410,
+                        "hit_ratio": 0.978,
+                    }
+                }
+            }
+        }
+    },
+)
+async def get_token_cache_stats():
+    """
+    # Returns verified token cache statistics
+    """
+    return token_cache.stats()
+
+
+@router.get(
+    "/stats/feed-cache",
+    responses={
+        200: {
+            "content": {
+                "application/json": {
+                    "example": {
+                        "authors": 1520,
+                        "max_authors": 10000,
+                        "per_author": 200,
+                        "post_ids": 84210,
+                        "memory_bytes": 1612048,
+                        "hits": 93120,
+                        "misses": 1610,
+                        "hit_ratio": 0.983,
+                    }
+                }
+            }
+        }
+    },
+)
+async def get_feed_cache_stats():
+    """
+    # Returns in-memory feed cache statistics
+    Only populated when feed_mode is "memory".
+    """
+    return feed_cache.stats()
+
+
+@router.get(
+    "/stats/response-cache",
+    responses={
+        200: {
+            "content": {
+                "application/json": {
+                    "example": {
+                        "size": 1840,
+                        "max_size": 4096,
+                        "ttl": 30,
+                        "hits": 52310,
+                        "misses": 6120,
+                        "hit_ratio": 0.8953,
+                        "enabled": True,
+                        "tags": 2215,
+                        "invalidations": 940,
+                    }
+                }
+            }
+        }
+    },
+)
+async def get_response_cache_stats():
+    """
+    # Returns public GET response cache statistics
+    """
+    return response_cache.stats()
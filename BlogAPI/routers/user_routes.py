@@ -1,21 +1,60 @@
 import datetime
-from typing import List
+from typing import List, Optional, Union
 
-import jwt
-from fastapi import Depends, APIRouter, HTTPException, Query
+from fastapi import Depends, APIRouter, HTTPException, Query, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from passlib.hash import bcrypt
-from sqlalchemy import desc, asc, select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import desc, asc, select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
+from starlette.responses import StreamingResponse
 
-from BlogAPI.config import config_settings
-from BlogAPI.db.SQLAlchemy_models import User, Post, Reply, user_follow
+from BlogAPI.db.SQLAlchemy_models import User, Post, Reply, RefreshToken, user_follow
 from BlogAPI.db.db_session_async import create_async_session
-from BlogAPI.dependencies.dependencies import get_current_user
+from BlogAPI.dependencies.dependencies import (
+    caller_must_exist,
+    get_current_user,
+    get_async_db,
+    get_current_principal,
+    invalidate_user,
+    revoke_access_token,
+    Principal,
+)
 from BlogAPI.pydantic_models.post_models import PostOut
 from BlogAPI.pydantic_models.reply_models import ReplyOut
-from BlogAPI.pydantic_models.user_models import UserOut, UserIn
+from BlogAPI.pydantic_models.user_models import UserOut, UserIn, RefreshTokenIn
+from BlogAPI.util.conditional import (
+    POST_VERSION_COLUMNS,
+    REPLY_VERSION_COLUMNS,
+    is_conditional,
+    check_not_modified,
+    set_validators,
+    posts_etag,
+    replies_etag,
+)
+from BlogAPI.util.export import export_user_lines
+from BlogAPI.util.fast_json import fast_json_enabled, fast_json_response
+from BlogAPI.util.feed_cache import feed_cache, memory_feed_enabled
+from BlogAPI.util.fields import parse_fields, project, sparse_response
+from BlogAPI.util.includes import parse_include, replies_response
+from BlogAPI.util.pagination import (
+    after_cursor,
+    set_next_cursor,
+    decode_id_cursor,
+    set_next_id_cursor,
+)
+from BlogAPI.util.password_hashing import hash_password
+from BlogAPI.util.response_cache import response_cache
+from BlogAPI.util.timeline import (
+    timelines_enabled,
+    backfill_timeline,
+    remove_from_timeline,
+)
+from BlogAPI.util.tokens import (
+    create_access_token,
+    create_refresh_token,
+    hash_refresh_token,
+)
+from BlogAPI.util.trending import remove_user_reply_events
 from BlogAPI.util.utils import authenticate_user, validate_new_user
 
 router = APIRouter()
@@ -45,11 +84,15 @@ async def create_user(user_in: UserIn):
     """
     # make sure username and email unique
     if await validate_new_user(user_in.username, user_in.email):
-        hs_password = bcrypt.hash(user_in.password)
+        hs_password = await hash_password(user_in.password)
         user = User(
             username=user_in.username,
             email=user_in.email,
             hs_password=hs_password,
+            post_count=0,
+            reply_count=0,
+            follower_count=0,
+            following_count=0,
         )
 
     # there are checks to throw status 409 within above validate_new_user
@@ -75,6 +118,8 @@ async def create_user(user_in: UserIn):
                         "access_token": "{token}",
                         "token_type": "bearer",
                         "expires_at": "1622315128.247613",
+                        "refresh_token": "{refresh_token}",
+                        "refresh_expires_at": "1624907128.247613",
                     }
                 }
             }
@@ -90,12 +135,14 @@ async def create_user(user_in: UserIn):
 )
 async def generate_auth_token_for_user(
     form_data: OAuth2PasswordRequestForm = Depends(),
+    session: AsyncSession = Depends(get_async_db),
 ):
     """
     # Generate token for user
     Authorizes a user for create/update/delete or for other authorization required endpoints.\\
     Can be passed to user via cookie or other method for login purposes when building a front end app.\\
-    Token is valid for 30 days.
+    Access token is short lived (15 minutes by default).\\
+    Use the refresh token with /token/refresh to get a new pair without logging in again.
     """
     user = await authenticate_user(form_data.username, form_data.password)
     if not user:
@@ -104,24 +151,164 @@ async def generate_auth_token_for_user(
             detail="Invalid Username or Password",
         )
 
-    expiry = datetime.datetime.utcnow() + datetime.timedelta(days=30)
+    token, expiry = create_access_token(user.id, user.username)
+    refresh_token, refresh_expiry = create_refresh_token(session, user.id)
+    await session.commit()
 
-    user_info = {
-        "id": user.id,
-        "username": user.username,
-        "exp": expiry,
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "expires_at": expiry.timestamp(),
+        "refresh_token": refresh_token,
+        "refresh_expires_at": refresh_expiry.timestamp(),
     }
 
-    token = jwt.encode(user_info, config_settings.secret_key)
+
+@router.post(
+    "/token/refresh",
+    responses={
+        200: {
+            "content": {
+                "application/json": {
+                    "example": {
+                        "access_token": "{token}",
+                        "token_type": "bearer",
+                        "expires_at": "1622315128.247613",
+                        "refresh_token": "{refresh_token}",
+                        "refresh_expires_at": "1624907128.247613",
+                    }
+                }
+            }
+        },
+        401: {
+            "content": {
+                "application/json": {"example": {"detail": "Invalid refresh token"}}
+            }
+        },
+    },
+)
+async def refresh_auth_token(
+    refresh_in: RefreshTokenIn,
+    session: AsyncSession = Depends(get_async_db),
+):
+    """
+    # Exchange refresh token for a new token pair
+    No password check - the refresh token is looked up by its hash.\\
+    Refresh tokens are single use, each call returns a new one and revokes the old one.\\
+    Reusing an old refresh token revokes every token issued from the same login.
+    """
+    query = select(RefreshToken).filter(
+        RefreshToken.token_hash == hash_refresh_token(refresh_in.refresh_token)
+    )
+    result = await session.execute(query)
+    stored_token = result.scalar_one_or_none()
+
+    if stored_token is None or stored_token.expires_at < datetime.datetime.utcnow():
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        )
+
+    # already rotated - token was likely stolen, revoke the whole family
+    if stored_token.revoked:
+        stmt = (
+            update(RefreshToken)
+            .where(RefreshToken.family_id == stored_token.family_id)
+            .values(revoked=True)
+        )
+        await session.execute(stmt)
+        await session.commit()
+
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        )
+
+    query = select(User.username).filter(User.id == stored_token.user_id)
+    result = await session.execute(query)
+    username = result.scalar_one_or_none()
+
+    if username is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        )
+
+    # rotate - old token can not be used again
+    stored_token.revoked = True
+    token, expiry = create_access_token(stored_token.user_id, username)
+    refresh_token, refresh_expiry = create_refresh_token(
+        session, stored_token.user_id, stored_token.family_id
+    )
+    await session.commit()
+
     return {
         "access_token": token,
         "token_type": "bearer",
         "expires_at": expiry.timestamp(),
+        "refresh_token": refresh_token,
+        "refresh_expires_at": refresh_expiry.timestamp(),
     }
 
 
+@router.post(
+    "/logout",
+    responses={
+        200: {
+            "content": {
+                "application/json": {"example": {"detail": "Success - Logged out"}}
+            }
+        },
+    },
+)
+async def logout(
+    refresh_in: Optional[RefreshTokenIn] = None,
+    principal=Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_db),
+):
+    """
+    # Revoke current token
+    The access token used for this request can not be used again.\\
+    Optionally include the refresh token to revoke it (and every token rotated from it) too.
+
+    ---
+
+    ### Authorization Header
+    Must include:
+    ```
+    {
+        "Authorization": "Bearer {token}"
+    }
+    ```
+    """
+    await revoke_access_token(session, principal)
+
+    if refresh_in is not None:
+        query = select(RefreshToken.family_id).filter(
+            RefreshToken.token_hash == hash_refresh_token(refresh_in.refresh_token),
+            RefreshToken.user_id == principal.id,
+        )
+        result = await session.execute(query)
+        family_id = result.scalar_one_or_none()
+
+        if family_id is not None:
+            stmt = (
+                update(RefreshToken)
+                .where(RefreshToken.family_id == family_id)
+                .values(revoked=True)
+            )
+            await session.execute(stmt)
+
+    await session.commit()
+
+    return {"detail": "Success - Logged out"}
+
+
 @router.get("/user/me", response_model=UserOut)
-async def get_me(user=Depends(get_current_user)):
+async def get_me(
+    principal: Principal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_db),
+):
     """
     # Returns current user info
     Queries database for current user information base on token provided.
@@ -136,51 +323,233 @@ async def get_me(user=Depends(get_current_user)):
     }
     ```
     """
+    # read fresh row rather than user cache - counters change with every post/reply/follow
+    user = await session.get(User, principal.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid Username or Password",
+        )
     return user
 
 
+@router.delete(
+    "/user/me",
+    responses={
+        200: {"content": {"application/json": {"example": {"detail": "success"}}}},
+        401: {
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Invalid Username or Password"}
+                }
+            }
+        },
+    },
+)
+async def delete_me(
+    principal: Principal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_db),
+):
+    """
+    # Delete current user
+    Deletes current user and everything they own from the database -
+    posts (and every reply to them), replies, follows and tokens.
+
+    ---
+
+    ### Authorization Header
+    Must include:
+    ```
+    {
+        "Authorization": "Bearer {token}"
+    }
+    ```
+    """
+    user_id = principal.id
+
+    if await session.get(User, user_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid Username or Password",
+        )
+
+    # counters on rows that outlive the user - everything the user owns goes with the delete below
+    own_post_ids = select(Post.id).where(Post.user_id == user_id)
+    own_replies_per_post = (
+        select(func.count(Reply.id))
+        .where(Reply.post_id == Post.id, Reply.user_id == user_id)
+        .scalar_subquery()
+    )
+    await session.execute(
+        update(Post)
+        .where(
+            Post.id.in_(select(Reply.post_id).where(Reply.user_id == user_id)),
+            Post.user_id != user_id,
+        )
+        .values(reply_count=Post.reply_count - own_replies_per_post)
+        .execution_options(synchronize_session=False)
+    )
+
+    replies_on_own_posts = (
+        select(func.count(Reply.id))
+        .where(Reply.post_id.in_(own_post_ids), Reply.user_id == User.id)
+        .scalar_subquery()
+    )
+    await session.execute(
+        update(User)
+        .where(
+            User.id.in_(select(Reply.user_id).where(Reply.post_id.in_(own_post_ids))),
+            User.id != user_id,
+        )
+        .values(reply_count=User.reply_count - replies_on_own_posts)
+        .execution_options(synchronize_session=False)
+    )
+
+    # row (user_id=A, following_id=F) means F follows A
+    followers = select(user_follow.c.following_id).where(
+        user_follow.c.user_id == user_id
+    )
+    following = select(user_follow.c.user_id).where(
+        user_follow.c.following_id == user_id
+    )
+    await session.execute(
+        update(User)
+        .where(User.id.in_(followers))
+        .values(following_count=User.following_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+    await session.execute(
+        update(User)
+        .where(User.id.in_(following))
+        .values(follower_count=User.follower_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+    await remove_user_reply_events(session, user_id)
+
+    # revocations have no foreign key to users - this one outlives the delete until the token expires
+    await revoke_access_token(session, principal)
+
+    # one statement - the database cascades to posts, replies, follows, timelines and refresh tokens
+    await session.execute(delete(User).where(User.id == user_id))
+    await session.commit()
+
+    invalidate_user(user_id)
+
+    if memory_feed_enabled():
+        feed_cache.remove_author(user_id)
+
+    # counters and pages of many users change - cheaper to start over than to collect every tag
+    response_cache.clear()
+
+    return {"detail": "success"}
+
+
 @router.get("/user/{user_id}", response_model=UserOut)
 async def get_user(user_id: int):
     """
     # Returns specified user
     Based off of user id provided
     """
+    key = ("get_user", user_id)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+
+    version = response_cache.version
     async with create_async_session() as session:
         query = select(User).filter(User.id == user_id)
         result = await session.execute(query)
 
-    return result.scalar_one_or_none()
+    user = result.scalar_one_or_none()
+
+    if user is not None:
+        user = UserOut.from_orm(user)
+        response_cache.set(key, user, [("user", user.id)], version)
+
+    return user
 
 
 # noinspection DuplicatedCode
 # keeping docstrings/queries as is instead of refactoring into 1 function - more readable
 @router.get("/user/{user_id}/posts", response_model=List[PostOut])
 async def get_users_posts(
+    request: Request,
+    response: Response,
     user_id: int,
     skip: int = 0,
     limit: int = Query(10, ge=0, le=25),
     sort_newest_first: bool = Query(True, alias="sort-newest-first"),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    replies_per_post: int = Query(3, ge=1, le=25, alias="replies-per-post"),
 ):
     """
     # Returns a list of specified users posts
-    Use skip and limit for pagination.\\
-    Sortable by date created (by default returns newest).
+    Use cursor and limit for pagination - pass the X-Next-Cursor response header as cursor for the next page.\\
+    skip is still supported but gets slower the deeper the page.\\
+    Sortable by date created (by default returns newest).\\
+    Pass fields to return only those fields - e.g. fields=id,title,date_created\\
+    Pass include=replies to nest each post's first replies (replies-per-post, default 3) - e.g. include=replies&replies-per-post=5
     """
+    fields = parse_fields(fields, PostOut)
+    include = parse_include(include, fields)
+
+    key = ("user-posts", user_id, skip, limit, sort_newest_first, cursor)
+    # sparse pages are not cached - they are already cheap to build
+    cached = None if fields else response_cache.get(key)
+    if cached is not None:
+        not_modified = check_not_modified(request, posts_etag(cached))
+        if not_modified is not None:
+            return not_modified
+
+        set_validators(response, posts_etag(cached))
+        set_next_cursor(response, cached, limit)
+        if "replies" in include:
+            return await replies_response(request, response, cached, replies_per_post)
+        if fast_json_enabled():
+            return fast_json_response(response, cached, PostOut)
+        return cached
+
     if sort_newest_first:
         sort_by = desc
     else:
         sort_by = asc
 
+    version = response_cache.version
     async with create_async_session() as session:
         query = (
             select(Post)
             .filter(Post.user_id == user_id)
-            .order_by(sort_by(Post.date_created))
-            .offset(skip)
+            .order_by(sort_by(Post.date_created), sort_by(Post.id))
             .limit(limit)
         )
-        posts = await session.execute(query)
-        posts = list(posts.scalars())
+
+        if cursor:
+            query = query.filter(
+                after_cursor(cursor, Post.date_created, Post.id, sort_newest_first)
+            )
+        else:
+            query = query.offset(skip)
+
+        if is_conditional(request):
+            # revalidate from the version columns before loading post bodies
+            versions = await session.execute(
+                query.with_only_columns(*POST_VERSION_COLUMNS)
+            )
+            not_modified = check_not_modified(request, posts_etag(list(versions)))
+            if not_modified is not None:
+                return not_modified
+
+        if fields:
+            posts = await session.execute(
+                query.with_only_columns(*project(Post, fields, POST_VERSION_COLUMNS))
+            )
+            posts = list(posts)
+        else:
+            posts = await session.execute(query)
+            posts = list(posts.scalars())
 
         if not posts:
             raise HTTPException(
@@ -188,6 +557,25 @@ async def get_users_posts(
                 detail="No posts founds",
             )
 
+    if fields:
+        set_validators(response, posts_etag(posts))
+        set_next_cursor(response, posts, limit)
+        return sparse_response(response, posts, PostOut, fields)
+
+    posts = [PostOut.from_orm(post) for post in posts]
+    response_cache.set(
+        key,
+        posts,
+        [("user-posts", user_id), *(("post", post.id) for post in posts)],
+        version,
+    )
+
+    set_validators(response, posts_etag(posts))
+    set_next_cursor(response, posts, limit)
+    if "replies" in include:
+        return await replies_response(request, response, posts, replies_per_post)
+    if fast_json_enabled():
+        return fast_json_response(response, posts, PostOut)
     return posts
 
 
@@ -195,16 +583,24 @@ async def get_users_posts(
 # keeping docstrings/queries as is instead of refactoring into 1 function - more readable
 @router.get("/user/{user_id}/replies", response_model=List[ReplyOut])
 async def get_users_replies(
+    request: Request,
+    response: Response,
     user_id: int,
     skip: int = 0,
     limit: int = Query(10, ge=0, le=25),
     sort_newest_first: bool = Query(True, alias="sort-newest-first"),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
 ):
     """
     # Returns a list of specified users replies
-    Use skip and limit for pagination.\\
-    Sortable by date created (by default returns newest).
+    Use cursor and limit for pagination - pass the X-Next-Cursor response header as cursor for the next page.\\
+    skip is still supported but gets slower the deeper the page.\\
+    Sortable by date created (by default returns newest).\\
+    Pass fields to return only those fields - e.g. fields=id,body,post_id
     """
+    fields = parse_fields(fields, ReplyOut)
+
     if sort_newest_first:
         sort_by = desc
     else:
@@ -214,67 +610,187 @@ async def get_users_replies(
         query = (
             select(Reply)
             .filter(Reply.user_id == user_id)
-            .order_by(sort_by(Reply.date_created))
-            .offset(skip)
+            .order_by(sort_by(Reply.date_created), sort_by(Reply.id))
             .limit(limit)
         )
 
-        replies = await session.execute(query)
+        if cursor:
+            query = query.filter(
+                after_cursor(cursor, Reply.date_created, Reply.id, sort_newest_first)
+            )
+        else:
+            query = query.offset(skip)
+
+        if is_conditional(request):
+            # revalidate from the version columns before loading reply bodies
+            versions = await session.execute(
+                query.with_only_columns(*REPLY_VERSION_COLUMNS)
+            )
+            not_modified = check_not_modified(request, replies_etag(list(versions)))
+            if not_modified is not None:
+                return not_modified
+
+        if fields:
+            replies = await session.execute(
+                query.with_only_columns(*project(Reply, fields, REPLY_VERSION_COLUMNS))
+            )
+            replies = list(replies)
+        else:
+            replies = await session.execute(query)
+            replies = list(replies.scalars())
 
-    return list(replies.scalars())
+    set_validators(response, replies_etag(replies))
+    set_next_cursor(response, replies, limit)
+    if fields:
+        return sparse_response(response, replies, ReplyOut, fields)
+    if fast_json_enabled():
+        return fast_json_response(response, replies, ReplyOut)
+    return replies
 
 
 # noinspection DuplicatedCode
 # keeping docstrings/queries as is instead of refactoring into 1 function - more readable
-@router.get("/user/{user_id}/followers", response_model=List[UserOut])
-async def get_users_followers(user_id):
+@router.get(
+    "/user/{user_id}/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {
+                "application/x-ndjson": {
+                    "example": '{"type": "user", "id": 1, "username": "zaktest", ...}\n'
+                    '{"type": "post", "id": 1, "title": "Post #1", ...}\n'
+                    '{"type": "reply", "id": 1, "body": "Reply #1", ...}\n'
+                }
+            }
+        },
+        404: {
+            "content": {
+                "application/json": {"example": {"detail": "This user does not exist"}}
+            }
+        },
+    },
+)
+async def export_user(user_id: int):
     """
-    # Returns a list of all followers of current user
+    # Exports specified user with all their posts and replies
+    Streamed as newline delimited JSON (application/x-ndjson) - one object per line tagged with its type.\\
+    User line first, then posts, then replies - each oldest first.
     """
-    # get list of follower ids from database
     async with create_async_session() as session:
-        query = select(user_follow.c.following_id).filter(
-            user_follow.c.user_id == user_id
+        user = await session.get(User, user_id)
+
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="This user does not exist",
         )
-        result = await session.execute(query)
 
-    follower_ids = list(result.scalars())
+    return StreamingResponse(
+        export_user_lines(user_id), media_type="application/x-ndjson"
+    )
 
-    # generate list of user objects from list of ids
+
+@router.get("/user/{user_id}/followers", response_model=Union[List[UserOut], List[int]])
+async def get_users_followers(
+    response: Response,
+    user_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    ids_only: bool = Query(False, alias="ids-only"),
+):
+    """
+    # Returns a list of followers of specified user
+    Ordered by user id. Use cursor and limit for pagination - pass the X-Next-Cursor response header as cursor for the next page.\\
+    Set ids-only to get a list of user ids instead of user objects.
+    """
     async with create_async_session() as session:
-        followers = []
-        for follower_id in follower_ids:
-            query = select(User).filter(User.id == follower_id)
+        if ids_only:
+            # answered from the user_follow primary key alone
+            query = (
+                select(user_follow.c.following_id)
+                .filter(user_follow.c.user_id == user_id)
+                .order_by(user_follow.c.following_id)
+                .limit(limit)
+            )
+
+            if cursor:
+                query = query.filter(
+                    user_follow.c.following_id > decode_id_cursor(cursor)
+                )
+
             result = await session.execute(query)
-            followers.append(result.scalar())
+            followers = list(result.scalars())
+            set_next_id_cursor(response, followers, limit)
+
+            return followers
+
+        query = (
+            select(User)
+            .join(user_follow, User.id == user_follow.c.following_id)
+            .filter(user_follow.c.user_id == user_id)
+            .order_by(User.id)
+            .limit(limit)
+        )
+
+        if cursor:
+            query = query.filter(User.id > decode_id_cursor(cursor))
+
+        result = await session.execute(query)
+        followers = list(result.scalars())
 
+    set_next_id_cursor(response, [follower.id for follower in followers], limit)
     return followers
 
 
 # noinspection DuplicatedCode
 # keeping docstrings/queries as is instead of refactoring into 1 function - more readable
-@router.get("/user/{user_id}/following", response_model=List[UserOut])
-async def get_users_following(user_id):
+@router.get("/user/{user_id}/following", response_model=Union[List[UserOut], List[int]])
+async def get_users_following(
+    response: Response,
+    user_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    ids_only: bool = Query(False, alias="ids-only"),
+):
     """
-    # Returns a list of all users that the current user is following
+    # Returns a list of users that specified user is following
+    Ordered by user id. Use cursor and limit for pagination - pass the X-Next-Cursor response header as cursor for the next page.\\
+    Set ids-only to get a list of user ids instead of user objects.
     """
-    # get list of user_ids following from database
     async with create_async_session() as session:
-        query = select(user_follow.c.user_id).filter(
-            user_follow.c.following_id == user_id
-        )
-        result = await session.execute(query)
+        if ids_only:
+            # answered from the (following_id, user_id) index alone
+            query = (
+                select(user_follow.c.user_id)
+                .filter(user_follow.c.following_id == user_id)
+                .order_by(user_follow.c.user_id)
+                .limit(limit)
+            )
 
-    following_ids = list(result.scalars())
+            if cursor:
+                query = query.filter(user_follow.c.user_id > decode_id_cursor(cursor))
 
-    # generate list of user objects from list of ids
-    async with create_async_session() as session:
-        following = []
-        for following_id in following_ids:
-            query = select(User).filter(User.id == following_id)
             result = await session.execute(query)
-            following.append(result.scalar())
+            following = list(result.scalars())
+            set_next_id_cursor(response, following, limit)
+
+            return following
+
+        query = (
+            select(User)
+            .join(user_follow, User.id == user_follow.c.user_id)
+            .filter(user_follow.c.following_id == user_id)
+            .order_by(User.id)
+            .limit(limit)
+        )
+
+        if cursor:
+            query = query.filter(User.id > decode_id_cursor(cursor))
+
+        result = await session.execute(query)
+        following = list(result.scalars())
 
+    set_next_id_cursor(response, [user.id for user in following], limit)
     return following
 
 
@@ -286,6 +802,11 @@ async def get_users_following(user_id):
                 "application/json": {"example": {"detail": "Success - User followed"}}
             }
         },
+        404: {
+            "content": {
+                "application/json": {"example": {"detail": "This user does not exist"}}
+            }
+        },
         409: {
             "content": {
                 "application/json": {"example": {"detail": "User already followed"}}
@@ -294,7 +815,11 @@ async def get_users_following(user_id):
     },
     status_code=201,
 )
-async def follow_user(user_id: int, user=Depends(get_current_user)):
+async def follow_user(
+    user_id: int,
+    user=Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_db),
+):
     """
     # Makes current user follow specified user
 
@@ -308,22 +833,51 @@ async def follow_user(user_id: int, user=Depends(get_current_user)):
     }
     ```
     """
-    # try to follow user
-    try:
-        async with create_async_session() as session:
-            stmt = user_follow.insert().values(user_id=user_id, following_id=user.id)
-            await session.execute(stmt)
-            await session.commit()
+    # bump followed user's counter - also tells us whether the user exists
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(follower_count=User.follower_count + 1)
+    )
+
+    if result.rowcount == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="This user does not exist",
+        )
 
-        return {"detail": "Success - User followed"}
+    # OR IGNORE skips only the primary key conflict of an existing follow -
+    # a foreign key failure (follower deleted meanwhile) still raises and becomes a 401
+    async with caller_must_exist(session):
+        stmt = (
+            user_follow.insert()
+            .prefix_with("OR IGNORE")
+            .values(user_id=user_id, following_id=user.id)
+        )
+        result = await session.execute(stmt)
 
-    # fails on Unique constraint if user already followed
-    except IntegrityError:
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="User already followed",
         )
 
+    await session.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(following_count=User.following_count + 1)
+    )
+
+    # add followed user's recent posts to current user's feed
+    if timelines_enabled():
+        await backfill_timeline(session, user.id, user_id)
+
+    await session.commit()
+
+    response_cache.invalidate(("user", user_id), ("user", user.id))
+
+    return {"detail": "Success - User followed"}
+
 
 @router.delete(
     "/user/follow/{user_id}",
@@ -343,7 +897,11 @@ async def follow_user(user_id: int, user=Depends(get_current_user)):
     },
     status_code=200,
 )
-async def unfollow_user(user_id: int, user=Depends(get_current_user)):
+async def unfollow_user(
+    user_id: int,
+    user=Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_db),
+):
     """
     # Makes current user unfollow specified user
 
@@ -358,12 +916,11 @@ async def unfollow_user(user_id: int, user=Depends(get_current_user)):
     ```
     """
     # check if actually following
-    async with create_async_session() as session:
-        query = select(user_follow).where(
-            user_follow.c.user_id == user_id, user_follow.c.following_id == user.id
-        )
-        result = await session.execute(query)
-        result = result.fetchall()
+    query = select(user_follow).where(
+        user_follow.c.user_id == user_id, user_follow.c.following_id == user.id
+    )
+    result = await session.execute(query)
+    result = result.fetchall()
 
     if len(result) < 1:
         raise HTTPException(
@@ -372,11 +929,27 @@ async def unfollow_user(user_id: int, user=Depends(get_current_user)):
         )
 
     # unfollow user - deletes row in user_follow table
-    async with create_async_session() as session:
-        stmt = user_follow.delete().where(
-            user_follow.c.user_id == user_id, user_follow.c.following_id == user.id
-        )
-        await session.execute(stmt)
-        await session.commit()
+    stmt = user_follow.delete().where(
+        user_follow.c.user_id == user_id, user_follow.c.following_id == user.id
+    )
+    await session.execute(stmt)
+
+    await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(follower_count=User.follower_count - 1)
+    )
+    await session.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(following_count=User.following_count - 1)
+    )
+
+    if timelines_enabled():
+        await remove_from_timeline(session, user.id, user_id)
+
+    await session.commit()
+
+    response_cache.invalidate(("user", user_id), ("user", user.id))
 
     return {"detail": "Success - User unfollowed"}
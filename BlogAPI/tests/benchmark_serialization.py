@@ -0,0 +1,84 @@
+"""
+Microbenchmark - FastAPI's default response serialization vs the fast JSON path (util/fast_json.py)
+for a full page (25) of posts
+
+Run with:
+    python -m BlogAPI.tests.benchmark_serialization
+"""
+
+import asyncio
+import datetime
+import json
+import time
+from typing import List
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from starlette.responses import JSONResponse
+
+from BlogAPI.db.SQLAlchemy_models import Post
+from BlogAPI.pydantic_models.post_models import PostOut
+from BlogAPI.util.fast_json import FastJSONResponse, rows_to_dicts
+
+PAGE_SIZE = 25
+ROUNDS = 2000
+
+response_field = create_response_field(name="page", type_=List[PostOut])
+
+
+def make_posts(count: int = PAGE_SIZE) -> List[Post]:
+    now = datetime.datetime.utcnow()
+    return [
+        Post(
+            id=i,
+            title=f"Post #{i}",
+            body="This is a post of mock data. " * 20,
+            date_created=now,
+            date_modified=now if i % 2 else None,
+            user_id=i % 4 + 1,
+            username="zaktest",
+            reply_count=i,
+        )
+        for i in range(count)
+    ]
+
+
+async def default_path(posts: List[Post]) -> bytes:
+    # what FastAPI does with a returned list and response_model=List[PostOut]
+    content = await serialize_response(field=response_field, response_content=posts)
+    return JSONResponse(content).body
+
+
+async def fast_path(posts: List[Post]) -> bytes:
+    return FastJSONResponse(rows_to_dicts(posts, PostOut)).body
+
+
+async def benchmark(path, posts: List[Post]) -> float:
+    """
+    Returns best time per page in seconds over 3 runs of ROUNDS pages
+    """
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            await path(posts)
+        best = min(best, (time.perf_counter() - start) / ROUNDS)
+    return best
+
+
+async def main():
+    page = make_posts()
+
+    # both paths must produce the same document
+    assert json.loads(await default_path(page)) == json.loads(await fast_path(page))
+
+    default_time = await benchmark(default_path, page)
+    fast_time = await benchmark(fast_path, page)
+
+    print(f"default: {default_time * 1_000_000:8.1f} us per page")
+    print(f"   fast: {fast_time * 1_000_000:8.1f} us per page")
+    print(f"speedup: {default_time / fast_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
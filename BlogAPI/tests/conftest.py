@@ -0,0 +1,23 @@
+import pytest
+
+from BlogAPI.db.db_session_async import dispose_async_engine
+from BlogAPI.util.response_cache import response_cache
+
+
+@pytest.fixture(autouse=True)
+async def dispose_pool():
+    """
+    each test runs on its own event loop - close pooled connections after every test
+    the app shutdown event (which normally disposes the pool) does not run under the test client
+    """
+    yield
+    await dispose_async_engine()
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    """
+    tests tidy up rows directly (bypassing the write routes) - don't let cached pages leak between tests
+    """
+    yield
+    response_cache.clear()
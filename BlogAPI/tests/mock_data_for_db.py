@@ -2,6 +2,9 @@ from passlib.hash import bcrypt
 
 from BlogAPI.db.SQLAlchemy_models import User, Post, Reply
 from BlogAPI.tests.test_setup_and_utils import TestingSessionLocal, Base, engine
+from BlogAPI.db.counters import repair_counters
+from BlogAPI.util.timeline import rebuild_timelines
+from BlogAPI.util.trending import repair_trending
 
 session = TestingSessionLocal()
 
@@ -122,6 +125,36 @@ def add_sample_follows():
         return f"error occurred: {error}"
 
 
+def add_sample_timelines():
+    """
+    fills following feed timelines from the posts/follows added above
+    """
+    with engine.begin() as connection:
+        rebuild_timelines(connection)
+
+    print("Timelines added successfully")
+
+
+def add_sample_counts():
+    """
+    fills post/user counter columns from the rows added above
+    """
+    with engine.begin() as connection:
+        repair_counters(connection)
+
+    print("Counts added successfully")
+
+
+def add_sample_trending_scores():
+    """
+    fills post trending scores from the posts/replies added above
+    """
+    with engine.begin() as connection:
+        repair_trending(connection)
+
+    print("Trending scores added successfully")
+
+
 def rebuild_test_db(number_of_posts: int = 5):
     """
     Mock data for testing
@@ -139,6 +172,9 @@ def rebuild_test_db(number_of_posts: int = 5):
     add_sample_posts(number_of_posts)
     add_sample_replies()
     add_sample_follows()
+    add_sample_timelines()
+    add_sample_counts()
+    add_sample_trending_scores()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+import json
+
+import sqlalchemy as sa
+from sqlalchemy import create_engine
+
+from BlogAPI.db.bulk_import import bulk_import, main
+from BlogAPI.db.migrations import run_migrations
+from BlogAPI.tests.test_migrations import LIST_INDEXES, get_index_names
+
+HS_PASSWORD = "$2b$12$" + "x" * 53
+
+
+def write_files(tmp_path):
+    users = tmp_path / "users.csv"
+    users.write_text(
+        "id,username,email,hs_password\n"
+        + "".join(
+            f"{i},user{i},user{i}@example.com,{HS_PASSWORD}\n" for i in range(1, 4)
+        )
+    )
+
+    posts = tmp_path / "posts.ndjson"
+    posts.write_text(
+        "".join(
+            json.dumps(
+                {
+                    "type": "post",
+                    "id": i,
+                    "title": f"Post #{i}",
+                    "body": "Imported post",
+                    "date_created": f"2021-05-01T12:00:0{i}",
+                    "user_id": i % 3 + 1,
+                    "username": f"user{i % 3 + 1}",
+                }
+            )
+            + "\n"
+            for i in range(1, 7)
+        )
+        # lines of other types are skipped
+        + json.dumps({"type": "user", "id": 1, "username": "user1"})
+        + "\n"
+    )
+
+    replies = tmp_path / "replies.ndjson"
+    replies.write_text(
+        "".join(
+            json.dumps(
+                {
+                    "body": f"Reply #{i}",
+                    "user_id": 1,
+                    "username": "user1",
+                    "post_id": 2,
+                }
+            )
+            + "\n"
+            for i in range(1, 5)
+        )
+    )
+
+    # user 2 and 3 follow user 1
+    follows = tmp_path / "follows.csv"
+    follows.write_text("user_id,following_id\n1,2\n1,3\n")
+
+    return {"users": users, "posts": posts, "replies": replies, "follows": follows}
+
+
+def test_bulk_import(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'import.db'}")
+    run_migrations(engine)
+
+    stats = bulk_import(write_files(tmp_path), engine, chunk_size=2)
+
+    assert [(table.table, table.rows) for table in stats[:4]] == [
+        ("users", 3),
+        ("posts", 6),
+        ("replies", 4),
+        ("follows", 2),
+    ]
+    # indexes dropped for the load are back
+    assert set(LIST_INDEXES) <= get_index_names(engine)
+
+    with engine.connect() as connection:
+        post = connection.execute(
+            sa.text("SELECT date_created, reply_count FROM posts WHERE id = 2")
+        ).one()
+        user = connection.execute(
+            sa.text(
+                "SELECT post_count, reply_count, follower_count FROM users WHERE id = 1"
+            )
+        ).one()
+        timeline_size = connection.execute(
+            sa.text("SELECT count(*) FROM timeline_entries WHERE user_id = 2")
+        ).scalar()
+        journal_mode = connection.execute(sa.text("PRAGMA journal_mode")).scalar()
+
+    # stored the way the api stores datetimes
+    assert post.date_created == "2021-05-01 12:00:02.000000"
+    assert post.reply_count == 4
+    assert tuple(user) == (2, 4, 2)
+    assert timeline_size == 2
+    assert journal_mode == "delete"
+
+
+def test_bulk_import_cli(tmp_path, monkeypatch, capsys):
+    engine = create_engine(f"sqlite:///{tmp_path / 'import.db'}")
+    run_migrations(engine)
+    monkeypatch.setattr("BlogAPI.db.db_session.engine", engine)
+    files = write_files(tmp_path)
+
+    main(["--users", str(files["users"]), "--follows", str(files["follows"])])
+
+    output = capsys.readouterr().out
+    assert "users: 3 rows" in output
+    assert "follows: 2 rows" in output
+    assert "Imported 5 rows" in output
@@ -0,0 +1,116 @@
+import sqlalchemy as sa
+from sqlalchemy import create_engine
+
+from BlogAPI.db.SQLAlchemy_models import Base
+from BlogAPI.db.migrations import run_migrations, LATEST_VERSION, get_schema_version
+from BlogAPI.db.search import SEARCH_TABLES, drop_search_tables
+
+LIST_INDEXES = [
+    "ix_posts_user_id_date_created",
+    "ix_posts_date_created",
+    "ix_replies_post_id_date_created",
+    "ix_replies_user_id_date_created",
+    "ix_user_follow_following_id",
+]
+
+COUNTER_COLUMNS = [
+    ("posts", "reply_count"),
+    ("users", "post_count"),
+    ("users", "reply_count"),
+    ("users", "follower_count"),
+    ("users", "following_count"),
+]
+
+
+def get_index_names(engine):
+    with engine.connect() as connection:
+        result = connection.execute(
+            sa.text("SELECT name FROM sqlite_master WHERE type = 'index'")
+        )
+        return set(result.scalars())
+
+
+def test_migrate_existing_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+
+    # build database as it looked before migrations existed
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for index_name in LIST_INDEXES:
+            connection.execute(sa.text(f"DROP INDEX {index_name}"))
+        connection.execute(sa.text("DROP TABLE refresh_tokens"))
+        connection.execute(sa.text("DROP TABLE revoked_tokens"))
+        connection.execute(sa.text("DROP TABLE timeline_entries"))
+        for table, column in COUNTER_COLUMNS:
+            connection.execute(sa.text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+        drop_search_tables(connection)
+        connection.execute(sa.text("DROP INDEX ix_posts_trending_score"))
+        connection.execute(sa.text("ALTER TABLE posts DROP COLUMN trending_score"))
+        # follows without ON DELETE CASCADE
+        connection.execute(sa.text("DROP TABLE user_follow"))
+        connection.execute(
+            sa.text(
+                "CREATE TABLE user_follow ("
+                "user_id INTEGER NOT NULL REFERENCES users (id), "
+                "following_id INTEGER NOT NULL REFERENCES users (id), "
+                "PRIMARY KEY (user_id, following_id))"
+            )
+        )
+        connection.execute(
+            sa.text(
+                "INSERT INTO users (id, username, email, hs_password) "
+                "VALUES (1, 'one', 'one@example.com', 'x'), "
+                "(2, 'two', 'two@example.com', 'x')"
+            )
+        )
+        connection.execute(
+            sa.text(
+                "INSERT INTO posts (id, title, body, date_created, user_id, username) "
+                "VALUES (1, 'Post', 'Body', '2021-06-01 00:00:00.000000', 1, 'one')"
+            )
+        )
+        # row (A, F) means F follows A - user 3 was deleted before foreign keys were enforced
+        connection.execute(
+            sa.text("INSERT INTO user_follow VALUES (1, 2), (1, 3), (3, 2)")
+        )
+
+    assert run_migrations(engine) == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert set(LIST_INDEXES) <= get_index_names(engine)
+    assert sa.inspect(engine).has_table("refresh_tokens")
+    post_columns = {
+        column["name"] for column in sa.inspect(engine).get_columns("posts")
+    }
+    assert "reply_count" in post_columns
+    assert "trending_score" in post_columns
+    assert {
+        foreign_key["options"].get("ondelete")
+        for foreign_key in sa.inspect(engine).get_foreign_keys("user_follow")
+    } == {"CASCADE"}
+    assert set(SEARCH_TABLES) <= set(sa.inspect(engine).get_table_names())
+    assert sa.inspect(engine).get_foreign_keys("revoked_tokens") == []
+
+    # orphan follows are gone along with their counts and timeline entries
+    with engine.connect() as connection:
+        follows = connection.execute(sa.text("SELECT * FROM user_follow")).all()
+        counts = connection.execute(
+            sa.text("SELECT follower_count, following_count FROM users ORDER BY id")
+        ).all()
+        timelines = connection.execute(
+            sa.text("SELECT user_id, post_id FROM timeline_entries")
+        ).all()
+    assert follows == [(1, 2)]
+    assert counts == [(1, 0), (0, 1)]
+    assert timelines == [(2, 1)]
+
+    # already up to date - nothing applied
+    assert run_migrations(engine) == []
+
+
+def test_migrate_new_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'new.db'}")
+
+    run_migrations(engine)
+
+    assert set(LIST_INDEXES) <= get_index_names(engine)
+    with engine.connect() as connection:
+        assert get_schema_version(connection) == LATEST_VERSION
@@ -1,11 +1,16 @@
+from collections import OrderedDict
+
 import pytest
 
 from httpx import AsyncClient
-from sqlalchemy import select
+from sqlalchemy import select, delete
 
-from BlogAPI.db.SQLAlchemy_models import Post, Reply
+from BlogAPI.db.SQLAlchemy_models import Post, Reply, User, TimelineEntry
 from BlogAPI.db.db_session_async import create_async_session
-from BlogAPI.dependencies.dependencies import get_current_user
+from BlogAPI.dependencies.dependencies import get_current_user, get_current_principal
+from BlogAPI.util import timeline, fast_json, batch, trending
+from BlogAPI.util.feed_cache import feed_cache
+from BlogAPI.util.response_cache import response_cache
 from main import api
 
 # noinspection PyUnresolvedReferences
@@ -13,15 +18,18 @@ from main import api
 from BlogAPI.tests.test_setup_and_utils import (
     db_non_commit,
     override_get_current_user_zak,
+    override_get_current_principal_zak,
+    override_get_current_principal_jess,
     override_get_current_user_elliot,
+    restore_counters,
 )
 
 
 @pytest.mark.asyncio
 async def test_create_post():
     # successful test case
-    # mock authorization - return user directly
-    api.dependency_overrides[get_current_user] = override_get_current_user_zak
+    # mock authorization - return principal directly
+    api.dependency_overrides[get_current_principal] = override_get_current_principal_zak
     body = {"title": "My First Post", "body": "Welcome to my blog"}
 
     async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
@@ -33,6 +41,10 @@ async def test_create_post():
     assert post.get("title") == "My First Post"
     assert post.get("id") == 21
 
+    async with create_async_session() as session:
+        author = await session.get(User, 1)
+        assert author.post_count == 6
+
     # delete created post to maintain database state
     async with create_async_session() as session:
         query = select(Post).filter(Post.id == post.get("id"))
@@ -49,9 +61,63 @@ async def test_create_post():
         test_post = result.scalar_one_or_none()
 
     assert test_post is None
+    restore_counters()
 
     # delete dependency overwrite - don't want to conflict with other tests
-    del api.dependency_overrides[get_current_user]
+    del api.dependency_overrides[get_current_principal]
+
+
+@pytest.mark.asyncio
+async def test_create_posts_batch():
+    # mock authorization - return principal directly
+    api.dependency_overrides[get_current_principal] = override_get_current_principal_zak
+    body = [
+        {"title": "Batch Post #1", "body": "First"},
+        {"title": "Missing body"},
+        {"title": "Batch Post #2", "body": "Second"},
+    ]
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/posts/batch", json=body)
+
+    created = resp.json().get("created")
+    errors = resp.json().get("errors")
+
+    # valid posts created in order, invalid one reported by index
+    assert resp.status_code == 201
+    assert [post.get("title") for post in created] == ["Batch Post #1", "Batch Post #2"]
+    assert created[1].get("id") == created[0].get("id") + 1
+    assert [error.get("index") for error in errors] == [1]
+    assert errors[0].get("detail")[0].get("loc") == ["body"]
+
+    async with create_async_session() as session:
+        assert (await session.get(User, 1)).post_count == 7
+
+    # fail case - over size cap
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/posts/batch", json=[body[0]] * 101)
+
+    assert resp.status_code == 400
+
+    # fail case - no valid posts
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/posts/batch", json=[body[1], {"body": "No title"}])
+
+    assert resp.status_code == 422
+    assert [error.get("index") for error in resp.json().get("detail")] == [0, 1]
+
+    # delete created posts and their timeline entries to maintain database state
+    post_ids = [post.get("id") for post in created]
+    async with create_async_session() as session:
+        await session.execute(
+            delete(TimelineEntry).where(TimelineEntry.post_id.in_(post_ids))
+        )
+        await session.execute(delete(Post).where(Post.id.in_(post_ids)))
+        await session.commit()
+    restore_counters()
+
+    # delete dependency overwrite - don't want to conflict with other tests
+    del api.dependency_overrides[get_current_principal]
 
 
 @pytest.mark.asyncio
@@ -113,6 +179,41 @@ async def test_delete_post(db_non_commit):
     del api.dependency_overrides[get_current_user]
 
 
+@pytest.mark.asyncio
+async def test_delete_post_cascades():
+    # replies (and their search index entries) go with the post in one statement
+    api.dependency_overrides[get_current_principal] = override_get_current_principal_zak
+    api.dependency_overrides[get_current_user] = override_get_current_user_zak
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/post", json={"title": "Short lived", "body": "Gone"})
+        post_id = resp.json().get("id")
+        resp = await ac.post(
+            f"/post/{post_id}/replies/batch", json=[{"body": "Ephemeral"}] * 3
+        )
+        reply_id = resp.json().get("created")[0].get("id")
+        # cached before the delete
+        cached_reply = await ac.get(f"/reply/{reply_id}")
+
+        resp = await ac.delete(f"/post/{post_id}")
+        search = await ac.get("/search?q=ephemeral")
+        deleted_reply = await ac.get(f"/reply/{reply_id}")
+
+    assert resp.status_code == 200
+    assert search.json() == []
+    assert cached_reply.status_code == 200
+    assert deleted_reply.status_code == 404
+
+    async with create_async_session() as session:
+        result = await session.execute(select(Reply).where(Reply.post_id == post_id))
+        assert result.scalars().all() == []
+        assert (await session.get(User, 1)).reply_count == 20
+
+    restore_counters()
+    # delete dependency overwrite - don't want to conflict with other tests
+    del api.dependency_overrides[get_current_principal]
+    del api.dependency_overrides[get_current_user]
+
+
 @pytest.mark.asyncio
 async def test_get_post():
     # successful case
@@ -133,11 +234,145 @@ async def test_get_post():
     assert resp.json() == {"detail": "This post does not exist"}
 
 
+@pytest.mark.asyncio
+async def test_get_post_cached(db_non_commit):
+    # second read served from response cache
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        first = await ac.get("/post/1")
+        hits = response_cache.entries.hits
+        second = await ac.get("/post/1")
+
+    assert second.json() == first.json()
+    assert response_cache.entries.hits == hits + 1
+
+    # updating the post drops the cached copy
+    api.dependency_overrides[get_current_user] = override_get_current_user_zak
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        await ac.put("/post/1", json={"title": "Cached Post"})
+
+    assert ("get_post", "1") not in response_cache.entries
+
+    # delete dependency overwrite - don't want to conflict with other tests
+    del api.dependency_overrides[get_current_user]
+
+
+@pytest.mark.asyncio
+async def test_get_post_conditional():
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/post/2")
+        etag = resp.headers.get("etag")
+        last_modified = resp.headers.get("last-modified")
+
+        # answered from version columns - nothing cached
+        response_cache.clear()
+        not_modified = await ac.get("/post/2", headers={"If-None-Match": etag})
+        since = await ac.get("/post/2", headers={"If-Modified-Since": last_modified})
+        changed = await ac.get("/post/2", headers={"If-None-Match": '"stale"'})
+
+    assert etag and last_modified
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers.get("etag") == etag
+    assert since.status_code == 304
+    assert changed.status_code == 200
+    assert changed.json() == resp.json()
+
+    # list pages carry an ETag for the whole page
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/post/1/replies?limit=3")
+        not_modified = await ac.get(
+            "/post/1/replies?limit=3",
+            headers={"If-None-Match": resp.headers.get("etag")},
+        )
+        other_page = await ac.get(
+            "/post/1/replies?limit=2",
+            headers={"If-None-Match": resp.headers.get("etag")},
+        )
+
+    assert not_modified.status_code == 304
+    assert other_page.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_fast_json_responses(monkeypatch):
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        default = await ac.get("/post/1/replies?limit=3")
+
+    # same body and headers without pydantic revalidation
+    monkeypatch.setattr(fast_json, "FAST_JSON_ENABLED", True)
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        fast = await ac.get("/post/1/replies?limit=3")
+
+    assert fast.status_code == 200
+    assert fast.json() == default.json()
+    assert fast.headers.get("x-next-cursor") == default.headers.get("x-next-cursor")
+    assert fast.headers.get("etag") == default.headers.get("etag")
+
+
+@pytest.mark.asyncio
+async def test_sparse_fields():
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        full = await ac.get("/posts/recent?limit=3")
+        sparse = await ac.get("/posts/recent?limit=3&fields=title,id")
+
+    # only requested fields, same rows and next page cursor
+    assert sparse.status_code == 200
+    assert sparse.json() == [
+        {"id": post["id"], "title": post["title"]} for post in full.json()
+    ]
+    assert sparse.headers.get("x-next-cursor") == full.headers.get("x-next-cursor")
+
+    # projected join on timeline feed
+    api.dependency_overrides[get_current_user] = override_get_current_user_zak
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/posts/following?limit=2&fields=id,username")
+
+    assert resp.status_code == 200
+    assert all(set(post) == {"id", "username"} for post in resp.json())
+    del api.dependency_overrides[get_current_user]
+
+    # fail case - unknown field
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/post/1/replies?fields=id,password")
+
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "Unknown fields: password"}
+
+
+@pytest.mark.asyncio
+async def test_posts_include_replies():
+    url = "/posts/recent?limit=3&include=replies&replies-per-post=2"
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get(url)
+        not_modified = await ac.get(
+            url, headers={"If-None-Match": resp.headers.get("etag")}
+        )
+
+    posts = resp.json()
+
+    # first 2 of each post's 4 replies, oldest first
+    assert resp.status_code == 200
+    assert len(posts) == 3
+    for post in posts:
+        replies = post.get("replies")
+        assert len(replies) == 2
+        assert all(reply.get("post_id") == post.get("id") for reply in replies)
+        assert replies[0].get("date_created") <= replies[1].get("date_created")
+
+    assert not_modified.status_code == 304
+
+    # fail case - can't combine with sparse fields
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/posts/recent?include=replies&fields=id")
+
+    assert resp.status_code == 400
+
+
 @pytest.mark.asyncio
 async def test_create_reply():
     # successful test case
-    # mock authorization - return user directly
-    api.dependency_overrides[get_current_user] = override_get_current_user_zak
+    # mock authorization - return principal directly
+    api.dependency_overrides[get_current_principal] = override_get_current_principal_zak
     body = {"body": "My First Reply"}
 
     async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
@@ -149,6 +384,10 @@ async def test_create_reply():
     assert reply.get("body") == "My First Reply"
     assert reply.get("id") == 81
 
+    async with create_async_session() as session:
+        post = await session.get(Post, 1)
+        assert post.reply_count == 5
+
     # delete created reply to maintain database state
     async with create_async_session() as session:
         query = select(Reply).filter(Reply.id == reply.get("id"))
@@ -168,8 +407,60 @@ async def test_create_reply():
 
         assert created_reply is None
 
+    restore_counters()
+
     # delete dependency overwrite - don't want to conflict with other tests
-    del api.dependency_overrides[get_current_user]
+    del api.dependency_overrides[get_current_principal]
+
+
+@pytest.mark.asyncio
+async def test_create_replies_batch():
+    # mock authorization - return principal directly
+    api.dependency_overrides[get_current_principal] = override_get_current_principal_zak
+    body = [{"body": "Batch Reply #1"}, {"body": "Batch Reply #2"}]
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/post/3/replies/batch", json=body)
+
+    created = resp.json().get("created")
+
+    assert resp.status_code == 201
+    assert [reply.get("body") for reply in created] == [
+        "Batch Reply #1",
+        "Batch Reply #2",
+    ]
+    assert all(reply.get("post_id") == 3 for reply in created)
+    assert resp.json().get("errors") == []
+
+    async with create_async_session() as session:
+        assert (await session.get(Post, 3)).reply_count == 6
+
+    # fail case - post does not exist
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/post/2121/replies/batch", json=body)
+
+    assert resp.status_code == 404
+    assert resp.json() == {"detail": "This post does not exist"}
+
+    # fail case - no valid replies, post counter untouched
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/post/3/replies/batch", json=[{}, {"text": "Wrong key"}])
+
+    assert resp.status_code == 422
+    assert [error.get("index") for error in resp.json().get("detail")] == [0, 1]
+    async with create_async_session() as session:
+        assert (await session.get(Post, 3)).reply_count == 6
+
+    # delete created replies to maintain database state
+    async with create_async_session() as session:
+        await session.execute(
+            delete(Reply).where(Reply.id.in_([reply.get("id") for reply in created]))
+        )
+        await session.commit()
+    restore_counters()
+
+    # delete dependency overwrite - don't want to conflict with other tests
+    del api.dependency_overrides[get_current_principal]
 
 
 @pytest.mark.asyncio
@@ -226,6 +517,175 @@ async def test_get_recent_posts():
     assert resp.status_code == 404
 
 
+@pytest.mark.asyncio
+async def test_get_trending_posts():
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        before = await ac.get("/posts/trending?limit=20")
+        cursor = (await ac.get("/posts/trending?limit=5")).headers.get("X-Next-Cursor")
+        second_page = await ac.get(f"/posts/trending?limit=5&cursor={cursor}")
+
+    assert before.status_code == 200
+    assert len(before.json()) == 20
+    assert second_page.json() == before.json()[5:10]
+
+    # a new reply moves the post to the top - deleting it puts it back
+    api.dependency_overrides[get_current_principal] = override_get_current_principal_zak
+    api.dependency_overrides[get_current_user] = override_get_current_user_zak
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/post/1/reply", json={"body": "Trending reply"})
+        reply_id = resp.json().get("id")
+        replied = await ac.get("/posts/trending?limit=20")
+
+        await ac.delete(f"/reply/{reply_id}")
+        deleted = await ac.get("/posts/trending?limit=20")
+
+    assert replied.json()[0].get("id") == 1
+    assert [post.get("id") for post in deleted.json()] == [
+        post.get("id") for post in before.json()
+    ]
+
+    async with create_async_session() as session:
+        post = await session.get(Post, 1)
+        assert post.trending_score == pytest.approx(
+            trending.add_events(
+                trending.post_score(post.date_created), post.date_created, 4
+            )
+        )
+
+    # conditional requests - with and without nested replies
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        for url in (
+            "/posts/trending?limit=5",
+            "/posts/trending?limit=5&include=replies",
+        ):
+            resp = await ac.get(url)
+            not_modified = await ac.get(
+                url, headers={"If-None-Match": resp.headers.get("etag")}
+            )
+
+            assert resp.headers.get("etag") is not None
+            assert not_modified.status_code == 304
+
+    # failure case - invalid cursor
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/posts/trending?cursor=notacursor")
+
+    assert resp.status_code == 400
+
+    restore_counters()
+    # delete dependency overwrite - don't want to conflict with other tests
+    del api.dependency_overrides[get_current_principal]
+    del api.dependency_overrides[get_current_user]
+
+
+@pytest.mark.asyncio
+async def test_get_recent_posts_cursor():
+    # cursor pages match offset pages
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        first_page = await ac.get("/posts/recent?limit=5")
+        cursor = first_page.headers.get("X-Next-Cursor")
+        second_page = await ac.get(f"/posts/recent?limit=5&cursor={cursor}")
+        offset_page = await ac.get("/posts/recent?skip=5&limit=5")
+
+    assert cursor is not None
+    assert second_page.status_code == 200
+    assert second_page.json() == offset_page.json()
+
+    # last page has no next cursor
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/posts/recent?skip=15&limit=10")
+
+    assert resp.status_code == 200
+    assert resp.headers.get("X-Next-Cursor") is None
+
+    # failure case - invalid cursor
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/posts/recent?cursor=notacursor")
+
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.mark.asyncio
+async def test_following_posts_timeline_fan_out():
+    # jess creates a post - fanned out to zak's timeline
+    api.dependency_overrides[get_current_principal] = (
+        override_get_current_principal_jess
+    )
+    api.dependency_overrides[get_current_user] = override_get_current_user_zak
+
+    body = {"title": "Fan out post", "body": "Should show up in followers feed"}
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/post", json=body)
+        post_id = resp.json().get("id")
+
+        resp = await ac.get("/posts/following?limit=1")
+
+    assert resp.status_code == 200
+    assert resp.json()[0].get("id") == post_id
+
+    # delete created post and its timeline entries to maintain database state
+    async with create_async_session() as session:
+        query = select(Post).filter(Post.id == post_id)
+        result = await session.execute(query)
+        await session.execute(
+            delete(TimelineEntry).where(TimelineEntry.post_id == post_id)
+        )
+        await session.delete(result.scalar_one())
+        await session.commit()
+    restore_counters()
+
+    # delete dependency overwrites - don't want to conflict with other tests
+    del api.dependency_overrides[get_current_principal]
+    del api.dependency_overrides[get_current_user]
+
+
+@pytest.mark.asyncio
+async def test_following_posts_memory_feed(monkeypatch):
+    api.dependency_overrides[get_current_user] = override_get_current_user_zak
+
+    # default feed mode for comparison
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        expected = await ac.get("/posts/following?skip=2&limit=4")
+
+    monkeypatch.setattr(timeline, "FEED_MODE", "memory")
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        first_page = await ac.get("/posts/following?skip=2&limit=2")
+        cursor = first_page.headers.get("X-Next-Cursor")
+        second_page = await ac.get(f"/posts/following?limit=2&cursor={cursor}")
+
+    assert first_page.status_code == 200
+    assert first_page.json() + second_page.json() == expected.json()
+    assert feed_cache.stats().get("authors") == 2
+
+    del api.dependency_overrides[get_current_user]
+
+
+@pytest.mark.asyncio
+async def test_following_posts_memory_feed_bounded(monkeypatch):
+    api.dependency_overrides[get_current_user] = override_get_current_user_zak
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        expected = await ac.get("/posts/following?limit=6")
+
+    # one author per query and room for only one author - the feed still holds both
+    monkeypatch.setattr(timeline, "FEED_MODE", "memory")
+    monkeypatch.setattr(batch, "BATCH_CHUNK_SIZE", 1)
+    monkeypatch.setattr(feed_cache, "max_authors", 1)
+    monkeypatch.setattr(feed_cache, "_authors", OrderedDict())
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/posts/following?limit=6")
+
+    assert resp.status_code == 200
+    assert resp.json() == expected.json()
+    assert len({post.get("user_id") for post in resp.json()}) == 2
+    assert feed_cache.stats().get("authors") == 1
+
+    del api.dependency_overrides[get_current_user]
+
+
 @pytest.mark.asyncio
 async def test_get_following_posts():
     # successful case
@@ -267,3 +727,38 @@ async def test_get_replies_from_posts():
         resp = await ac.get("/posts/replies?ids=222&ids=1717")
 
     assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_replies_from_posts_bounded(monkeypatch):
+    # one id per IN query - results still merged in order
+    monkeypatch.setattr(batch, "BATCH_CHUNK_SIZE", 1)
+    url = "/posts/replies?ids=2&ids=17&ids=5&replies-per-post=2&limit=4"
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        first_page = await ac.get(url)
+        cursor = first_page.headers.get("x-next-cursor")
+        second_page = await ac.get(f"{url}&cursor={cursor}")
+
+    replies = first_page.json() + second_page.json()
+
+    # 2 replies for each of the 3 posts across both pages
+    assert len(first_page.json()) == 4
+    assert len(replies) == 6
+    assert len({reply.get("id") for reply in replies}) == 6
+    assert sorted(reply.get("post_id") for reply in replies) == [2, 2, 5, 5, 17, 17]
+    assert second_page.headers.get("x-next-cursor") is None
+
+    # fail case - too many ids
+    monkeypatch.setattr(batch, "BATCH_MAX_IDS", 2)
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/posts/replies?ids=1&ids=2&ids=3")
+
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "Too many ids - at most 2 per request"}
+
+    # fail case - no ids
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/posts/replies")
+
+    assert resp.status_code == 400
@@ -2,6 +2,7 @@ import pytest
 from httpx import AsyncClient
 
 from BlogAPI.dependencies.dependencies import get_current_user
+from BlogAPI.util import batch
 from main import api
 
 # noinspection PyUnresolvedReferences
@@ -97,3 +98,32 @@ async def test_get_replies():
         resp = await ac.post("/replies", json=body)
 
     assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_replies_chunked(monkeypatch):
+    ids = [9, 3, 12, 7, 1, 5, 8, 2]
+
+    # default chunk size - one IN query
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        expected = (await ac.post("/replies", json={"ids": ids})).json()
+
+    # two ids per IN query, three replies per page - pages still in (date_created, id) order
+    monkeypatch.setattr(batch, "BATCH_CHUNK_SIZE", 2)
+    pages = []
+    cursor = None
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        while True:
+            url = "/replies?limit=3" + (f"&cursor={cursor}" if cursor else "")
+            resp = await ac.post(url, json={"ids": ids})
+            pages.append(resp.json())
+            cursor = resp.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+
+    assert [len(page) for page in pages] == [3, 3, 2]
+    assert [reply for page in pages for reply in page] == expected
+    assert sorted(reply.get("id") for reply in expected) == sorted(ids)
+    assert expected == sorted(
+        expected, key=lambda reply: (reply.get("date_created"), reply.get("id"))
+    )
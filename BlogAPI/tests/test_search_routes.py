@@ -0,0 +1,136 @@
+import pytest
+from httpx import AsyncClient
+
+from BlogAPI.dependencies.dependencies import get_current_principal
+from main import api
+
+from BlogAPI.tests.test_setup_and_utils import (
+    override_get_current_principal_zak,
+    restore_counters,
+)
+
+
+@pytest.mark.asyncio
+async def test_search():
+    # successful case - matches posts and replies, best match first
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/search?q=mock&limit=25")
+    results = resp.json()
+
+    assert resp.status_code == 200
+    assert len(results) == 25
+    assert {result.get("type") for result in results} == {"post", "reply"}
+    assert [result.get("score") for result in results] == sorted(
+        result.get("score") for result in results
+    )
+    assert "<mark>mock</mark>" in results[0].get("snippet")
+
+    # title matches - every post title holds its author's username
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/search?q=zaktest&in=post")
+    results = resp.json()
+
+    assert resp.status_code == 200
+    assert len(results) == 5
+    assert {result.get("username") for result in results} == {"zaktest"}
+
+    # replies carry the title of the post they reply to - "replies" stems to "reply"
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/search?q=replies&in=reply&limit=1")
+    reply = resp.json()[0]
+
+    assert reply.get("type") == "reply"
+    assert reply.get("title").endswith(f"#{reply.get('post_id')}")
+
+    # fts syntax in q is searched for literally, not parsed
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get('/search?q=mock" OR title:NEAR(')
+
+    assert resp.status_code == 200
+    assert resp.json() == []
+
+    # fail case - no terms
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/search?q=%20*%20")
+
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "No search terms given"}
+
+
+@pytest.mark.asyncio
+async def test_search_cursor():
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        first_page = await ac.get("/search?q=mock&limit=5")
+        cursor = first_page.headers.get("X-Next-Cursor")
+        second_page = await ac.get(f"/search?q=mock&limit=5&cursor={cursor}")
+        both_pages = await ac.get("/search?q=mock&limit=10")
+
+    assert second_page.status_code == 200
+    assert first_page.json() + second_page.json() == both_pages.json()
+
+    # fail case - bad cursor
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/search?q=mock&cursor=notacursor")
+
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_search_follows_writes():
+    # triggers keep the index in sync with creates, updates and deletes
+    api.dependency_overrides[get_current_principal] = override_get_current_principal_zak
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post(
+            "/post", json={"title": "Searchable", "body": "About zebras"}
+        )
+        post_id = resp.json().get("id")
+        created = await ac.get("/search?q=zebra*")
+
+        await ac.put(
+            f"/post/{post_id}", json={"title": "Searchable", "body": "About lions"}
+        )
+        updated_old = await ac.get("/search?q=zebras")
+        updated_new = await ac.get("/search?q=lions")
+
+        await ac.delete(f"/post/{post_id}")
+        deleted = await ac.get("/search?q=lions")
+
+    assert [result.get("id") for result in created.json()] == [post_id]
+    assert "<mark>zebras</mark>" in created.json()[0].get("snippet")
+    assert updated_old.json() == []
+    assert [result.get("id") for result in updated_new.json()] == [post_id]
+    assert deleted.json() == []
+
+    restore_counters()
+    # delete dependency overwrite - don't want to conflict with other tests
+    del api.dependency_overrides[get_current_principal]
+
+
+@pytest.mark.asyncio
+async def test_search_snippet_escaped():
+    # markup in a post body comes back as text - only the highlight tags are html
+    api.dependency_overrides[get_current_principal] = override_get_current_principal_zak
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post(
+            "/post",
+            json={
+                "title": "Markup",
+                "body": "<script>alert('giraffes')</script> <b>giraffes</b> & more",
+            },
+        )
+        post_id = resp.json().get("id")
+        results = (await ac.get("/search?q=giraffes")).json()
+
+        await ac.delete(f"/post/{post_id}")
+
+    snippet = results[0].get("snippet")
+    assert "<script>" not in snippet
+    assert "<b>" not in snippet
+    assert "&lt;script&gt;alert(&#x27;<mark>giraffes</mark>&#x27;)" in snippet
+    assert "&lt;b&gt;<mark>giraffes</mark>&lt;/b&gt; &amp; more" in snippet
+
+    restore_counters()
+    # delete dependency overwrite - don't want to conflict with other tests
+    del api.dependency_overrides[get_current_principal]
@@ -1,9 +1,13 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert
 from sqlalchemy.orm import sessionmaker, Session
 
-from BlogAPI.db.SQLAlchemy_models import Base, User
+from BlogAPI.db.SQLAlchemy_models import Base, User, user_follow
+from BlogAPI.db.counters import repair_counters
+from BlogAPI.dependencies.dependencies import Principal
+from BlogAPI.util.timeline import rebuild_timelines
+from BlogAPI.util.trending import repair_trending
 from main import api
 
 # This points the api/test client to test.db instead of blog.db
@@ -44,6 +48,39 @@ def override_get_current_user_elliot():
     )
 
 
+def override_get_current_principal_zak():
+    # for fastapi dependency overrides - skip authentication for tests
+    return Principal(id=1, username="zaktest")
+
+
+def override_get_current_principal_jess():
+    # for fastapi dependency overrides - skip authentication for tests
+    return Principal(id=2, username="jesstest")
+
+
+def restore_counters():
+    # tests that tidy up rows directly skip the routes' counter/trending score updates
+    with engine.begin() as connection:
+        repair_counters(connection)
+        repair_trending(connection)
+
+
+def restore_follows(*follows):
+    """
+    Puts back (user_id, following_id) rows of user_follow a test removed - row (A, F) means F follows A
+    Timelines and counters are rebuilt too, same as the follow route would leave them
+    """
+    with engine.begin() as connection:
+        for user_id, following_id in follows:
+            connection.execute(
+                insert(user_follow)
+                .prefix_with("OR IGNORE")
+                .values(user_id=user_id, following_id=following_id)
+            )
+        rebuild_timelines(connection)
+    restore_counters()
+
+
 @pytest.fixture
 def db_non_commit(monkeypatch):
     """
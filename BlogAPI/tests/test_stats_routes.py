@@ -0,0 +1,33 @@
+import pytest
+from httpx import AsyncClient
+
+from BlogAPI.routers import stats_routes
+from main import api
+
+
+@pytest.mark.asyncio
+async def test_get_db_stats(monkeypatch):
+    monkeypatch.setattr(stats_routes, "STATS_ENABLED", True)
+
+    # make sure pool is initialized before checking stats
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        await ac.get("/post/1")
+        resp = await ac.get("/stats/db")
+
+    stats = resp.json()
+
+    assert resp.status_code == 200
+    assert stats.get("initialized") is True
+    assert stats.get("checked_out") == 0
+    assert "size" in stats
+
+
+@pytest.mark.asyncio
+async def test_stats_disabled():
+    # off by default and left out of the docs
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/stats/db")
+        schema = await ac.get("/openapi.json")
+
+    assert resp.status_code == 404
+    assert not any(path.startswith("/stats") for path in schema.json().get("paths"))
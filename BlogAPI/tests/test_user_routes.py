@@ -3,11 +3,18 @@ import json
 import jwt
 import pytest
 from httpx import AsyncClient
-from sqlalchemy import select
+from sqlalchemy import select, delete, or_
 
-from BlogAPI.db.SQLAlchemy_models import user_follow
+from BlogAPI.db.SQLAlchemy_models import User, Post, Reply, RevokedToken, user_follow
 from BlogAPI.db.db_session_async import create_async_session
-from BlogAPI.dependencies.dependencies import get_current_user
+from BlogAPI.dependencies.dependencies import (
+    get_current_user,
+    get_current_principal,
+    user_cache,
+    invalidate_user,
+    Principal,
+)
+from BlogAPI.util.tokens import create_access_token, decode_access_token
 from main import api
 
 # noinspection PyUnresolvedReferences
@@ -16,6 +23,9 @@ from BlogAPI.tests.test_setup_and_utils import (
     db_non_commit,
     override_get_current_user_zak,
     override_get_current_user_elliot,
+    override_get_current_principal_jess,
+    restore_counters,
+    restore_follows,
 )
 
 
@@ -39,6 +49,7 @@ async def test_generate_token():
     assert resp.status_code == 200
     assert token_info.get("access_token") is not None
     assert token_info.get("token_type") == "bearer"
+    assert token_info.get("refresh_token") is not None
 
     # wrong username case
     body = {
@@ -71,6 +82,126 @@ async def test_generate_token():
     assert resp.json() == {"detail": "Invalid Username or Password"}
 
 
+@pytest.mark.asyncio
+async def test_refresh_token():
+    body = {
+        "username": "zaktest",
+        "password": 123,
+    }
+    header = {
+        "accept": "application/json",
+        "Content-Type": "application/x-www-form-urlencoded",
+    }
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/token", data=body, headers=header)
+
+    first_refresh_token = resp.json().get("refresh_token")
+
+    # successful case - returns new pair
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post(
+            "/token/refresh", json={"refresh_token": first_refresh_token}
+        )
+
+    token_info = resp.json()
+
+    assert resp.status_code == 200
+    assert token_info.get("access_token") is not None
+    assert token_info.get("refresh_token") != first_refresh_token
+
+    # fail case - refresh token already rotated
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post(
+            "/token/refresh", json={"refresh_token": first_refresh_token}
+        )
+
+    assert resp.status_code == 401
+    assert resp.json() == {"detail": "Invalid refresh token"}
+
+    # fail case - reuse above revoked the rest of the family
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post(
+            "/token/refresh", json={"refresh_token": token_info.get("refresh_token")}
+        )
+
+    assert resp.status_code == 401
+
+    # fail case - unknown refresh token
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/token/refresh", json={"refresh_token": "fake"})
+
+    assert resp.status_code == 401
+    assert resp.json() == {"detail": "Invalid refresh token"}
+
+
+@pytest.mark.asyncio
+async def test_logout():
+    body = {
+        "username": "zaktest",
+        "password": 123,
+    }
+    header = {
+        "accept": "application/json",
+        "Content-Type": "application/x-www-form-urlencoded",
+    }
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/token", data=body, headers=header)
+
+    token_info = resp.json()
+    header = {"Authorization": f"Bearer {token_info.get('access_token')}"}
+
+    # token works before logout
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/user/me", headers=header)
+
+    assert resp.status_code == 200
+
+    # successful case
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post(
+            "/logout",
+            headers=header,
+            json={"refresh_token": token_info.get("refresh_token")},
+        )
+
+    assert resp.status_code == 200
+    assert resp.json() == {"detail": "Success - Logged out"}
+
+    # fail case - access token revoked
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/user/me", headers=header)
+
+    assert resp.status_code == 401
+    assert resp.json() == {"detail": "Token has been revoked"}
+
+    # fail case - refresh token revoked
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post(
+            "/token/refresh", json={"refresh_token": token_info.get("refresh_token")}
+        )
+
+    assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_token_of_missing_user():
+    # valid signature but no such user - e.g. account deleted after the token was issued
+    token, _ = create_access_token(999999, "ghost")
+    header = {"Authorization": f"Bearer {token}"}
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        post_resp = await ac.post(
+            "/post", headers=header, json={"title": "Ghost", "body": "Boo"}
+        )
+        reply_resp = await ac.post(
+            "/post/1/reply", headers=header, json={"body": "Boo"}
+        )
+
+    assert post_resp.status_code == 401
+    assert post_resp.json() == {"detail": "Invalid Username or Password"}
+    assert reply_resp.status_code == 401
+
+
 @pytest.mark.asyncio
 async def test_get_user():
     # successful test case
@@ -82,6 +213,10 @@ async def test_get_user():
         "username": "zaktest",
         "email": "zaktest@example.com",
         "id": 1,
+        "post_count": 5,
+        "reply_count": 20,
+        "follower_count": 2,
+        "following_count": 2,
     }
 
 
@@ -158,8 +293,19 @@ async def test_get_me(monkeypatch):
         "username": "zaktest",
         "email": "zaktest@example.com",
         "id": 1,
+        "post_count": 5,
+        "reply_count": 20,
+        "follower_count": 2,
+        "following_count": 2,
     }
 
+    # user row cached after lookup, removed once invalidated
+    async with create_async_session() as session:
+        await get_current_user(Principal(id=1, username="zaktest"), session)
+    assert 1 in user_cache
+    invalidate_user(1)
+    assert 1 not in user_cache
+
 
 @pytest.mark.asyncio
 async def test_get_users_posts():
@@ -188,6 +334,23 @@ async def test_get_users_posts():
     assert resp.status_code == 404
 
 
+@pytest.mark.asyncio
+async def test_get_users_replies_cursor():
+    # oldest first - cursor pages match offset pages
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        first_page = await ac.get("/user/3/replies?limit=3&sort-newest-first=false")
+        cursor = first_page.headers.get("X-Next-Cursor")
+        second_page = await ac.get(
+            f"/user/3/replies?limit=3&sort-newest-first=false&cursor={cursor}"
+        )
+        offset_page = await ac.get(
+            "/user/3/replies?skip=3&limit=3&sort-newest-first=false"
+        )
+
+    assert second_page.status_code == 200
+    assert second_page.json() == offset_page.json()
+
+
 @pytest.mark.asyncio
 async def test_get_users_replies():
     # successful case - id:1, skip:1, limit:3, sort:new first
@@ -209,6 +372,223 @@ async def test_get_users_replies():
     assert replies[4].get("body") == "This is a reply of mock data. Reply #5"
 
 
+@pytest.mark.asyncio
+async def test_delete_me():
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        before = {
+            user_id: (await ac.get(f"/user/{user_id}")).json() for user_id in (1, 2)
+        }
+        post_before = (await ac.get("/post/1")).json()
+
+    # user with a post (replied to by jess), a reply to zak's post and follows both ways with zak
+    async with create_async_session() as session:
+        user = User(
+            username="deletetest",
+            email="deletetest@example.com",
+            hs_password="$2b$12$avqsZP6Gt1Ixgxd7C9BQFe/I44yAm4sqklNUl9DFbyUhLBRzDQtCK",
+        )
+        session.add(user)
+        await session.commit()
+        user_id = user.id
+
+        await session.execute(
+            user_follow.insert().values(
+                [
+                    {"user_id": 1, "following_id": user_id},
+                    {"user_id": user_id, "following_id": 1},
+                ]
+            )
+        )
+        await session.commit()
+    restore_counters()
+
+    def override_get_current_principal_delete():
+        return Principal(id=user_id, username="deletetest")
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        api.dependency_overrides[get_current_principal] = (
+            override_get_current_principal_delete
+        )
+        resp = await ac.post("/post", json={"title": "Doomed", "body": "Farewell"})
+        post_id = resp.json().get("id")
+        await ac.post("/post/1/reply", json={"body": "Leaving soon"})
+
+        api.dependency_overrides[get_current_principal] = (
+            override_get_current_principal_jess
+        )
+        await ac.post(f"/post/{post_id}/reply", json={"body": "Nice post"})
+
+        api.dependency_overrides[get_current_principal] = (
+            override_get_current_principal_delete
+        )
+        resp = await ac.delete("/user/me")
+
+        after = {
+            user_id: (await ac.get(f"/user/{user_id}")).json() for user_id in (1, 2)
+        }
+        post_after = (await ac.get("/post/1")).json()
+        search = await ac.get("/search?q=farewell")
+
+        # fail case - already deleted
+        second_delete = await ac.delete("/user/me")
+
+        # fail case - writes by a principal checked before the delete hit the foreign keys
+        late_post = await ac.post("/post", json={"title": "Late", "body": "Too late"})
+        late_replies = await ac.post(
+            "/post/1/replies/batch", json=[{"body": "Too late"}]
+        )
+
+    assert resp.status_code == 200
+    assert resp.json() == {"detail": "success"}
+    assert second_delete.status_code == 401
+    assert late_post.status_code == 401
+    assert late_replies.status_code == 401
+
+    # counters of users/posts left behind are back where they started
+    assert after == before
+    assert post_after == post_before
+    assert search.json() == []
+
+    # everything owned by the user is gone
+    async with create_async_session() as session:
+        assert await session.get(User, user_id) is None
+        result = await session.execute(select(Post.id).where(Post.user_id == user_id))
+        assert result.all() == []
+        result = await session.execute(
+            select(Reply.id).where(
+                or_(Reply.user_id == user_id, Reply.post_id == post_id)
+            )
+        )
+        assert result.all() == []
+        result = await session.execute(
+            select(user_follow).where(
+                or_(
+                    user_follow.c.user_id == user_id,
+                    user_follow.c.following_id == user_id,
+                )
+            )
+        )
+        assert result.all() == []
+
+    restore_counters()
+    # delete dependency overwrite - don't want to conflict with other tests
+    del api.dependency_overrides[get_current_principal]
+
+
+@pytest.mark.asyncio
+async def test_delete_me_revokes_token():
+    async with create_async_session() as session:
+        user = User(
+            username="deletetoken",
+            email="deletetoken@example.com",
+            hs_password="$2b$12$avqsZP6Gt1Ixgxd7C9BQFe/I44yAm4sqklNUl9DFbyUhLBRzDQtCK",
+        )
+        session.add(user)
+        await session.commit()
+        user_id = user.id
+
+    token, _ = create_access_token(user_id, "deletetoken")
+    header = {"Authorization": f"Bearer {token}"}
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.delete("/user/me", headers=header)
+        post_resp = await ac.post(
+            "/post", headers=header, json={"title": "Ghost", "body": "Boo"}
+        )
+        logout_resp = await ac.post("/logout", headers=header)
+
+    assert resp.status_code == 200
+
+    # revocation outlives the user
+    assert post_resp.status_code == 401
+    assert post_resp.json() == {"detail": "Token has been revoked"}
+    assert logout_resp.status_code == 401
+
+    async with create_async_session() as session:
+        revoked = await session.get(RevokedToken, decode_access_token(token).get("jti"))
+        assert revoked.user_id == user_id
+
+
+@pytest.mark.asyncio
+async def test_delete_me_other_token_after_id_reused():
+    async with create_async_session() as session:
+        user = User(
+            username="deleteagain",
+            email="deleteagain@example.com",
+            hs_password="$2b$12$avqsZP6Gt1Ixgxd7C9BQFe/I44yAm4sqklNUl9DFbyUhLBRzDQtCK",
+        )
+        session.add(user)
+        await session.commit()
+        user_id = user.id
+
+    # two logins of the same account - only the one deleting it is revoked
+    token, _ = create_access_token(user_id, "deleteagain")
+    other_token, _ = create_access_token(user_id, "deleteagain")
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.delete("/user/me", headers={"Authorization": f"Bearer {token}"})
+
+    assert resp.status_code == 200
+
+    # next new user gets the deleted user's id
+    async with create_async_session() as session:
+        new_user = User(
+            username="newcomer",
+            email="newcomer@example.com",
+            hs_password="$2b$12$avqsZP6Gt1Ixgxd7C9BQFe/I44yAm4sqklNUl9DFbyUhLBRzDQtCK",
+        )
+        session.add(new_user)
+        await session.commit()
+        new_user_id = new_user.id
+
+    assert new_user_id == user_id
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        header = {"Authorization": f"Bearer {other_token}"}
+        me_resp = await ac.get("/user/me", headers=header)
+        delete_resp = await ac.delete("/user/me", headers=header)
+
+    assert me_resp.status_code == 401
+    assert delete_resp.status_code == 401
+
+    async with create_async_session() as session:
+        await session.execute(delete(User).where(User.id == new_user_id))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_export_user(monkeypatch):
+    # small partitions so the export is streamed over several chunks
+    monkeypatch.setattr("BlogAPI.util.export.EXPORT_BATCH_SIZE", 3)
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/user/1/export")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert lines[0]["type"] == "user"
+    assert lines[0]["username"] == "zaktest"
+
+    posts = [line for line in lines if line["type"] == "post"]
+    replies = [line for line in lines if line["type"] == "reply"]
+    assert len(lines) == 1 + len(posts) + len(replies)
+    assert {post["user_id"] for post in posts} == {1}
+    assert {reply["user_id"] for reply in replies} == {1}
+    assert replies[0]["body"] == "This is a reply of mock data. Reply #1"
+    # posts come before replies, each oldest first
+    assert [line["type"] for line in lines[1:]] == ["post"] * len(posts) + [
+        "reply"
+    ] * len(replies)
+    assert [post["id"] for post in posts] == sorted(post["id"] for post in posts)
+
+    # fail case - user does not exist
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/user/100000/export")
+
+    assert resp.status_code == 404
+    assert resp.json() == {"detail": "This user does not exist"}
+
+
 @pytest.mark.asyncio
 async def test_follow_user(db_non_commit):
     # fail case - user already followed
@@ -220,6 +600,22 @@ async def test_follow_user(db_non_commit):
     assert resp.status_code == 409
     assert resp.json() == {"detail": "User already followed"}
 
+    # fail case - user does not exist
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/user/follow/999999")
+
+    assert resp.status_code == 404
+    assert resp.json() == {"detail": "This user does not exist"}
+
+    # fail case - follower deleted after authenticating, not a duplicate follow
+    api.dependency_overrides[get_current_user] = lambda: User(
+        id=999999, username="ghost"
+    )
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.post("/user/follow/2")
+
+    assert resp.status_code == 401
+
     # successful case
     # mock authorization - return user directly
     api.dependency_overrides[get_current_user] = override_get_current_user_elliot
@@ -251,11 +647,13 @@ async def test_unfollow_user():
     assert resp.status_code == 404
     assert resp.json() == {"detail": "This user is not currently being followed"}
 
-    # reinsert row to maintain database state
+    # counters only moved once
     async with create_async_session() as session:
-        stmt = user_follow.insert().values(user_id=2, following_id=1)
-        await session.execute(stmt)
-        await session.commit()
+        assert (await session.get(User, 1)).following_count == 1
+        assert (await session.get(User, 2)).follower_count == 1
+
+    # reinsert row (and zak's timeline entries for user 2) to maintain database state
+    restore_follows((2, 1))
 
     # verify reinsert successful
     async with create_async_session() as session:
@@ -289,6 +687,46 @@ async def test_get_followers():
     assert len(followers) == 0
 
 
+@pytest.mark.asyncio
+async def test_get_followers_paginated():
+    # first page - ids only
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/user/1/followers?limit=1&ids-only=true")
+
+    cursor = resp.headers.get("X-Next-Cursor")
+
+    assert resp.status_code == 200
+    assert resp.json() == [2]
+    assert cursor is not None
+
+    # second page - full user objects
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get(f"/user/1/followers?limit=1&cursor={cursor}")
+
+    followers = resp.json()
+
+    assert resp.status_code == 200
+    assert len(followers) == 1
+    assert followers[0].get("username") == "theotest"
+
+
+@pytest.mark.asyncio
+async def test_get_users_following():
+    # zak follows jess and theo
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/user/1/following")
+
+    following = resp.json()
+
+    assert resp.status_code == 200
+    assert [user.get("username") for user in following] == ["jesstest", "theotest"]
+
+    async with AsyncClient(app=api, base_url="http://127.0.0.1:8000") as ac:
+        resp = await ac.get("/user/1/following?ids-only=true")
+
+    assert resp.json() == [2, 3]
+
+
 @pytest.mark.asyncio
 async def test_get_following():
     # successful case - user a following
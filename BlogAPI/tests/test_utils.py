@@ -1,3 +1,6 @@
+import time
+
+import jwt
 import pytest
 from fastapi.exceptions import HTTPException
 from sqlalchemy import select, func
@@ -5,6 +8,15 @@ from sqlalchemy import select, func
 from BlogAPI.db.SQLAlchemy_models import User
 from BlogAPI.db.db_session_async import create_async_session
 from BlogAPI.tests.test_setup_and_utils import TestingSessionLocal
+from BlogAPI.util.bloom_filter import BloomFilter
+from BlogAPI.util.cache import TTLCache
+from BlogAPI.util.response_cache import ResponseCache
+from BlogAPI.util.tokens import create_access_token, decode_access_token, token_cache
+from BlogAPI.util.password_hashing import (
+    PasswordHasher,
+    hash_password,
+    verify_password,
+)
 from BlogAPI.util.utils import validate_new_user, authenticate_user
 
 
@@ -51,3 +63,111 @@ async def test_validate_new_user():
 
     # test valid email and username (both not taken)
     assert await validate_new_user("jim", "jim@example.com") is True
+
+
+def test_ttl_cache(monkeypatch):
+    cache = TTLCache(max_size=2, ttl=10)
+
+    # miss then hit
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    # least recently used entry ("b") evicted when full
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+    # invalidated entry is gone
+    cache.invalidate("a")
+    assert cache.get("a") is None
+
+    # expired entry is gone
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get("c") is None
+
+    stats = cache.stats()
+    assert stats.get("hits") == 4
+    assert stats.get("misses") == 3
+    assert stats.get("size") == 0
+
+
+def test_response_cache():
+    cache = ResponseCache(max_size=10, ttl=10)
+
+    version = cache.version
+    cache.set("post-1", "a", [("post", 1)], version)
+    cache.set("recent", "b", [("recent-posts",), ("post", 1), ("post", 2)], version)
+    cache.set("post-2", "c", [("post", 2)], version)
+
+    # every entry tagged with post 1 dropped, others kept
+    cache.invalidate(("post", 1))
+    assert cache.get("post-1") is None
+    assert cache.get("recent") is None
+    assert cache.get("post-2") == "c"
+
+    # page read before an invalidation is not stored after it
+    cache.set("post-1", "a", [("post", 1)], version)
+    assert cache.get("post-1") is None
+
+    assert cache.stats().get("invalidations") == 2
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_password():
+    hs_password = await hash_password("123")
+
+    assert await verify_password("123", hs_password) is True
+    assert await verify_password("password", hs_password) is False
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_backpressure():
+    hasher = PasswordHasher(max_workers=1, max_queue=0)
+
+    # simulate pool already saturated
+    hasher.in_flight = 1
+    with pytest.raises(HTTPException) as error:
+        await hasher.run(sum, [1, 2])
+
+    assert error.value.status_code == 503
+    assert hasher.stats().get("rejected") == 1
+
+    # accepted once there is capacity again
+    hasher.in_flight = 0
+    assert await hasher.run(sum, [1, 2]) == 3
+    assert hasher.stats().get("completed") == 1
+    hasher.shutdown()
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+
+    for i in range(1000):
+        bloom.add(f"token-{i}")
+
+    # no false negatives
+    assert all(f"token-{i}" in bloom for i in range(1000))
+
+    # false positives stay close to error rate
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+    assert len(bloom) == 1000
+
+
+def test_decode_access_token():
+    token, expiry = create_access_token(1, "zaktest")
+    hits = token_cache.hits
+
+    # first decode verifies signature, second is served from cache
+    assert decode_access_token(token).get("username") == "zaktest"
+    assert decode_access_token(token).get("username") == "zaktest"
+    assert token_cache.hits == hits + 1
+
+    # tampered token is rejected and not cached
+    with pytest.raises(jwt.DecodeError):
+        decode_access_token(token[:-2] + "xx")
@@ -0,0 +1,127 @@
+"""
+Bounds for batch endpoints - reads (/posts/replies, /replies) and creates (/posts/batch, /post/{id}/replies/batch)
+
+Id lists are capped at batch_max_ids, split into IN queries of at most batch_chunk_size parameters
+(SQLite's limit is 999 before 3.32) and results come back a page at a time with a cursor,
+so one request can only ever load a bounded number of rows.
+"""
+
+from typing import Any, Callable, Iterator, List, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select, desc, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from starlette import status
+
+from BlogAPI.config import config_settings
+
+BATCH_MAX_IDS = getattr(config_settings, "batch_max_ids", 100)
+BATCH_CHUNK_SIZE = getattr(config_settings, "batch_chunk_size", 500)
+BATCH_MAX_CREATE = getattr(config_settings, "batch_max_create", 100)
+
+
+def check_batch_ids(ids: List[int]) -> List[int]:
+    """
+    Returns ids without duplicates - 400 when empty or over BATCH_MAX_IDS
+    """
+    if not ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No ids given",
+        )
+
+    unique_ids = list(dict.fromkeys(ids))
+
+    if len(unique_ids) > BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many ids - at most {BATCH_MAX_IDS} per request",
+        )
+
+    return unique_ids
+
+
+def chunks(ids: List[int], size: Optional[int] = None) -> Iterator[List[int]]:
+    size = size or BATCH_CHUNK_SIZE
+    for start in range(0, len(ids), size):
+        yield ids[start : start + size]
+
+
+async def fetch_chunked(
+    session: AsyncSession,
+    build_query: Callable[[List[int]], Select],
+    ids: List[int],
+    limit: int,
+) -> List:
+    """
+    Runs build_query(chunk) for every chunk of ids and returns first limit rows by (date_created, id)
+    build_query must order by date_created, id and apply limit itself - each chunk then returns
+    at most limit rows and the first limit of their union is the page
+    """
+    rows = []
+    for chunk in chunks(ids):
+        result = await session.execute(build_query(chunk))
+        rows.extend(result.scalars())
+
+    rows.sort(key=lambda row: (row.date_created, row.id))
+    return rows[:limit]
+
+
+def validate_batch_items(
+    items: List[Any], model: Type[BaseModel]
+) -> Tuple[List[BaseModel], List[dict]]:
+    """
+    Validates each item against model on its own - returns valid items and an error per invalid one
+    400 when items is empty or over BATCH_MAX_CREATE, 422 with every item's error when none is valid
+    """
+    if not items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No items given",
+        )
+
+    if len(items) > BATCH_MAX_CREATE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many items - at most {BATCH_MAX_CREATE} per request",
+        )
+
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append(model.parse_obj(item))
+        except ValidationError as error:
+            errors.append({"index": index, "detail": error.errors()})
+
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=errors,
+        )
+
+    return valid, errors
+
+
+async def insert_many(
+    session: AsyncSession, entity, rows: List[dict], *owned_by
+) -> List:
+    """
+    Inserts rows with a single executemany and returns them as ORM objects, oldest first - caller commits
+    SQLite holds the write lock from the insert until commit, so the newest len(rows) rows matching
+    owned_by (e.g. Post.user_id == user.id) up to last_insert_rowid() are exactly the ones just inserted
+    """
+    await session.execute(insert(entity), rows)
+
+    result = await session.execute(text("SELECT last_insert_rowid()"))
+    last_id = result.scalar()
+
+    query = (
+        select(entity)
+        .where(*owned_by, entity.id <= last_id)
+        .order_by(desc(entity.id))
+        .limit(len(rows))
+    )
+    result = await session.execute(query)
+    return list(reversed(list(result.scalars())))
@@ -0,0 +1,131 @@
+"""
+Conditional GET - ETag / Last-Modified validators and 304 Not Modified responses
+
+Validators are built from the columns that change whenever the response body does
+(id, date_created, date_modified and reply_count for posts), so routes can check them
+with a narrow version query before loading and serializing the full rows.
+"""
+
+import datetime
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+from starlette import status
+
+from BlogAPI.db.SQLAlchemy_models import Post, Reply
+
+# columns every validator below is built from - select these for a cheap version lookup
+POST_VERSION_COLUMNS = (
+    Post.id,
+    Post.date_created,
+    Post.date_modified,
+    Post.reply_count,
+)
+REPLY_VERSION_COLUMNS = (Reply.id, Reply.date_created, Reply.date_modified)
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def _last_modified(row) -> datetime.datetime:
+    return row.date_modified or row.date_created
+
+
+def _post_parts(post) -> tuple:
+    return post.id, _last_modified(post).isoformat(), post.reply_count
+
+
+def _reply_parts(reply) -> tuple:
+    return reply.id, _last_modified(reply).isoformat()
+
+
+def _etag(parts: Iterable) -> str:
+    digest = hashlib.sha1(repr(tuple(parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def post_validators(post) -> Tuple[str, datetime.datetime]:
+    return _etag(_post_parts(post)), _last_modified(post)
+
+
+def reply_validators(reply) -> Tuple[str, datetime.datetime]:
+    return _etag(_reply_parts(reply)), _last_modified(reply)
+
+
+def posts_etag(posts: List) -> str:
+    return _etag(_post_parts(post) for post in posts)
+
+
+def replies_etag(replies: List) -> str:
+    return _etag(_reply_parts(reply) for reply in replies)
+
+
+def posts_with_replies_etag(posts: List) -> str:
+    return _etag(
+        (_post_parts(post), tuple(_reply_parts(reply) for reply in post.replies))
+        for post in posts
+    )
+
+
+def _http_date(value: datetime.datetime) -> str:
+    # stored datetimes are naive UTC
+    return format_datetime(value.replace(tzinfo=datetime.timezone.utc), usegmt=True)
+
+
+def _is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime.datetime]
+) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since - weak comparison as per RFC 7232
+        tags = {tag.strip().replace("W/", "", 1) for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.timezone.utc)
+
+    # http dates only have second precision
+    modified = last_modified.replace(microsecond=0, tzinfo=datetime.timezone.utc)
+    return modified <= since
+
+
+def _validator_headers(
+    etag: str, last_modified: Optional[datetime.datetime] = None
+) -> dict:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+    return headers
+
+
+def set_validators(
+    response: Response, etag: str, last_modified: Optional[datetime.datetime] = None
+):
+    response.headers.update(_validator_headers(etag, last_modified))
+
+
+def check_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime.datetime] = None
+) -> Optional[Response]:
+    """
+    Returns a 304 response when the request's validators still match - route returns it as is
+    """
+    if _is_not_modified(request, etag, last_modified):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers=_validator_headers(etag, last_modified),
+        )
+
+    return None
@@ -0,0 +1,64 @@
+"""
+Streaming NDJSON export of a user's history - GET /user/{id}/export
+
+One JSON object per line, each tagged with its "type":
+    {"type": "user", "id": 1, "username": "zaktest", ...}
+    {"type": "post", "id": 1, "title": "...", ...}
+    {"type": "reply", "id": 1, "body": "...", ...}
+
+Rows are read through a streaming result a partition at a time and only the response model's columns
+are selected (plain rows, no ORM objects in the identity map), so memory stays flat however much
+history the user has.
+"""
+
+from typing import AsyncIterator
+
+from sqlalchemy import select
+
+from BlogAPI.config import config_settings
+from BlogAPI.db.SQLAlchemy_models import User, Post, Reply
+from BlogAPI.db.db_session_async import create_async_session
+from BlogAPI.pydantic_models.post_models import PostOut
+from BlogAPI.pydantic_models.reply_models import ReplyOut
+from BlogAPI.pydantic_models.user_models import UserOut
+from BlogAPI.util.fast_json import dumps
+
+EXPORT_BATCH_SIZE = getattr(config_settings, "export_batch_size", 500)
+
+
+def _columns(entity, model):
+    return [getattr(entity, field) for field in model.__fields__]
+
+
+def _line(row_type: str, row) -> bytes:
+    return dumps({"type": row_type, **row._mapping}) + b"\n"
+
+
+async def export_user_lines(user_id: int) -> AsyncIterator[bytes]:
+    """
+    Yields the user then all their posts and replies (oldest first) as NDJSON, one chunk per partition
+    """
+    async with create_async_session() as session:
+        result = await session.execute(
+            select(*_columns(User, UserOut)).where(User.id == user_id)
+        )
+        user = result.first()
+        if user is None:
+            return
+
+        yield _line("user", user)
+
+        for row_type, entity, model in [
+            ("post", Post, PostOut),
+            ("reply", Reply, ReplyOut),
+        ]:
+            query = (
+                select(*_columns(entity, model))
+                .where(entity.user_id == user_id)
+                .order_by(entity.date_created, entity.id)
+                .execution_options(yield_per=EXPORT_BATCH_SIZE)
+            )
+            result = await session.stream(query)
+
+            async for rows in result.partitions(EXPORT_BATCH_SIZE):
+                yield b"".join(_line(row_type, row) for row in rows)
@@ -0,0 +1,95 @@
+"""
+Fast JSON path for list endpoints (fast_json_responses = True in config)
+
+FastAPI validates every returned row against the response model field by field, runs the result through
+jsonable_encoder and then the stdlib json encoder. Our rows come straight from our own tables, so this
+path copies the response model's fields off each row and hands them to orjson in one call.
+The response model still documents the endpoint - it just isn't re-checked at runtime.
+
+Compare both paths with:
+    python -m BlogAPI.tests.benchmark_serialization
+"""
+
+import datetime
+import json
+from typing import Any, Iterable, List, Type
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from BlogAPI.config import config_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to stdlib json
+    orjson = None
+
+FAST_JSON_ENABLED = getattr(config_settings, "fast_json_responses", False)
+
+
+def fast_json_enabled() -> bool:
+    return FAST_JSON_ENABLED
+
+
+def _default(value: Any):
+    # stdlib fallback only - orjson encodes datetimes natively in the same isoformat
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_to_dicts(rows: Iterable, model: Type[BaseModel]) -> List[dict]:
+    """
+    Copies model's fields off each row (ORM object or model instance) without validation
+    """
+    fields = list(model.__fields__)
+    return [{field: getattr(row, field) for field in fields} for row in rows]
+
+
+def route_headers(response: Response) -> dict:
+    """
+    Headers already set on route's response (cursor, ETag) - to carry over to a response built by hand
+    """
+    return {
+        key: value
+        for key, value in response.headers.items()
+        if key not in ("content-length", "content-type")
+    }
+
+
+def fast_json_response(
+    response: Response, rows: Iterable, model: Type[BaseModel]
+) -> FastJSONResponse:
+    """
+    Builds response for rows - keeps headers already set on route's response
+    """
+    return FastJSONResponse(rows_to_dicts(rows, model), headers=route_headers(response))
+
+
+def model_response(response: Response, items: List[BaseModel]) -> JSONResponse:
+    """
+    Builds response for already validated model instances - keeps headers already set on route's response
+    For responses that don't match the route's response_model (nested/sparse variants)
+    """
+    if fast_json_enabled():
+        return FastJSONResponse(
+            [item.dict() for item in items], headers=route_headers(response)
+        )
+
+    return JSONResponse(jsonable_encoder(items), headers=route_headers(response))
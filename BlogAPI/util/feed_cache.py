@@ -0,0 +1,232 @@
+"""
+In-memory pull model feed for /posts/following (feed_mode = "memory")
+
+Keeps each author's newest post ids in compact arrays and builds a feed page by k-way merging the
+lists of every followed author with a heap - posts are only read by primary key for the final page.
+Suits accounts following many authors where fanning out on write is too costly.
+The cache is per process, entries are reloaded after feed_cache_ttl seconds to pick up other workers' posts.
+"""
+
+import datetime
+import heapq
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from itertools import islice, dropwhile
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from BlogAPI.config import config_settings
+from BlogAPI.db.SQLAlchemy_models import Post, user_follow
+from BlogAPI.util import timeline
+from BlogAPI.util.batch import chunks
+from BlogAPI.util.pagination import decode_cursor
+
+FEED_CACHE_PER_AUTHOR = getattr(config_settings, "feed_cache_per_author", 200)
+FEED_CACHE_MAX_AUTHORS = getattr(config_settings, "feed_cache_max_authors", 10_000)
+FEED_CACHE_TTL = getattr(config_settings, "feed_cache_ttl", 60)
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def memory_feed_enabled() -> bool:
+    return timeline.FEED_MODE == "memory"
+
+
+def _to_micros(date_created: datetime.datetime) -> int:
+    return (date_created - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+class AuthorPosts:
+    """
+    One author's newest posts - parallel arrays sorted oldest to newest by (date_created, id)
+    """
+
+    __slots__ = ("micros", "ids", "loaded_at")
+
+    def __init__(self):
+        self.micros = array("q")
+        self.ids = array("q")
+        self.loaded_at = time.monotonic()
+
+    def newest_first(self):
+        for i in range(len(self.ids) - 1, -1, -1):
+            yield self.micros[i], self.ids[i]
+
+    def nbytes(self) -> int:
+        return (
+            sys.getsizeof(self) + sys.getsizeof(self.micros) + sys.getsizeof(self.ids)
+        )
+
+
+class FeedCache:
+    def __init__(self, per_author: int, max_authors: int, ttl: float):
+        self.per_author = per_author
+        self.max_authors = max_authors
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._authors: "OrderedDict[int, AuthorPosts]" = OrderedDict()
+
+    async def _load(
+        self, session: AsyncSession, author_ids: List[int]
+    ) -> Dict[int, AuthorPosts]:
+        """
+        Loads newest per_author posts for every author in author_ids - one query per chunk of ids
+        Returns what was loaded - the cache may already have evicted some of it
+        """
+        loaded: Dict[int, AuthorPosts] = {
+            author_id: AuthorPosts() for author_id in author_ids
+        }
+
+        for chunk in chunks(author_ids):
+            ranked = (
+                select(
+                    Post.user_id,
+                    Post.id,
+                    Post.date_created,
+                    func.row_number()
+                    .over(
+                        partition_by=Post.user_id,
+                        order_by=(desc(Post.date_created), desc(Post.id)),
+                    )
+                    .label("position"),
+                )
+                .where(Post.user_id.in_(chunk))
+                .subquery()
+            )
+            query = (
+                select(ranked.c.user_id, ranked.c.id, ranked.c.date_created)
+                .where(ranked.c.position <= self.per_author)
+                .order_by(ranked.c.date_created, ranked.c.id)
+            )
+            result = await session.execute(query)
+
+            for author_id, post_id, date_created in result:
+                loaded[author_id].micros.append(_to_micros(date_created))
+                loaded[author_id].ids.append(post_id)
+
+        for author_id, posts in loaded.items():
+            self._authors[author_id] = posts
+            self._authors.move_to_end(author_id)
+
+        while len(self._authors) > self.max_authors:
+            self._authors.popitem(last=False)
+
+        return loaded
+
+    async def _get_authors(
+        self, session: AsyncSession, author_ids: List[int]
+    ) -> List[AuthorPosts]:
+        """
+        Returns posts of every author in author_ids - held for this call even if the cache evicts them
+        """
+        now = time.monotonic()
+        authors: Dict[int, AuthorPosts] = {}
+        missing = []
+        for author_id in author_ids:
+            posts = self._authors.get(author_id)
+            if posts is None or now - posts.loaded_at > self.ttl:
+                missing.append(author_id)
+            else:
+                authors[author_id] = posts
+                self._authors.move_to_end(author_id)
+
+        self.misses += len(missing)
+        self.hits += len(author_ids) - len(missing)
+
+        if missing:
+            authors.update(await self._load(session, missing))
+
+        return [authors[author_id] for author_id in author_ids]
+
+    def add_post(self, author_id: int, post_id: int, date_created: datetime.datetime):
+        """
+        Records new post - authors not cached yet pick it up when loaded
+        """
+        posts = self._authors.get(author_id)
+        if posts is None:
+            return
+
+        posts.micros.append(_to_micros(date_created))
+        posts.ids.append(post_id)
+
+        if len(posts.ids) > self.per_author:
+            del posts.micros[0]
+            del posts.ids[0]
+
+    def remove_post(self, author_id: int, post_id: int):
+        posts = self._authors.get(author_id)
+        if posts is None:
+            return
+
+        try:
+            i = posts.ids.index(post_id)
+        except ValueError:
+            return
+
+        del posts.micros[i]
+        del posts.ids[i]
+
+    def remove_author(self, author_id: int):
+        self._authors.pop(author_id, None)
+
+    async def build_feed(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        limit: int,
+        skip: int = 0,
+        cursor: Optional[str] = None,
+    ) -> List[Post]:
+        """
+        Returns page of posts from authors user_id follows, newest first
+        """
+        query = select(user_follow.c.user_id).filter(
+            user_follow.c.following_id == user_id
+        )
+        result = await session.execute(query)
+        authors = await self._get_authors(session, list(result.scalars()))
+
+        # k-way merge of every author's newest first list
+        merged = heapq.merge(*(posts.newest_first() for posts in authors), reverse=True)
+
+        if cursor:
+            date_created, post_id = decode_cursor(cursor)
+            position = (_to_micros(date_created), post_id)
+            merged = dropwhile(lambda entry: entry >= position, merged)
+        else:
+            merged = islice(merged, skip, None)
+
+        post_ids = [post_id for _, post_id in islice(merged, limit)]
+        if not post_ids:
+            return []
+
+        query = select(Post).filter(Post.id.in_(post_ids))
+        result = await session.execute(query)
+        posts_by_id = {post.id: post for post in result.scalars()}
+
+        return [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
+
+    def stats(self) -> dict:
+        entries = sum(len(posts.ids) for posts in self._authors.values())
+        memory = sys.getsizeof(self._authors) + sum(
+            posts.nbytes() for posts in self._authors.values()
+        )
+        lookups = self.hits + self.misses
+        return {
+            "authors": len(self._authors),
+            "max_authors": self.max_authors,
+            "per_author": self.per_author,
+            "post_ids": entries,
+            "memory_bytes": memory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+feed_cache = FeedCache(FEED_CACHE_PER_AUTHOR, FEED_CACHE_MAX_AUTHORS, FEED_CACHE_TTL)
@@ -0,0 +1,89 @@
+"""
+Sparse fieldsets - ?fields=id,title,username on list endpoints
+
+Only the requested columns (plus the few needed for cursors/ETags) are selected, so large columns like
+post bodies are never read or sent. Responses are validated against a response model holding just the
+requested fields, built once per field combination.
+"""
+
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple, Type, get_type_hints
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel, create_model
+from starlette import status
+from starlette.responses import JSONResponse
+
+from BlogAPI.util.fast_json import (
+    fast_json_enabled,
+    fast_json_response,
+    model_response,
+)
+
+
+def parse_fields(
+    fields: Optional[str], model: Type[BaseModel]
+) -> Optional[Tuple[str, ...]]:
+    """
+    Splits comma separated field names - None when every field is wanted
+    Keeps response model's field order so equal requests share one partial model
+    """
+    if not fields:
+        return None
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(model.__fields__)
+
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+
+    return tuple(field for field in model.__fields__ if field in requested)
+
+
+@lru_cache(maxsize=256)
+def partial_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    Response model with only fields of model - same types, defaults and config
+    """
+    hints = get_type_hints(model)
+    definitions = {
+        field: (
+            hints[field],
+            (
+                ...
+                if model.__fields__[field].required
+                else model.__fields__[field].default
+            ),
+        )
+        for field in fields
+    }
+    return create_model(
+        f"{model.__name__}Fields", __config__=model.__config__, **definitions
+    )
+
+
+def project(entity, fields: Iterable[str], always: Iterable = ()) -> List:
+    """
+    Columns of entity for fields - plus columns in always (cursor/ETag inputs) if not requested already
+    """
+    columns = [getattr(entity, field) for field in fields]
+    selected = set(fields)
+    return columns + [column for column in always if column.key not in selected]
+
+
+def sparse_response(
+    response: Response, rows: Iterable, model: Type[BaseModel], fields: Tuple[str, ...]
+) -> JSONResponse:
+    """
+    Response holding just fields of each row - keeps headers already set on route's response
+    """
+    partial = partial_model(model, fields)
+
+    if fast_json_enabled():
+        # rows are our own - skip validation like the other fast path responses
+        return fast_json_response(response, rows, partial)
+
+    return model_response(response, [partial.from_orm(row) for row in rows])
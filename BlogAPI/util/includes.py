@@ -0,0 +1,123 @@
+"""
+?include=replies on post list endpoints - nests each post's first replies-per-post replies
+
+The page of posts is one query, the replies for every post on it are a second one - a ROW_NUMBER()
+window per post_id keeps at most replies-per-post rows each, however many replies a post has.
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.orm import aliased
+from starlette import status
+
+from BlogAPI.db.SQLAlchemy_models import Reply
+from BlogAPI.db.db_session_async import create_async_session
+from BlogAPI.pydantic_models.post_models import PostOut, PostWithRepliesOut
+from BlogAPI.pydantic_models.reply_models import ReplyOut
+from BlogAPI.util.conditional import (
+    check_not_modified,
+    set_validators,
+    posts_with_replies_etag,
+)
+from BlogAPI.util.fast_json import model_response
+
+INCLUDES = {"replies"}
+
+
+def parse_include(include: Optional[str], fields: Optional[tuple] = None) -> Set[str]:
+    """
+    Splits comma separated include names - sparse fieldsets (fields) can't be combined with them
+    """
+    if not include:
+        return set()
+
+    requested = {name.strip() for name in include.split(",") if name.strip()}
+    unknown = requested - INCLUDES
+
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown include: {', '.join(sorted(unknown))}",
+        )
+
+    if fields:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="fields and include can not be used together",
+        )
+
+    return requested
+
+
+def first_replies(post_ids: List[int], per_post: int):
+    """
+    Returns select of first per_post replies (oldest first) of each post in post_ids
+    and the aliased Reply it selects - order/filter with the alias's columns
+    """
+    ranked = (
+        select(
+            Reply,
+            func.row_number()
+            .over(partition_by=Reply.post_id, order_by=(Reply.date_created, Reply.id))
+            .label("position"),
+        )
+        .where(Reply.post_id.in_(post_ids))
+        .subquery()
+    )
+    ranked_reply = aliased(Reply, ranked)
+    return select(ranked_reply).where(ranked.c.position <= per_post), ranked_reply
+
+
+async def load_replies(post_ids: List[int], per_post: int) -> Dict[int, List[Reply]]:
+    """
+    Returns first per_post replies (oldest first) of every post in post_ids - one query
+    """
+    query, ranked_reply = first_replies(post_ids, per_post)
+    query = query.order_by(
+        ranked_reply.post_id, ranked_reply.date_created, ranked_reply.id
+    )
+
+    async with create_async_session() as session:
+        result = await session.execute(query)
+        replies = list(result.scalars())
+
+    replies_by_post = defaultdict(list)
+    for reply in replies:
+        replies_by_post[reply.post_id].append(reply)
+
+    return replies_by_post
+
+
+async def replies_response(
+    request: Request, response: Response, posts: List, per_post: int
+) -> Response:
+    """
+    Response for posts with their replies nested - ETag covers the nested replies too
+    """
+    nested = await attach_replies(posts, per_post)
+    etag = posts_with_replies_etag(nested)
+
+    not_modified = check_not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    set_validators(response, etag)
+    return model_response(response, nested)
+
+
+async def attach_replies(posts: List, per_post: int) -> List[PostWithRepliesOut]:
+    """
+    Nests first per_post replies into each of posts (ORM rows or PostOut)
+    """
+    replies_by_post = await load_replies([post.id for post in posts], per_post)
+
+    return [
+        PostWithRepliesOut(
+            **PostOut.from_orm(post).dict(),
+            replies=[ReplyOut.from_orm(reply) for reply in replies_by_post[post.id]],
+        )
+        for post in posts
+    ]
@@ -0,0 +1,86 @@
+import base64
+import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from starlette import status
+
+# response header holding the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(date_created: datetime.datetime, row_id: int) -> str:
+    """
+    Opaque cursor pointing at a row by (date_created, id)
+    """
+    raw = f"{date_created.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date_created, row_id = raw.split("|")
+        return datetime.datetime.fromisoformat(date_created), int(row_id)
+
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def after_cursor(cursor: str, date_column, id_column, newest_first: bool = True):
+    """
+    Filter clause for rows that come after cursor in (date_created, id) order
+    Uses a row value comparison so the (date_created, id) index can seek straight to the page
+    """
+    position = tuple_(date_column, id_column)
+    cursor_position = tuple_(*decode_cursor(cursor))
+
+    if newest_first:
+        return position < cursor_position
+    return position > cursor_position
+
+
+def set_next_cursor(response: Response, rows: List, limit: int) -> Optional[str]:
+    """
+    Adds cursor for the page after rows to response headers - only when the page was full
+    """
+    if not rows or len(rows) < limit:
+        return None
+
+    cursor = encode_cursor(rows[-1].date_created, rows[-1].id)
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+    return cursor
+
+
+def encode_id_cursor(row_id: int) -> str:
+    """
+    Opaque cursor for lists ordered by id alone
+    """
+    return base64.urlsafe_b64encode(str(row_id).encode()).decode().rstrip("=")
+
+
+def decode_id_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def set_next_id_cursor(response: Response, ids: List[int], limit: int) -> Optional[str]:
+    """
+    Adds cursor for the page after ids to response headers - only when the page was full
+    """
+    if not ids or len(ids) < limit:
+        return None
+
+    cursor = encode_id_cursor(ids[-1])
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+    return cursor
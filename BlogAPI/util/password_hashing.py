@@ -0,0 +1,113 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException
+from passlib.hash import bcrypt
+from starlette import status
+
+from BlogAPI.config import config_settings
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hash/verify on a dedicated thread pool so it never blocks the event loop
+    Calls beyond max_workers + max_queue are rejected straight away with a 503
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.rejected = 0
+        self.completed = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.hash_time_total = 0.0
+        self.hash_time_max = 0.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._metrics_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="bcrypt"
+            )
+        return self._executor
+
+    def _timed(self, submitted: float, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._metrics_lock:
+                self.completed += 1
+                self.queue_wait_total += started - submitted
+                self.queue_wait_max = max(self.queue_wait_max, started - submitted)
+                self.hash_time_total += finished - started
+                self.hash_time_max = max(self.hash_time_max, finished - started)
+
+    async def run(self, func, *args):
+        # backpressure - fail fast instead of letting logins pile up
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again",
+                headers={"Retry-After": "1"},
+            )
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), self._timed, time.perf_counter(), func, *args
+            )
+        finally:
+            self.in_flight -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_avg": (
+                self.queue_wait_total / self.completed if self.completed else 0.0
+            ),
+            "queue_wait_max": self.queue_wait_max,
+            "hash_time_avg": (
+                self.hash_time_total / self.completed if self.completed else 0.0
+            ),
+            "hash_time_max": self.hash_time_max,
+        }
+
+
+password_hasher = PasswordHasher(
+    max_workers=getattr(config_settings, "bcrypt_workers", min(4, os.cpu_count() or 1)),
+    max_queue=getattr(config_settings, "bcrypt_max_queue", 32),
+)
+
+
+async def hash_password(password: str) -> str:
+    """
+    Returns bcrypt hash of password - computed off the event loop
+    """
+    return await password_hasher.run(bcrypt.hash, password)
+
+
+async def verify_password(password: str, hs_password: str) -> bool:
+    """
+    Checks password against stored bcrypt hash - computed off the event loop
+    """
+    return await password_hasher.run(bcrypt.verify, password, hs_password)
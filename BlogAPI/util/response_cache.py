@@ -0,0 +1,91 @@
+"""
+Response cache for public GET routes
+
+Cached pages are tagged with the posts/users they contain - write routes call invalidate with the tags of
+whatever they changed, so only the affected entries are dropped. Entries also expire after
+response_cache_ttl seconds, which bounds how stale another worker process's cache can get.
+
+Tags used:
+    ("post", post_id)       - a post (and its reply count)
+    ("reply", reply_id)     - a reply
+    ("user", user_id)       - a user (and their counters)
+    ("user-posts", user_id) - pages listing a user's posts
+    ("recent-posts",)       - pages of the all users recent posts list
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, Set
+
+from BlogAPI.config import config_settings
+from BlogAPI.util.cache import TTLCache
+
+RESPONSE_CACHE_ENABLED = getattr(config_settings, "response_cache_enabled", True)
+RESPONSE_CACHE_SIZE = getattr(config_settings, "response_cache_size", 4096)
+RESPONSE_CACHE_TTL = getattr(config_settings, "response_cache_ttl", 30)
+
+
+class ResponseCache:
+    def __init__(self, max_size: int, ttl: float, enabled: bool = True):
+        self.enabled = enabled
+        self.entries = TTLCache(max_size=max_size, ttl=ttl)
+        self.invalidations = 0
+        # bumped on every invalidate - pages read before a write must not be stored after it
+        self.version = 0
+        self._tags: Dict[Hashable, Set[Hashable]] = defaultdict(set)
+        self._sets_since_prune = 0
+
+    def get(self, key: Hashable) -> Any:
+        if not self.enabled:
+            return None
+        return self.entries.get(key)
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable], version: int):
+        """
+        Stores value under key - version is self.version read before the database was queried
+        """
+        if not self.enabled or version != self.version:
+            return
+
+        self.entries.set(key, value)
+        for tag in tags:
+            self._tags[tag].add(key)
+
+        self._sets_since_prune += 1
+        if self._sets_since_prune >= self.entries.max_size:
+            self._prune()
+
+    def invalidate(self, *tags: Hashable):
+        self.version += 1
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                if key in self.entries:
+                    self.invalidations += 1
+                self.entries.invalidate(key)
+
+    def clear(self):
+        self.version += 1
+        self.entries.clear()
+        self._tags.clear()
+
+    def _prune(self):
+        # drop keys the LRU/TTL already evicted so the tag index can't outgrow the cache
+        for tag in list(self._tags):
+            keys = {key for key in self._tags[tag] if key in self.entries}
+            if keys:
+                self._tags[tag] = keys
+            else:
+                del self._tags[tag]
+        self._sets_since_prune = 0
+
+    def stats(self) -> dict:
+        return {
+            **self.entries.stats(),
+            "enabled": self.enabled,
+            "tags": len(self._tags),
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache(
+    RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, RESPONSE_CACHE_ENABLED
+)
@@ -0,0 +1,117 @@
+import datetime
+import hashlib
+import time
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from BlogAPI.config import config_settings
+from BlogAPI.db.SQLAlchemy_models import RevokedToken
+from BlogAPI.util.bloom_filter import BloomFilter
+
+REVOCATION_FILTER_CAPACITY = getattr(
+    config_settings, "revocation_filter_capacity", 100_000
+)
+# how often to pick up revocations made by other worker processes
+REVOCATION_SYNC_INTERVAL = getattr(config_settings, "revocation_sync_interval", 30)
+# how often to rebuild the filter from scratch so expired revocations drop out
+REVOCATION_REBUILD_INTERVAL = getattr(
+    config_settings, "revocation_rebuild_interval", 3600
+)
+
+
+def get_token_id(token: str, claims: dict) -> str:
+    """
+    Returns jti claim of token - tokens issued before jti existed fall back to a digest of the token
+    """
+    return claims.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+
+class RevocationList:
+    """
+    Revoked access tokens - persisted in revoked_tokens, mirrored in an in-memory bloom filter
+    Tokens missing from the filter are accepted without touching the database,
+    a filter hit is confirmed with a primary key lookup
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.filter = BloomFilter(capacity)
+        self.filter_hits = 0
+        self.false_positives = 0
+        self.last_synced: Optional[datetime.datetime] = None
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+
+    async def sync(self, session: AsyncSession):
+        """
+        Loads revocations from database - all unexpired ones on rebuild, otherwise only new ones
+        """
+        now = datetime.datetime.utcnow()
+        rebuild = self.last_synced is None or time.monotonic() >= self._next_rebuild
+
+        query = select(RevokedToken.token_id).filter(RevokedToken.expires_at > now)
+        if not rebuild:
+            # small overlap covers rows committed late by other processes
+            query = query.filter(
+                RevokedToken.date_created
+                >= self.last_synced - datetime.timedelta(seconds=5)
+            )
+
+        result = await session.execute(query)
+
+        if rebuild:
+            self.filter = BloomFilter(self.capacity)
+            self._next_rebuild = time.monotonic() + REVOCATION_REBUILD_INTERVAL
+
+        for token_id in result.scalars():
+            self.filter.add(token_id)
+
+        self.last_synced = now
+        self._next_sync = time.monotonic() + REVOCATION_SYNC_INTERVAL
+
+    async def is_revoked(self, session: AsyncSession, token_id: str) -> bool:
+        if time.monotonic() >= self._next_sync:
+            await self.sync(session)
+
+        if token_id not in self.filter:
+            return False
+
+        # possible false positive - confirm against table
+        self.filter_hits += 1
+        revoked = await session.get(RevokedToken, token_id)
+        if revoked is None:
+            self.false_positives += 1
+            return False
+
+        return True
+
+    async def revoke(
+        self,
+        session: AsyncSession,
+        token_id: str,
+        user_id: int,
+        expires_at: datetime.datetime,
+    ):
+        """
+        Adds revocation to session (caller commits) and to this process's filter straight away
+        """
+        if await session.get(RevokedToken, token_id) is None:
+            session.add(
+                RevokedToken(token_id=token_id, user_id=user_id, expires_at=expires_at)
+            )
+        self.filter.add(token_id)
+
+    def stats(self) -> dict:
+        return {
+            "filter_items": len(self.filter),
+            "filter_capacity": self.capacity,
+            "filter_bits": self.filter.num_bits,
+            "filter_hashes": self.filter.num_hashes,
+            "filter_hits": self.filter_hits,
+            "false_positives": self.false_positives,
+        }
+
+
+revocation_list = RevocationList(REVOCATION_FILTER_CAPACITY)
@@ -0,0 +1,174 @@
+"""
+Full-text search queries over the FTS5 tables in db/search.py - GET /search
+
+Posts and replies are matched in one UNION ALL, ranked by bm25 (title matches weigh more than body matches)
+and paged with a cursor on (score, type, id) - scores are stable until the matched rows change.
+"""
+
+import base64
+import html
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import (
+    column,
+    func,
+    literal,
+    literal_column,
+    select,
+    table,
+    tuple_,
+    union_all,
+)
+from starlette import status
+
+from BlogAPI.config import config_settings
+from BlogAPI.db.SQLAlchemy_models import Post, Reply
+
+SEARCH_TITLE_WEIGHT = getattr(config_settings, "search_title_weight", 5.0)
+SNIPPET_TOKENS = getattr(config_settings, "search_snippet_tokens", 16)
+HIGHLIGHT_START, HIGHLIGHT_END, ELLIPSIS = "<mark>", "</mark>", "…"
+# snippet() marks matches with control characters - the text around them is escaped before they become tags
+MATCH_START, MATCH_END = "\x02", "\x03"
+
+posts_fts = table("posts_fts", column("rowid"))
+replies_fts = table("replies_fts", column("rowid"))
+
+
+def match_query(q: str) -> str:
+    """
+    Turns user input into an FTS5 query - every word must match, a trailing * matches as a prefix
+    Words are quoted so FTS5 syntax (AND, NEAR, quotes, column filters) in q is searched for literally
+    """
+    terms = []
+    for word in q.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+
+    if not terms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No search terms given",
+        )
+
+    return " ".join(terms)
+
+
+def encode_search_cursor(score: float, row_type: str, row_id: int) -> str:
+    # repr round trips the float exactly
+    raw = f"{score!r}|{row_type}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        score, row_type, row_id = raw.split("|")
+        return float(score), row_type, int(row_id)
+
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def _snippet(fts_table: str):
+    # -1 - snippet from whichever column matched best
+    return func.snippet(
+        literal_column(fts_table),
+        -1,
+        MATCH_START,
+        MATCH_END,
+        ELLIPSIS,
+        SNIPPET_TOKENS,
+    )
+
+
+def highlight(snippet: str) -> str:
+    """
+    Turns a raw snippet into HTML - post/reply text is escaped, matches are wrapped in <mark> tags
+    """
+    return (
+        html.escape(snippet)
+        .replace(MATCH_START, HIGHLIGHT_START)
+        .replace(MATCH_END, HIGHLIGHT_END)
+    )
+
+
+def search_result(row) -> dict:
+    """
+    Result row with its snippet made safe to render as HTML
+    """
+    return {**row._mapping, "snippet": highlight(row.snippet)}
+
+
+def _post_matches(match: str):
+    return (
+        select(
+            literal("post").label("type"),
+            Post.id.label("id"),
+            Post.id.label("post_id"),
+            Post.title.label("title"),
+            _snippet("posts_fts").label("snippet"),
+            Post.user_id.label("user_id"),
+            Post.username.label("username"),
+            Post.date_created.label("date_created"),
+            func.bm25(literal_column("posts_fts"), SEARCH_TITLE_WEIGHT, 1.0).label(
+                "score"
+            ),
+        )
+        .select_from(posts_fts)
+        .join(Post, Post.id == posts_fts.c.rowid)
+        .where(literal_column("posts_fts").op("MATCH")(match))
+    )
+
+
+def _reply_matches(match: str):
+    return (
+        select(
+            literal("reply").label("type"),
+            Reply.id.label("id"),
+            Reply.post_id.label("post_id"),
+            # title of the post replied to
+            Post.title.label("title"),
+            _snippet("replies_fts").label("snippet"),
+            Reply.user_id.label("user_id"),
+            Reply.username.label("username"),
+            Reply.date_created.label("date_created"),
+            func.bm25(literal_column("replies_fts")).label("score"),
+        )
+        .select_from(replies_fts)
+        .join(Reply, Reply.id == replies_fts.c.rowid)
+        .join(Post, Post.id == Reply.post_id)
+        .where(literal_column("replies_fts").op("MATCH")(match))
+    )
+
+
+def search_query(
+    q: str, limit: int, cursor: Optional[str] = None, search_in: Optional[str] = None
+):
+    """
+    Select of one page of matches for q - best match first
+    search_in limits the search to "post" or "reply"
+    """
+    match = match_query(q)
+
+    matches = []
+    if search_in in (None, "post"):
+        matches.append(_post_matches(match))
+    if search_in in (None, "reply"):
+        matches.append(_reply_matches(match))
+
+    results = (
+        union_all(*matches).subquery() if len(matches) > 1 else matches[0].subquery()
+    )
+    position = (results.c.score, results.c.type, results.c.id)
+
+    query = select(results).order_by(*position).limit(limit)
+    if cursor:
+        query = query.where(tuple_(*position) > tuple_(*decode_search_cursor(cursor)))
+
+    return query
@@ -0,0 +1,162 @@
+"""
+Fan-out-on-write timelines for /posts/following
+
+Every post is copied (as a small timeline_entries row) into each follower's timeline when it is created,
+so reading a feed page is a single range scan on (user_id, date_created, post_id).
+
+Rebuild every timeline from posts/user_follow with:
+    python -m BlogAPI.util.timeline
+"""
+
+import datetime
+
+from sqlalchemy import select, insert, delete, desc, func, literal, tuple_
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import DATETIME, Integer
+
+from BlogAPI.config import config_settings
+from BlogAPI.db.SQLAlchemy_models import Post, TimelineEntry, user_follow
+from BlogAPI.db.db_session_async import create_async_session
+
+# "timeline" reads the materialized timelines, "memory" merges cached per author lists (see feed_cache.py),
+# "query" builds the feed from posts on every request
+FEED_MODE = getattr(config_settings, "feed_mode", "timeline")
+# newest entries kept per timeline - older posts fall off the feed
+TIMELINE_CAP = getattr(config_settings, "timeline_cap", 800)
+# trimming scans every follower's timeline, so only do it on every nth post
+TIMELINE_TRIM_EVERY = getattr(config_settings, "timeline_trim_every", 50)
+
+TIMELINE_COLUMNS = ["user_id", "post_id", "author_id", "date_created"]
+
+
+def timelines_enabled() -> bool:
+    return FEED_MODE == "timeline"
+
+
+def _followers_of(author_id: int):
+    # row (user_id=A, following_id=F) means F follows A
+    return select(user_follow.c.following_id).where(user_follow.c.user_id == author_id)
+
+
+def _trim_statement(owner_ids):
+    """
+    Deletes entries past TIMELINE_CAP for every timeline owned by owner_ids (a subquery)
+    """
+    ranked = (
+        select(
+            TimelineEntry.user_id,
+            TimelineEntry.post_id,
+            func.row_number()
+            .over(
+                partition_by=TimelineEntry.user_id,
+                order_by=(
+                    desc(TimelineEntry.date_created),
+                    desc(TimelineEntry.post_id),
+                ),
+            )
+            .label("position"),
+        )
+        .where(TimelineEntry.user_id.in_(owner_ids))
+        .subquery()
+    )
+    stale = select(ranked.c.user_id, ranked.c.post_id).where(
+        ranked.c.position > TIMELINE_CAP
+    )
+
+    return (
+        delete(TimelineEntry)
+        .where(tuple_(TimelineEntry.user_id, TimelineEntry.post_id).in_(stale))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def fan_out_post(post_id: int, author_id: int, date_created: datetime.datetime):
+    """
+    Copies new post into every follower's timeline - runs as a background task after create_post responds
+    """
+    rows = select(
+        user_follow.c.following_id,
+        literal(post_id, Integer),
+        literal(author_id, Integer),
+        literal(date_created, DATETIME),
+    ).where(user_follow.c.user_id == author_id)
+
+    async with create_async_session() as session:
+        await session.execute(
+            insert(TimelineEntry)
+            .from_select(TIMELINE_COLUMNS, rows)
+            .prefix_with("OR IGNORE")
+        )
+
+        if post_id % TIMELINE_TRIM_EVERY == 0:
+            await session.execute(_trim_statement(_followers_of(author_id)))
+
+        await session.commit()
+
+
+async def backfill_timeline(session: AsyncSession, follower_id: int, author_id: int):
+    """
+    Adds author's recent posts to follower's timeline - caller commits
+    """
+    rows = (
+        select(literal(follower_id, Integer), Post.id, Post.user_id, Post.date_created)
+        .where(Post.user_id == author_id)
+        .order_by(desc(Post.date_created), desc(Post.id))
+        .limit(TIMELINE_CAP)
+    )
+
+    await session.execute(
+        insert(TimelineEntry)
+        .from_select(TIMELINE_COLUMNS, rows)
+        .prefix_with("OR IGNORE")
+    )
+    await session.execute(_trim_statement([follower_id]))
+
+
+async def remove_from_timeline(session: AsyncSession, follower_id: int, author_id: int):
+    """
+    Removes author's posts from follower's timeline - caller commits
+    """
+    await session.execute(
+        delete(TimelineEntry).where(
+            TimelineEntry.user_id == follower_id, TimelineEntry.author_id == author_id
+        )
+    )
+
+
+def rebuild_timelines(connection: Connection):
+    """
+    Rebuilds every timeline from scratch (newest TIMELINE_CAP posts per follower)
+    """
+    ranked = (
+        select(
+            user_follow.c.following_id.label("user_id"),
+            Post.id.label("post_id"),
+            Post.user_id.label("author_id"),
+            Post.date_created,
+            func.row_number()
+            .over(
+                partition_by=user_follow.c.following_id,
+                order_by=(desc(Post.date_created), desc(Post.id)),
+            )
+            .label("position"),
+        )
+        .join(Post, Post.user_id == user_follow.c.user_id)
+        .subquery()
+    )
+    rows = select(
+        ranked.c.user_id, ranked.c.post_id, ranked.c.author_id, ranked.c.date_created
+    ).where(ranked.c.position <= TIMELINE_CAP)
+
+    connection.execute(delete(TimelineEntry))
+    connection.execute(insert(TimelineEntry).from_select(TIMELINE_COLUMNS, rows))
+
+
+if __name__ == "__main__":
+    from BlogAPI.db.db_session import engine
+
+    with engine.begin() as conn:
+        rebuild_timelines(conn)
+
+    print("Timelines rebuilt successfully")
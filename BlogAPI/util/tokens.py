@@ -0,0 +1,99 @@
+import datetime
+import hashlib
+import hmac
+import secrets
+import time
+from typing import Tuple
+
+import jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from BlogAPI.config import config_settings
+from BlogAPI.db.SQLAlchemy_models import RefreshToken
+from BlogAPI.util.cache import TTLCache
+
+ACCESS_TOKEN_EXPIRE_MINUTES = getattr(
+    config_settings, "access_token_expire_minutes", 15
+)
+REFRESH_TOKEN_EXPIRE_DAYS = getattr(config_settings, "refresh_token_expire_days", 30)
+
+# verified token digest -> decoded claims, entries never outlive the token's exp
+token_cache = TTLCache(
+    max_size=getattr(config_settings, "token_cache_size", 4096),
+    ttl=getattr(config_settings, "token_cache_ttl", 300),
+)
+
+
+def create_access_token(user_id: int, username: str) -> Tuple[str, datetime.datetime]:
+    """
+    Returns short lived JWT holding user id and username, plus its expiry
+    """
+    expiry = datetime.datetime.utcnow() + datetime.timedelta(
+        minutes=ACCESS_TOKEN_EXPIRE_MINUTES
+    )
+
+    user_info = {
+        "id": user_id,
+        "username": username,
+        "exp": expiry,
+        # unique id so this token can be revoked on its own
+        "jti": secrets.token_hex(16),
+    }
+
+    return jwt.encode(user_info, config_settings.secret_key), expiry
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Returns claims of a verified access token
+    Raises the same jwt errors as jwt.decode - failed tokens are never cached
+    """
+    digest = hashlib.sha256(token.encode()).hexdigest()
+
+    user_info = token_cache.get(digest)
+    if user_info is not None:
+        return user_info
+
+    user_info = jwt.decode(token, config_settings.secret_key, algorithms=["HS256"])
+
+    ttl = token_cache.ttl
+    if user_info.get("exp") is not None:
+        ttl = min(ttl, user_info["exp"] - time.time())
+
+    if ttl > 0:
+        token_cache.set(digest, user_info, ttl)
+
+    return user_info
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Keyed hash of refresh token - this is what gets stored/looked up in the database
+    """
+    return hmac.new(
+        config_settings.secret_key.encode(), token.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def create_refresh_token(
+    session: AsyncSession, user_id: int, family_id: str = None
+) -> Tuple[str, datetime.datetime]:
+    """
+    Adds a new refresh token row to session (caller commits) and returns the raw token and its expiry
+    Pass family_id when rotating so reuse of an old token can revoke the whole chain
+    """
+    token = secrets.token_urlsafe(32)
+    expiry = datetime.datetime.utcnow() + datetime.timedelta(
+        days=REFRESH_TOKEN_EXPIRE_DAYS
+    )
+
+    session.add(
+        RefreshToken(
+            token_hash=hash_refresh_token(token),
+            family_id=family_id or secrets.token_hex(16),
+            user_id=user_id,
+            expires_at=expiry,
+        )
+    )
+
+    return token, expiry
@@ -0,0 +1,203 @@
+"""
+Trending posts - GET /posts/trending
+
+Every post has a time decayed score: the post itself and each reply to it are events whose weight halves
+every trending_half_life_hours. Decaying every event at the same rate ranks exactly like growing every event
+at that rate from a fixed epoch, so an event at time t simply adds 2^((t - TRENDING_EPOCH) / half life) and
+stored scores never need to be decayed again. posts.trending_score holds log2 of that sum (keeps it in float
+range) and is indexed - a trending page is a walk down the index, replies are never scanned or aggregated.
+
+Routes add/remove reply events incrementally. Recompute every score from posts/replies with:
+    python -m BlogAPI.util.trending
+"""
+
+import base64
+import datetime
+import math
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from BlogAPI.config import config_settings
+from BlogAPI.db.SQLAlchemy_models import Post, Reply
+
+TRENDING_HALF_LIFE_HOURS = getattr(config_settings, "trending_half_life_hours", 24)
+# weight of a post's own event in replies - keeps brand new posts visible before anyone replies
+TRENDING_POST_WEIGHT = getattr(config_settings, "trending_post_weight", 1.0)
+TRENDING_EPOCH = datetime.datetime(2021, 1, 1)
+
+REPAIR_CHUNK_SIZE = 10_000
+
+
+def event_exponent(when: datetime.datetime) -> float:
+    """
+    log2 of the weight of one event at when - grows by 1 every half life
+    """
+    seconds = (when - TRENDING_EPOCH).total_seconds()
+    return seconds / (TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def post_score(date_created: datetime.datetime) -> float:
+    """
+    Score of a post without replies - also the floor its score never drops below
+    """
+    return event_exponent(date_created) + math.log2(TRENDING_POST_WEIGHT)
+
+
+def add_events(score: float, when: datetime.datetime, count: int = 1) -> float:
+    """
+    score with count events at when added - log2(2^score + count * 2^event) without overflowing
+    """
+    event = event_exponent(when) + math.log2(count)
+    high, low = max(score, event), min(score, event)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def remove_event(score: float, when: datetime.datetime, floor: float) -> float:
+    """
+    score with one event at when taken out - never below floor (rounding can't push a post under itself)
+    """
+    event = event_exponent(when)
+    if event >= score:
+        return floor
+    return max(score + math.log2(1 - 2 ** (event - score)), floor)
+
+
+async def add_reply_events(
+    session: AsyncSession,
+    post_id: int,
+    count: int = 1,
+    when: Optional[datetime.datetime] = None,
+):
+    """
+    Adds count replies at when (default now) to post's score - caller commits
+    Call after the post's reply_count update - the transaction then holds SQLite's write lock,
+    so no other writer can change the score between this read and write
+    """
+    result = await session.execute(
+        select(Post.trending_score).where(Post.id == post_id)
+    )
+    score = add_events(result.scalar_one(), when or datetime.datetime.utcnow(), count)
+
+    await session.execute(
+        update(Post).where(Post.id == post_id).values(trending_score=score)
+    )
+
+
+async def remove_reply_event(
+    session: AsyncSession, post_id: int, reply_created: datetime.datetime
+):
+    """
+    Takes a reply created at reply_created out of post's score - caller commits
+    Same locking as add_reply_events - call after the post's reply_count update
+    """
+    result = await session.execute(
+        select(Post.trending_score, Post.date_created).where(Post.id == post_id)
+    )
+    score, date_created = result.one()
+    score = remove_event(score, reply_created, post_score(date_created))
+
+    await session.execute(
+        update(Post).where(Post.id == post_id).values(trending_score=score)
+    )
+
+
+async def remove_user_reply_events(session: AsyncSession, user_id: int):
+    """
+    Takes every reply by user_id out of the scores of other users' posts - caller deletes the replies and commits
+    Same locking as add_reply_events - call after a write in the same transaction
+    """
+    result = await session.execute(
+        select(
+            Reply.post_id,
+            Reply.date_created,
+            Post.trending_score,
+            Post.date_created.label("post_created"),
+        )
+        .join(Post, Post.id == Reply.post_id)
+        .where(Reply.user_id == user_id, Post.user_id != user_id)
+    )
+
+    scores = {}
+    for reply in result:
+        score = scores.get(reply.post_id, reply.trending_score)
+        scores[reply.post_id] = remove_event(
+            score, reply.date_created, post_score(reply.post_created)
+        )
+
+    if scores:
+        connection = await session.connection()
+        await connection.execute(
+            update(Post)
+            .where(Post.id == bindparam("post_id"))
+            .values(trending_score=bindparam("score")),
+            [{"post_id": post_id, "score": score} for post_id, score in scores.items()],
+        )
+
+
+def encode_trending_cursor(score: float, row_id: int) -> str:
+    # repr round trips the float exactly
+    raw = f"{score!r}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_trending_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        score, row_id = raw.split("|")
+        return float(score), int(row_id)
+
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def repair_trending(connection: Connection, chunk_size: int = REPAIR_CHUNK_SIZE):
+    """
+    Recomputes every post's score from its replies - a range of post ids at a time,
+    replies read in (post_id, date_created) index order
+    """
+    last_id = 0
+    while True:
+        posts = connection.execute(
+            select(Post.id, Post.date_created)
+            .where(Post.id > last_id)
+            .order_by(Post.id)
+            .limit(chunk_size)
+        ).all()
+        if not posts:
+            return
+
+        scores = {post.id: post_score(post.date_created) for post in posts}
+        replies = connection.execute(
+            select(Reply.post_id, Reply.date_created).where(
+                Reply.post_id > last_id, Reply.post_id <= posts[-1].id
+            )
+        )
+        for reply in replies:
+            scores[reply.post_id] = add_events(
+                scores[reply.post_id], reply.date_created
+            )
+
+        connection.execute(
+            update(Post)
+            .where(Post.id == bindparam("post_id"))
+            .values(trending_score=bindparam("score")),
+            [{"post_id": post_id, "score": score} for post_id, score in scores.items()],
+        )
+        last_id = posts[-1].id
+
+
+if __name__ == "__main__":
+    from BlogAPI.db.db_session import engine
+
+    with engine.begin() as conn:
+        repair_trending(conn)
+
+    print("Trending scores repaired successfully")
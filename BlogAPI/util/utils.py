@@ -4,6 +4,7 @@ from starlette import status
 
 from BlogAPI.db.SQLAlchemy_models import User
 from BlogAPI.db.db_session_async import create_async_session
+from BlogAPI.util.password_hashing import verify_password
 
 
 async def authenticate_user(username: str, password: str) -> User:
@@ -18,7 +19,7 @@ async def authenticate_user(username: str, password: str) -> User:
     if not user:
         return False
 
-    if not user.verify_password(password):
+    if not await verify_password(password, user.hs_password):
         return False
 
     return user
@@ -2,9 +2,17 @@ import fastapi
 import uvicorn
 from fastapi.openapi.utils import get_openapi
 
-from BlogAPI.db.SQLAlchemy_models import Base
 from BlogAPI.db.db_session import engine
-from BlogAPI.routers import user_routes, post_routes, reply_routes
+from BlogAPI.db.migrations import run_migrations
+from BlogAPI.db.db_session_async import get_async_engine, dispose_async_engine
+from BlogAPI.routers import (
+    user_routes,
+    post_routes,
+    reply_routes,
+    search_routes,
+    stats_routes,
+)
+from BlogAPI.util.password_hashing import password_hasher
 
 api = fastapi.FastAPI(docs_url="/", redoc_url=None)
 
@@ -17,7 +25,21 @@ def configure_routing():
     api.include_router(user_routes.router, tags=["User"])
     api.include_router(post_routes.router, tags=["Post"])
     api.include_router(reply_routes.router, tags=["Reply"])
-    pass
+    api.include_router(search_routes.router, tags=["Search"])
+    api.include_router(stats_routes.router, tags=["Stats"], include_in_schema=False)
+
+
+@api.on_event("startup")
+async def startup():
+    # build pooled async engine once for the whole process
+    get_async_engine()
+
+
+@api.on_event("shutdown")
+async def shutdown():
+    # close pooled connections and hashing threads cleanly
+    await dispose_async_engine()
+    password_hasher.shutdown()
 
 
 def custom_openapi():
@@ -39,7 +61,8 @@ api.openapi = custom_openapi
 
 
 if __name__ == "__main__":
-    Base.metadata.create_all(bind=engine)
+    # creates tables on a new database, applies pending migrations to an existing one
+    run_migrations(engine)
     configure()
     # uvicorn.run("main:api", host="127.0.0.1", port=8000, reload=True)
     uvicorn.run("main:api", host="0.0.0.0", port=8000, reload=True)